@@ -3,15 +3,24 @@ Admin configuration for core models.
 """
 
 from django.contrib import admin
+from django.utils.html import format_html
 from import_export.admin import ImportExportModelAdmin
+from .admin_mixins import (
+    BackgroundImportExportMixin, LargeTableAdminMixin, QueryBudgetAdminMixin,
+    SoftDeleteAdminMixin
+)
 from .models import (
     Proveedor, Cliente, FormaDeEntrega, Articulo, Despachante,
-    ProveedorFormaEntrega
+    ProveedorFormaEntrega, ConversionUnidad, TrabajoImportExport, StatusTrabajo,
+    SuscriptorWebhook, EntregaWebhook
 )
 
 
 @admin.register(Proveedor)
-class ProveedorAdmin(ImportExportModelAdmin):
+class ProveedorAdmin(
+    QueryBudgetAdminMixin, SoftDeleteAdminMixin, LargeTableAdminMixin,
+    BackgroundImportExportMixin, ImportExportModelAdmin
+):
     """Admin interface for Proveedor model."""
     
     list_display = ['razon_social', 'cuit', 'status', 'es_proveedor_nacional', 'created_at']
@@ -37,7 +46,10 @@ class ProveedorAdmin(ImportExportModelAdmin):
 
 
 @admin.register(Cliente)
-class ClienteAdmin(ImportExportModelAdmin):
+class ClienteAdmin(
+    QueryBudgetAdminMixin, SoftDeleteAdminMixin, LargeTableAdminMixin,
+    BackgroundImportExportMixin, ImportExportModelAdmin
+):
     """Admin interface for Cliente model."""
     
     list_display = ['razon_social', 'cuit', 'email', 'status', 'created_at']
@@ -68,8 +80,18 @@ class ClienteAdmin(ImportExportModelAdmin):
     readonly_fields = ['created_at', 'updated_at']
 
 
+class ConversionUnidadInline(admin.TabularInline):
+    """Inline for an article's unit conversions."""
+    model = ConversionUnidad
+    extra = 1
+    fields = ['unidad', 'factor']
+
+
 @admin.register(Articulo)
-class ArticuloAdmin(ImportExportModelAdmin):
+class ArticuloAdmin(
+    QueryBudgetAdminMixin, SoftDeleteAdminMixin, LargeTableAdminMixin,
+    BackgroundImportExportMixin, ImportExportModelAdmin
+):
     """Admin interface for Articulo model."""
     
     list_display = ['descripcion', 'marca', 'modelo', 'familia', 'status', 'created_at']
@@ -77,10 +99,11 @@ class ArticuloAdmin(ImportExportModelAdmin):
     search_fields = ['descripcion', 'marca', 'modelo', 'codigo_fabricante', 'palabras_claves', 'tags']
     ordering = ['-created_at']
     date_hierarchy = 'created_at'
+    inlines = [ConversionUnidadInline]
     
     fieldsets = (
         ('Información Básica', {
-            'fields': ('descripcion', 'marca', 'modelo', 'tipo', 'codigo_fabricante')
+            'fields': ('descripcion', 'marca', 'modelo', 'tipo', 'codigo_fabricante', 'unidad_base')
         }),
         ('Clasificación', {
             'fields': ('familia', 'sub_familia', 'categoria_lvl1', 'categoria_lvl2', 
@@ -112,7 +135,7 @@ class ArticuloAdmin(ImportExportModelAdmin):
 
 
 @admin.register(FormaDeEntrega)
-class FormaDeEntregaAdmin(admin.ModelAdmin):
+class FormaDeEntregaAdmin(QueryBudgetAdminMixin, SoftDeleteAdminMixin, admin.ModelAdmin):
     """Admin interface for FormaDeEntrega model."""
     
     list_display = ['nombre', 'descripcion', 'created_at']
@@ -121,7 +144,10 @@ class FormaDeEntregaAdmin(admin.ModelAdmin):
 
 
 @admin.register(Despachante)
-class DespachanteAdmin(ImportExportModelAdmin):
+class DespachanteAdmin(
+    QueryBudgetAdminMixin, SoftDeleteAdminMixin, BackgroundImportExportMixin,
+    ImportExportModelAdmin
+):
     """Admin interface for Despachante model."""
     
     list_display = ['razon_social', 'cuit', 'email', 'telefono', 'created_at']
@@ -145,9 +171,99 @@ class DespachanteAdmin(ImportExportModelAdmin):
 
 
 @admin.register(ProveedorFormaEntrega)
-class ProveedorFormaEntregaAdmin(admin.ModelAdmin):
+class ProveedorFormaEntregaAdmin(
+    QueryBudgetAdminMixin, SoftDeleteAdminMixin, LargeTableAdminMixin, admin.ModelAdmin
+):
     """Admin interface for ProveedorFormaEntrega junction model."""
     
     list_display = ['proveedor', 'forma_entrega', 'created_at']
     list_filter = ['created_at']
     search_fields = ['proveedor__razon_social', 'forma_entrega__nombre']
+
+
+@admin.register(TrabajoImportExport)
+class TrabajoImportExportAdmin(QueryBudgetAdminMixin, SoftDeleteAdminMixin, admin.ModelAdmin):
+    """Read-only admin for background import/export jobs."""
+    
+    list_display = ['__str__', 'created_by', 'status', 'progreso_display', 'descarga', 'created_at']
+    list_filter = ['tipo', 'status', 'modelo', 'created_at']
+    search_fields = ['modelo', 'created_by__email']
+    ordering = ['-created_at']
+    
+    fieldsets = (
+        ('Trabajo', {
+            'fields': ('tipo', 'modelo', 'formato', 'status', 'progreso_display', 'descarga')
+        }),
+        ('Filas', {
+            'fields': (
+                'total_filas', 'filas_procesadas', 'filas_nuevas', 'filas_actualizadas',
+                'filas_eliminadas', 'filas_omitidas', 'filas_con_error'
+            )
+        }),
+        ('Errores', {
+            'fields': ('mensaje_error', 'errores')
+        }),
+        ('Auditoría', {
+            'fields': ('created_by', 'created_at', 'fecha_inicio', 'fecha_fin'),
+            'classes': ('collapse',)
+        }),
+    )
+    
+    def get_readonly_fields(self, request, obj=None):
+        return [field for fieldset in self.fieldsets for field in fieldset[1]['fields']]
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request).defer('filtros', 'seleccion', 'errores')
+        if not request.user.is_superuser:
+            queryset = queryset.filter(created_by=request.user)
+        return queryset
+    
+    def change_view(self, request, object_id, form_url='', extra_context=None):
+        response = super().change_view(request, object_id, form_url, extra_context)
+        job = getattr(response, 'context_data', {}).get('original')
+        if job and job.status in (StatusTrabajo.PENDIENTE, StatusTrabajo.EN_PROCESO):
+            # Poll until the worker finishes
+            response['Refresh'] = '5'
+        return response
+    
+    @admin.display(description='Progreso')
+    def progreso_display(self, obj):
+        return f"{obj.progreso}% ({obj.filas_procesadas}/{obj.total_filas})"
+    
+    @admin.display(description='Resultado')
+    def descarga(self, obj):
+        if not obj.resultado:
+            return '-'
+        return format_html('<a href="{}">Descargar</a>', obj.resultado.url)
+
+
+@admin.register(SuscriptorWebhook)
+class SuscriptorWebhookAdmin(QueryBudgetAdminMixin, SoftDeleteAdminMixin, admin.ModelAdmin):
+    """Admin interface for webhook subscribers."""
+    
+    list_display = ['nombre', 'url', 'activo', 'fallos_consecutivos', 'proximo_intento']
+    list_filter = ['activo']
+    search_fields = ['nombre', 'url']
+    ordering = ['nombre']
+    readonly_fields = ['fallos_consecutivos', 'proximo_intento']
+
+
+@admin.register(EntregaWebhook)
+class EntregaWebhookAdmin(QueryBudgetAdminMixin, admin.ModelAdmin):
+    """Read-only admin for webhook deliveries and their latency."""
+    
+    list_display = ['evento', 'suscriptor', 'status', 'intentos', 'latencia_ms', 'entregada_at']
+    list_filter = ['status', 'suscriptor']
+    ordering = ['-id']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
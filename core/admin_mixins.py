@@ -0,0 +1,623 @@
+"""
+Reusable ModelAdmin mixins for the procurement system.
+"""
+
+import json
+import logging
+from decimal import Decimal, InvalidOperation
+
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.utils import unquote
+from django.contrib.auth import get_permission_codename
+from django.contrib.admin.views.main import ALL_VAR, ORDER_VAR, ChangeList
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, PermissionDenied, ValidationError
+from django.core.paginator import Paginator
+from django.db import connection, models, transaction
+from django.db.models import F, ProtectedError, Q
+from django.forms.models import _get_foreign_key, model_to_dict, modelform_factory
+from django.http import Http404, JsonResponse
+from django.shortcuts import redirect
+from django.urls import path
+from django.utils import timezone
+from django.utils.encoding import force_bytes, force_str
+from django.utils.text import capfirst
+from safedelete.models import is_safedelete_cls
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from .cascade import check_protected, group_paths
+from .conditional import get_validators, not_modified, set_validators
+from .models import TrabajoImportExport, TipoDeTrabajo
+from .paginators import EstimatedCountPaginator
+from .tasks import run_export_job, run_import_job
+
+
+logger = logging.getLogger(__name__)
+
+# Changelist keyset navigation settings
+CURSOR_VAR = 'cursor'
+DIRECTION_VAR = 'dir'
+KEYSET_PARAMS = (CURSOR_VAR, DIRECTION_VAR)
+
+
+class KeysetChangeList(ChangeList):
+    """
+    ChangeList with "next/previous" keyset navigation.
+
+    While the list is shown in the admin's default ordering, rows are fetched
+    with ``WHERE (field, pk) < (cursor)`` instead of ``OFFSET`` so every page
+    costs the same regardless of depth. Custom column sorting, "show all" and
+    ``list_editable`` fall back to the regular numbered pagination.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR)
+        self.backwards = request.GET.get(DIRECTION_VAR) == 'prev'
+        super().__init__(request, *args, **kwargs)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        for name in KEYSET_PARAMS:
+            lookup_params.pop(name, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Filter, search and sort links always restart from the first page.
+        remove = [*(remove or []), *KEYSET_PARAMS]
+        return super().get_query_string(new_params, remove)
+
+    def get_keyset_field(self, request):
+        """Return the single ordering field used for keyset navigation, or None."""
+        if ORDER_VAR in request.GET or ALL_VAR in request.GET or self.list_editable:
+            return None
+        ordering = self.model_admin.get_ordering(request) or self.opts.ordering
+        if len(ordering) != 1 or not isinstance(ordering[0], str):
+            return None
+        return ordering[0]
+
+    def encode_cursor(self, obj):
+        value = getattr(obj, self.keyset_name)
+        return urlsafe_base64_encode(force_bytes(f'{value.isoformat()}|{obj.pk}'))
+
+    def decode_cursor(self, cursor):
+        try:
+            value, pk = force_str(urlsafe_base64_decode(cursor)).split('|', 1)
+            field = self.opts.get_field(self.keyset_name)
+            return field.to_python(value), self.opts.pk.to_python(pk)
+        except Exception as e:
+            raise IncorrectLookupParameters(e)
+
+    def get_results(self, request):
+        ordering_field = self.get_keyset_field(request)
+        self.keyset_active = ordering_field is not None
+        if not self.keyset_active:
+            super().get_results(request)
+            self.result_count_is_estimate = getattr(self.paginator, 'is_estimate', False)
+            return
+
+        descending = ordering_field.startswith('-')
+        self.keyset_name = ordering_field.lstrip('-')
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+
+        # Rows are always walked in the admin's direction; "prev" walks the
+        # opposite way from the cursor and flips the slice afterwards.
+        forward = descending != self.backwards
+        sign = '-' if forward else ''
+        lookup = 'lt' if forward else 'gt'
+        qs = self.queryset.order_by(f'{sign}{self.keyset_name}', f'{sign}pk')
+        if self.cursor:
+            value, pk = self.decode_cursor(self.cursor)
+            qs = qs.filter(
+                Q(**{f'{self.keyset_name}__{lookup}': value})
+                | Q(**{self.keyset_name: value, f'pk__{lookup}': pk})
+            )
+
+        rows = list(qs[:self.list_per_page + 1])
+        has_more = len(rows) > self.list_per_page
+        rows = rows[:self.list_per_page]
+        if self.backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(self.cursor)
+
+        self.next_url = has_next and rows and self.get_query_string(
+            {CURSOR_VAR: self.encode_cursor(rows[-1]), DIRECTION_VAR: 'next'}
+        )
+        self.previous_url = has_previous and rows and self.get_query_string(
+            {CURSOR_VAR: self.encode_cursor(rows[0]), DIRECTION_VAR: 'prev'}
+        )
+
+        self.result_count = paginator.count
+        self.result_count_is_estimate = paginator.is_estimate
+        self.show_full_result_count = self.model_admin.show_full_result_count
+        self.full_result_count = (
+            self.root_queryset.count() if self.show_full_result_count else None
+        )
+        self.show_admin_actions = not self.show_full_result_count or bool(
+            self.full_result_count
+        )
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = False
+        self.paginator = paginator
+
+
+class LargeTableAdminMixin:
+    """
+    ModelAdmin mixin for tables with millions of rows.
+
+    Replaces the exact COUNT(*) with planner estimates, drops the second
+    unfiltered "show all" count and navigates with keyset cursors.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+
+class LazyTabularInline(admin.TabularInline):
+    """
+    Tabular inline for documents with thousands of detail lines.
+
+    The change form only carries blank rows for new lines, so the POST never
+    validates existing ones. Existing lines are loaded page by page over AJAX
+    and saved individually through the views added by ``LazyInlineAdminMixin``.
+    """
+
+    template = 'admin/edit_inline/lazy_tabular.html'
+    lines_per_page = 50
+
+    class Media:
+        js = ['core/js/lazy_inline.js']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).none()
+
+    def get_fk(self):
+        return _get_foreign_key(self.parent_model, self.model, fk_name=self.fk_name)
+
+    def get_prefix(self):
+        """Return the formset prefix, which is also the key used in line URLs."""
+        fk = self.get_fk()
+        return fk.remote_field.get_accessor_name(model=self.model).replace('+', '')
+
+    def get_line_fields(self, request, obj):
+        return [name for name in self.get_fields(request, obj) if name != 'DELETE']
+
+    def get_editable_line_fields(self, request, obj):
+        readonly = set(self.get_readonly_fields(request, obj))
+        return [name for name in self.get_line_fields(request, obj) if name not in readonly]
+
+    def get_line_relations(self, request, obj):
+        return [
+            name for name in self.get_line_fields(request, obj)
+            if isinstance(self.model._meta.get_field(name), models.ForeignKey)
+        ]
+
+    def get_lines_queryset(self, request, obj):
+        related = self.get_line_relations(request, obj)
+        # safedelete only hides deleted rows when compiling a SELECT, so the
+        # filter is spelled out for the set-based UPDATEs in the bulk view.
+        return (
+            super().get_queryset(request)
+            .filter(**{self.get_fk().name: obj, 'deleted_at__isnull': True})
+            .select_related(*related)
+            .order_by('created_at', 'pk')
+        )
+
+    def describe_fields(self, request, obj):
+        editable = set(self.get_editable_line_fields(request, obj))
+        described = []
+        for name in self.get_line_fields(request, obj):
+            field = self.model._meta.get_field(name)
+            described.append({
+                'name': name,
+                'label': str(field.verbose_name),
+                'choices': [[value, str(label)] for value, label in field.choices or []],
+                'readonly': name not in editable or field.is_relation,
+            })
+        return described
+
+    def serialize_line(self, request, obj, line):
+        values = {}
+        for name in self.get_line_fields(request, obj):
+            field = self.model._meta.get_field(name)
+            value = field.value_from_object(line)
+            if field.is_relation:
+                display = str(getattr(line, name) or '')
+            elif field.choices:
+                display = getattr(line, f'get_{name}_display')()
+            else:
+                display = '' if value is None else str(value)
+            values[name] = {'value': None if value is None else str(value), 'display': display}
+        return {'id': str(line.pk), 'values': values}
+
+
+class LazyInlineAdminMixin:
+    """
+    ModelAdmin mixin serving the AJAX endpoints used by ``LazyTabularInline``.
+
+    ``lines/<prefix>/`` returns one page of lines, ``lines/<prefix>/save/``
+    validates and writes only the rows the user touched, and
+    ``lines/<prefix>/bulk/`` applies one operation to many lines with a
+    single UPDATE.
+    """
+
+    def get_urls(self):
+        info = self.opts.app_label, self.opts.model_name
+        urls = [
+            path(
+                '<path:object_id>/lines/<str:prefix>/',
+                # Revalidated with ETags instead of never_cache
+                self.admin_site.admin_view(self.lines_view, cacheable=True),
+                name='%s_%s_lines' % info,
+            ),
+            path(
+                '<path:object_id>/lines/<str:prefix>/save/',
+                self.admin_site.admin_view(self.lines_save_view),
+                name='%s_%s_lines_save' % info,
+            ),
+            path(
+                '<path:object_id>/lines/<str:prefix>/bulk/',
+                self.admin_site.admin_view(self.lines_bulk_view),
+                name='%s_%s_lines_bulk' % info,
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def get_lazy_inline(self, request, object_id, prefix):
+        """Return ``(obj, inline)`` for a line URL or raise Http404."""
+        obj = self.get_object(request, unquote(object_id))
+        if obj is None:
+            raise Http404
+        for inline in self.get_inline_instances(request, obj):
+            if isinstance(inline, LazyTabularInline) and inline.get_prefix() == prefix:
+                return obj, inline
+        raise Http404
+
+    def clean_line_id(self, inline, pk):
+        """Convert a client line id to a primary key value; raise ValidationError if malformed."""
+        return inline.model._meta.pk.to_python(pk)
+
+    def lines_view(self, request, object_id, prefix):
+        obj, inline = self.get_lazy_inline(request, object_id, prefix)
+        if not inline.has_view_or_change_permission(request, obj):
+            raise PermissionDenied
+
+        queryset = inline.get_lines_queryset(request, obj)
+        # Editable fields depend on the user's permissions
+        etag, last_modified = get_validators(
+            queryset, inline.get_line_relations(request, obj),
+            variant=f'{request.user.pk}:{request.get_full_path()}',
+        )
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            paginator = Paginator(queryset, inline.lines_per_page)
+            page = paginator.get_page(request.GET.get('page'))
+            response = JsonResponse({
+                'count': paginator.count,
+                'page': page.number,
+                'num_pages': paginator.num_pages,
+                'fields': inline.describe_fields(request, obj),
+                'rows': [inline.serialize_line(request, obj, line) for line in page],
+            })
+        return set_validators(response, etag, last_modified)
+
+    def lines_save_view(self, request, object_id, prefix):
+        obj, inline = self.get_lazy_inline(request, object_id, prefix)
+        if request.method != 'POST':
+            return JsonResponse({'error': 'Método no permitido'}, status=405)
+        try:
+            payload = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'error': 'JSON inválido'}, status=400)
+        if not (
+            isinstance(payload, dict)
+            and isinstance(payload.get('rows', []), list)
+            and isinstance(payload.get('deleted', []), list)
+            and all(isinstance(row, dict) for row in payload.get('rows', []))
+        ):
+            return JsonResponse({'error': 'Formato de datos inválido'}, status=400)
+
+        try:
+            rows = {
+                str(self.clean_line_id(inline, row.pop('id'))): row
+                for row in payload.get('rows', []) if 'id' in row
+            }
+            deleted = [self.clean_line_id(inline, pk) for pk in payload.get('deleted', [])]
+        except ValidationError:
+            return JsonResponse({'error': 'Identificador de línea inválido'}, status=400)
+        if rows and not inline.has_change_permission(request, obj):
+            raise PermissionDenied
+        if deleted and not inline.has_delete_permission(request, obj):
+            raise PermissionDenied
+
+        queryset = inline.get_lines_queryset(request, obj)
+        fields = inline.get_editable_line_fields(request, obj)
+        form_class = modelform_factory(inline.model, form=inline.form, fields=fields)
+        lines, changed_fields, errors = [], set(), {}
+        for line in queryset.filter(pk__in=rows):
+            data = model_to_dict(line, fields=fields)
+            data.update(rows[str(line.pk)])
+            form = form_class(data, instance=line)
+            if not form.is_valid():
+                errors[str(line.pk)] = form.errors.get_json_data()
+            elif form.has_changed():
+                lines.append(line)
+                changed_fields.update(form.changed_data)
+        if errors:
+            return JsonResponse({'errors': errors}, status=400)
+
+        with transaction.atomic():
+            now = timezone.now()
+            for line in lines:
+                line.updated_at = now
+                line.updated_by = request.user
+            if lines:
+                inline.model.objects.bulk_update(
+                    lines, [*changed_fields, 'updated_at', 'updated_by']
+                )
+            deleted_count = queryset.filter(pk__in=deleted).delete()[0] if deleted else 0
+            if lines or deleted_count:
+                self.log_change(request, obj, (
+                    f'{inline.model._meta.verbose_name_plural}: '
+                    f'{len(lines)} modificadas, {deleted_count} eliminadas.'
+                ))
+
+        return JsonResponse({'updated': len(lines), 'deleted': deleted_count})
+
+    def lines_bulk_view(self, request, object_id, prefix):
+        obj, inline = self.get_lazy_inline(request, object_id, prefix)
+        if request.method != 'POST':
+            return JsonResponse({'error': 'Método no permitido'}, status=405)
+        try:
+            payload = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'error': 'JSON inválido'}, status=400)
+        if not (
+            isinstance(payload, dict)
+            and isinstance(payload.get('ids', []), list)
+            and isinstance(payload.get('values') or {}, dict)
+        ):
+            return JsonResponse({'error': 'Formato de datos inválido'}, status=400)
+
+        queryset = inline.get_lines_queryset(request, obj)
+        if not payload.get('all'):
+            try:
+                ids = [self.clean_line_id(inline, pk) for pk in payload.get('ids', [])]
+            except ValidationError:
+                return JsonResponse({'error': 'Identificador de línea inválido'}, status=400)
+            queryset = queryset.filter(pk__in=ids)
+        action = payload.get('action')
+        editable = inline.get_editable_line_fields(request, obj)
+        audit = {'updated_at': timezone.now(), 'updated_by': request.user}
+
+        if action == 'delete':
+            if not inline.has_delete_permission(request, obj):
+                raise PermissionDenied
+            count = queryset.delete()[0]
+        elif action == 'update':
+            if not inline.has_change_permission(request, obj):
+                raise PermissionDenied
+            values = payload.get('values') or {}
+            cleaned, errors = {}, {}
+            for name, value in values.items():
+                if name not in editable:
+                    errors[name] = ['Campo no editable']
+                    continue
+                try:
+                    cleaned[name] = inline.model._meta.get_field(name).formfield().clean(value)
+                except ValidationError as e:
+                    errors[name] = e.messages
+            if errors or not cleaned:
+                return JsonResponse({'errors': errors or {'values': ['Sin cambios']}}, status=400)
+            count = queryset.update(**cleaned, **audit)
+        elif action == 'scale':
+            if not inline.has_change_permission(request, obj):
+                raise PermissionDenied
+            name = payload.get('field')
+            if name not in editable or not isinstance(
+                inline.model._meta.get_field(name), models.DecimalField
+            ):
+                return JsonResponse({'errors': {'field': ['Campo no numérico']}}, status=400)
+            try:
+                factor = Decimal(str(payload.get('factor')))
+            except InvalidOperation:
+                return JsonResponse({'errors': {'factor': ['Factor inválido']}}, status=400)
+            count = queryset.update(**{name: F(name) * factor}, **audit)
+        else:
+            return JsonResponse({'error': 'Acción desconocida'}, status=400)
+
+        self.log_change(request, obj, (
+            f'{inline.model._meta.verbose_name_plural}: '
+            f'operación masiva "{action}" sobre {count} líneas.'
+        ))
+        return JsonResponse({'action': action, 'count': count})
+
+
+def str_select_related(model, prefix='', depth=3):
+    """Return the select_related paths needed to render ``str(obj)`` for a model."""
+    paths = []
+    for name in getattr(model, 'str_select_related', ()):
+        path = f'{prefix}{name}'
+        paths.append(path)
+        if depth > 1:
+            related_model = model._meta.get_field(name).related_model
+            paths.extend(str_select_related(related_model, f'{path}__', depth - 1))
+    return paths
+
+
+class QueryCounter:
+    """Database execute wrapper that counts the queries run through it."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class QueryBudgetAdminMixin:
+    """
+    ModelAdmin mixin that keeps changelists at a constant number of queries.
+
+    ``list_select_related`` is derived from the foreign keys shown in
+    ``list_display`` plus whatever their ``__str__`` reads (declared on each
+    model as ``str_select_related``). Reverse relations used by custom
+    columns go in ``list_prefetch_related``. With ``DEBUG`` on, changelists
+    that exceed ``query_budget`` are logged.
+    """
+
+    query_budget = 12
+    list_prefetch_related = ()
+
+    def get_list_select_related(self, request):
+        declared = super().get_list_select_related(request)
+        if declared is True:
+            return True
+        paths = list(declared or ())
+        for name in self.get_list_display(request):
+            if name == '__str__':
+                paths.extend(str_select_related(self.model))
+                continue
+            if not isinstance(name, str):
+                continue
+            try:
+                field = self.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.many_to_one or (field.one_to_one and field.concrete):
+                paths.append(name)
+                paths.extend(str_select_related(field.related_model, f'{name}__'))
+        return tuple(dict.fromkeys(paths))
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if self.list_prefetch_related:
+            queryset = queryset.prefetch_related(*self.list_prefetch_related)
+        return queryset
+
+    def changelist_view(self, request, extra_context=None):
+        if not settings.DEBUG:
+            return super().changelist_view(request, extra_context)
+
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = super().changelist_view(request, extra_context)
+            # Row __str__ calls happen while the template renders.
+            if hasattr(response, 'render'):
+                response.render()
+        if counter.count > self.query_budget:
+            logger.warning(
+                '%s changelist ran %d queries (budget %d)',
+                self.opts.label, counter.count, self.query_budget,
+            )
+        return response
+
+
+class BackgroundImportExportMixin:
+    """
+    ImportExportModelAdmin mixin that runs imports and exports in Celery.
+
+    Submitting the import or export form stores a ``TrabajoImportExport``
+    (the uploaded file, or the changelist filters and selected ids) and
+    queues it, then redirects to the job page, which shows progress and
+    the result file. The dry-run/confirm step is skipped: row errors are
+    reported on the job instead.
+    """
+
+    def redirect_to_job(self, request, job):
+        self.message_user(
+            request, f'{job.get_tipo_display()} en segundo plano iniciada; el progreso se muestra en el trabajo.'
+        )
+        return redirect('admin:core_trabajoimportexport_change', job.pk)
+
+    def import_action(self, request, **kwargs):
+        if not self.has_import_permission(request):
+            raise PermissionDenied
+
+        import_form = self.create_import_form(request)
+        if not (request.POST and import_form.is_valid()):
+            return super().import_action(request, **kwargs)
+
+        input_format = self.get_import_formats()[int(import_form.cleaned_data['format'])]()
+        import_file = import_form.cleaned_data['import_file']
+        job = TrabajoImportExport(
+            tipo=TipoDeTrabajo.IMPORTACION,
+            modelo=self.opts.label,
+            formato=input_format.get_title(),
+            recurso=self.get_resource_index(import_form),
+            created_by=request.user,
+        )
+        job.archivo.save(import_file.name, import_file, save=False)
+        job.save()
+        transaction.on_commit(lambda: run_import_job.delay(str(job.pk)))
+        return self.redirect_to_job(request, job)
+
+    def _do_file_export(self, file_format, request, queryset, export_form=None):
+        if not self.has_export_permission(request):
+            raise PermissionDenied
+
+        if export_form is not None and 'export_items' in export_form.changed_data:
+            selection = export_form.cleaned_data['export_items']
+        elif request.resolver_match.url_name != f'{self.opts.app_label}_{self.opts.model_name}_export':
+            # Exported with an action or from the change page
+            selection = queryset.values_list('pk', flat=True)
+        else:
+            selection = None
+        job = TrabajoImportExport.objects.create(
+            tipo=TipoDeTrabajo.EXPORTACION,
+            modelo=self.opts.label,
+            formato=file_format.get_title(),
+            recurso=self.get_resource_index(export_form),
+            filtros=dict(request.GET.lists()),
+            seleccion=None if selection is None else [str(pk) for pk in selection],
+            campos=self.get_export_resource_fields_from_form(export_form),
+            created_by=request.user,
+        )
+        transaction.on_commit(lambda: run_export_job.delay(str(job.pk)))
+        return self.redirect_to_job(request, job)
+
+
+class SoftDeleteAdminMixin:
+    """
+    ModelAdmin mixin for set-based soft-delete cascades.
+
+    Deletes record the acting user, and the confirmation page counts the
+    cascaded rows per table instead of collecting and listing every one.
+    """
+
+    def delete_model(self, request, obj):
+        obj.delete(user=request.user)
+
+    def delete_queryset(self, request, queryset):
+        queryset.delete(user=request.user)
+
+    def get_deleted_objects(self, objs, request):
+        if not isinstance(objs, models.QuerySet):
+            objs = self.model._default_manager.filter(pk__in=[obj.pk for obj in objs])
+        roots = objs.values('pk')
+        to_delete = [f'{capfirst(self.opts.verbose_name)}: {obj}' for obj in objs]
+        model_count = {self.opts.verbose_name_plural: len(to_delete)}
+        perms_needed = set()
+        for child, condition, _ in group_paths(self.model, roots):
+            if not is_safedelete_cls(child):
+                continue
+            count = child.objects.filter(condition).count()
+            if not count:
+                continue
+            opts = child._meta
+            model_count[opts.verbose_name_plural] = count
+            if not request.user.has_perm(f'{opts.app_label}.{get_permission_codename("delete", opts)}'):
+                perms_needed.add(opts.verbose_name)
+        try:
+            check_protected(self.model, roots)
+            protected = []
+        except ProtectedError as exc:
+            protected = [str(obj) for obj in exc.protected_objects]
+        return to_delete, model_count, perms_needed, protected
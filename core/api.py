@@ -0,0 +1,284 @@
+"""
+Shared machinery for the read API.
+
+Lists are paginated by keyset on (created_at, id), accept sparse
+fieldsets through ``?fields=`` and are serialized by a fast path: only
+the requested columns are read with ``values_list()`` and converted by
+the serializer's own fields, skipping model instances and the per-row
+work of ModelSerializer. Detail views use the regular serializer with a
+``select_related`` plan derived from the same fields.
+"""
+
+import base64
+import binascii
+import json
+import uuid
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers, viewsets
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.permissions import DjangoModelPermissions
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .conditional import get_validators, not_modified, set_validators
+
+
+class ViewModelPermissions(DjangoModelPermissions):
+    """Model permissions that also require ``view`` to read."""
+
+    perms_map = {
+        **DjangoModelPermissions.perms_map,
+        'GET': ['%(app_label)s.view_%(model_name)s'],
+        'OPTIONS': ['%(app_label)s.view_%(model_name)s'],
+        'HEAD': ['%(app_label)s.view_%(model_name)s'],
+    }
+
+
+# ==============================================================================
+# PAGINATION
+# ==============================================================================
+
+def encode_position(timestamp, pk):
+    """Opaque cursor for a (timestamp, id) keyset position."""
+    return base64.urlsafe_b64encode(json.dumps([timestamp.isoformat(), str(pk)]).encode()).decode()
+
+
+def decode_position(value):
+    """Inverse of ``encode_position``; raises ValueError on a malformed cursor."""
+    try:
+        timestamp, pk = json.loads(base64.urlsafe_b64decode(value.encode()))
+        timestamp = parse_datetime(timestamp)
+        pk = uuid.UUID(pk)
+    except (TypeError, AttributeError, binascii.Error) as exc:
+        raise ValueError(value) from exc
+    if timestamp is None:
+        raise ValueError(value)
+    return timestamp, pk
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only cursor over (created_at, id), newest first.
+
+    The cursor carries the last row's position, so every page is one
+    index range scan however deep the client goes, and rows inserted
+    meanwhile never shift the pages already read.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = ('-created_at', '-id')
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        if value is None:
+            return settings.REST_FRAMEWORK['PAGE_SIZE']
+        try:
+            return max(1, min(int(value), self.max_page_size))
+        except ValueError:
+            raise ValidationError({self.page_size_query_param: ['Debe ser un número entero.']})
+
+    def decode_cursor(self, request):
+        value = request.query_params.get(self.cursor_query_param)
+        if not value:
+            return None
+        try:
+            return decode_position(value)
+        except ValueError:
+            raise NotFound('Cursor inválido.')
+
+    def encode_cursor(self, created_at, pk):
+        return encode_position(created_at, pk)
+
+    def get_position(self, row):
+        """(created_at, id) of a model instance or of a ``values_list`` row ending with them."""
+        if isinstance(row, tuple):
+            return row[-2], row[-1]
+        return row.created_at, row.pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            created_at, pk = cursor
+            # The plain bound is what the index range scan starts from
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk),
+                created_at__lte=created_at,
+            )
+        rows = list(queryset.order_by(*self.ordering)[:size + 1])
+        self.next_cursor = None
+        if len(rows) > size:
+            rows = rows[:size]
+            self.next_cursor = self.encode_cursor(*self.get_position(rows[-1]))
+        return rows
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+# ==============================================================================
+# SERIALIZERS
+# ==============================================================================
+
+class ReadSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer with sparse fieldsets and a fast list path.
+
+    ``fields`` keeps only the given names. Related values are declared
+    with dotted sources (``source='proveedor.razon_social'``); the
+    detail ``select_related`` plan and the columns read by the fast path
+    both come from those sources.
+    """
+
+    # Fields whose to_representation() returns database values unchanged,
+    # or changes them only in ways the JSON renderer repeats
+    PASSTHROUGH_FIELDS = (
+        serializers.BooleanField, serializers.CharField, serializers.ChoiceField,
+        serializers.IntegerField, serializers.UUIDField, serializers.PrimaryKeyRelatedField,
+    )
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def get_select_related(self):
+        """Relations read by the selected fields, for ``select_related()``."""
+        return sorted({
+            field.source.rsplit('.', 1)[0].replace('.', '__')
+            for field in self.fields.values() if '.' in field.source
+        })
+
+    def get_columns(self):
+        """``(name, values_list path, converter or None)`` of every selected field."""
+        return [
+            (
+                name,
+                field.source.replace('.', '__'),
+                None if isinstance(field, self.PASSTHROUGH_FIELDS) else field.to_representation,
+            )
+            for name, field in self.fields.items()
+        ]
+
+    def to_rows(self, rows, columns):
+        """Represent ``values_list`` rows holding ``columns`` first."""
+        data = []
+        for row in rows:
+            item = {}
+            for (name, _, convert), value in zip(columns, row):
+                item[name] = value if convert is None or value is None else convert(value)
+            data.append(item)
+        return data
+
+
+# ==============================================================================
+# VIEWSETS
+# ==============================================================================
+
+class FastListMixin:
+    """List through ``values_list()`` and ``ReadSerializer.to_rows`` unless ``fast_list`` is off."""
+
+    fast_list = True
+
+    def list(self, request, *args, **kwargs):
+        if not self.fast_list:
+            return super().list(request, *args, **kwargs)
+        serializer = self.get_serializer()
+        columns = serializer.get_columns()
+        queryset = self.filter_queryset(self.get_queryset()).values_list(
+            *(path for _, path, _ in columns), 'created_at', 'pk',
+        )
+        rows = self.paginate_queryset(queryset)
+        return self.get_paginated_response(serializer.to_rows(rows, columns))
+
+
+class ConditionalGetMixin:
+    """
+    Answer list and detail GETs with 304 when nothing they show changed.
+
+    The validators come from one aggregate over the filtered queryset
+    and the relations the serializer reads, before any row is loaded.
+    """
+
+    def get_validators(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.action == 'retrieve':
+            value = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+            queryset = queryset.filter(**{self.lookup_field: value})
+        return get_validators(
+            queryset, self.get_serializer().get_select_related(), variant=self.request.get_full_path(),
+        )
+
+    def conditional(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        response = not_modified(request, etag, last_modified) or handler(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
+
+
+class ReadOnlyViewSet(ConditionalGetMixin, FastListMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only endpoints of a ``BaseModel`` table, listed newest first.
+
+    ``?fields=a,b`` limits the output to those fields. Lists go through
+    ``values_list()`` unless ``fast_list`` is off. Unchanged lists and
+    objects are answered with 304.
+    """
+
+    pagination_class = KeysetPagination
+    permission_classes = [ViewModelPermissions]
+    lookup_value_regex = '[0-9a-f-]{36}'
+    fields_query_param = 'fields'
+
+    def get_requested_fields(self):
+        if not hasattr(self, '_requested_fields'):
+            value = self.request.query_params.get(self.fields_query_param) if self.request else None
+            requested = None
+            if value:
+                requested = [name.strip() for name in value.split(',') if name.strip()]
+                unknown = set(requested) - set(self.get_serializer_class()().fields)
+                if unknown:
+                    raise ValidationError({
+                        self.fields_query_param: [f'Campos desconocidos: {", ".join(sorted(unknown))}'],
+                    })
+            self._requested_fields = requested
+        return self._requested_fields
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve' or not self.fast_list:
+            queryset = queryset.select_related(*self.get_serializer().get_select_related())
+        return queryset
@@ -0,0 +1,170 @@
+"""
+Cold archive for long soft-deleted rows.
+
+Rows soft-deleted more than ``PURGE_SOFT_DELETED_AFTER_DAYS`` ago are
+written in batches to gzip-compressed JSONL files in the default storage
+and then hard-deleted. Models are processed children first, and rows that
+are still referenced by any other row are left in place, so no foreign
+key is ever broken. ``restore_archive`` loads the files back, parents
+first, with the rows still soft-deleted.
+"""
+
+import gzip
+import json
+import logging
+from datetime import datetime, time, timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core import serializers
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+from safedelete.config import FIELD_NAME
+from safedelete.models import is_safedelete_cls
+
+logger = logging.getLogger(__name__)
+
+# Apps whose soft-deleted rows are archived. Users stay: the activity log
+# references them.
+PURGE_APPS = ('core', 'procurement')
+
+ARCHIVE_ROOT = 'archivo'
+
+
+class ArchiveEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder keeping the microseconds it truncates, so rows restore unchanged."""
+
+    def default(self, o):
+        if isinstance(o, (datetime, time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def get_purge_models():
+    """Return the archived models ordered so that children come before parents."""
+    candidates = [
+        model for model in apps.get_models()
+        if model._meta.app_label in PURGE_APPS and is_safedelete_cls(model)
+    ]
+    ordered, visiting = [], set()
+
+    def visit(model):
+        if model in ordered or model in visiting:
+            return
+        visiting.add(model)
+        for rel in model._meta.related_objects:
+            if rel.related_model in candidates:
+                visit(rel.related_model)
+        visiting.discard(model)
+        ordered.append(model)
+
+    for model in candidates:
+        visit(model)
+    return ordered
+
+
+def get_purgeable(model, cutoff):
+    """Rows deleted before ``cutoff`` that no other row references."""
+    queryset = model.all_objects.filter(**{f'{FIELD_NAME}__lt': cutoff})
+    for rel in model._meta.related_objects:
+        if rel.many_to_many:
+            continue
+        referencing = rel.related_model._base_manager.filter(**{rel.field.name: OuterRef('pk')})
+        queryset = queryset.exclude(Exists(referencing))
+    return queryset.order_by('pk')
+
+
+def write_archive(model, objects, cutoff, number):
+    """Store ``objects`` as one gzip JSONL file and return its storage path."""
+    lines = (
+        json.dumps(row, cls=ArchiveEncoder, ensure_ascii=False)
+        for row in serializers.serialize('python', objects)
+    )
+    content = gzip.compress('\n'.join(lines).encode('utf-8'))
+    name = (
+        f'{ARCHIVE_ROOT}/{cutoff:%Y%m%d}/{model._meta.label_lower}/'
+        f'{timezone.now():%H%M%S}-{number:05d}.jsonl.gz'
+    )
+    return default_storage.save(name, ContentFile(content))
+
+
+def purge_soft_deleted(days=None, batch_size=None):
+    """
+    Archive and hard-delete rows soft-deleted more than ``days`` days ago.
+
+    Each batch is written to storage before the transaction that deletes
+    it, so a failure never loses rows; at worst a batch is archived twice,
+    which the restore tolerates. Returns ``{model label: rows purged}``.
+    """
+    days = settings.PURGE_SOFT_DELETED_AFTER_DAYS if days is None else days
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    cutoff = timezone.now() - timedelta(days=days)
+    purged = {}
+
+    for model in get_purge_models():
+        number = 0
+        while True:
+            batch = list(get_purgeable(model, cutoff)[:batch_size])
+            if not batch:
+                break
+            number += 1
+            path = write_archive(model, batch, cutoff, number)
+            with transaction.atomic():
+                # Re-check the references in the DELETE itself; rows referenced
+                # since the SELECT stay (the restore skips existing rows).
+                # _raw_delete bypasses the collector, which would cascade.
+                rows = get_purgeable(model, cutoff).filter(pk__in=[obj.pk for obj in batch]).order_by()
+                deleted = rows._raw_delete(rows.db)
+            purged[model._meta.label] = purged.get(model._meta.label, 0) + deleted
+            logger.info('Archived %d %s rows to %s', deleted, model._meta.label, path)
+    return purged
+
+
+def list_archive_files(prefix):
+    """Return every archive file under ``prefix`` in the default storage."""
+    if prefix.endswith('.jsonl.gz'):
+        return [prefix]
+    directories, files = default_storage.listdir(prefix)
+    paths = [f'{prefix.rstrip("/")}/{name}' for name in sorted(files) if name.endswith('.jsonl.gz')]
+    for directory in sorted(directories):
+        paths.extend(list_archive_files(f'{prefix.rstrip("/")}/{directory}'))
+    return paths
+
+
+def restore_archive(paths, batch_size=None):
+    """
+    Load archived rows back into their tables, parents first.
+
+    Rows keep their ``deleted_at`` and stay soft-deleted until undeleted.
+    Rows whose primary key already exists are skipped. Returns
+    ``{model label: rows read}``.
+    """
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    order = {model._meta.label_lower: index for index, model in enumerate(reversed(get_purge_models()))}
+
+    def model_label(path):
+        return path.rstrip('/').split('/')[-2]
+
+    restored = {}
+    for path in sorted(paths, key=lambda path: (order.get(model_label(path), len(order)), path)):
+        with default_storage.open(path, 'rb') as stream:
+            rows = [json.loads(line) for line in gzip.decompress(stream.read()).decode('utf-8').splitlines()]
+        objects = [item.object for item in serializers.deserialize('python', rows)]
+        if not objects:
+            continue
+        model = type(objects[0])
+        with transaction.atomic():
+            # Raw inserts keep created_at and updated_at, which bulk_create
+            # would stamp with the current time
+            for start in range(0, len(objects), batch_size):
+                model._base_manager._insert(
+                    objects[start:start + batch_size], model._meta.concrete_fields,
+                    raw=True, on_conflict=OnConflict.IGNORE,
+                )
+        restored[model._meta.label] = restored.get(model._meta.label, 0) + len(objects)
+    return restored
@@ -0,0 +1,24 @@
+"""
+asyncio Redis client for async views.
+
+redis.asyncio pools are bound to the event loop that first uses them, so
+every loop of the process gets its own client: one per worker under an
+ASGI server, one per run in tests and benchmarks.
+"""
+
+import asyncio
+import weakref
+
+from django.conf import settings
+from redis.asyncio import Redis
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_redis():
+    """Return the client of the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = Redis.from_url(settings.CACHES['default']['LOCATION'])
+    return client
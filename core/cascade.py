@@ -0,0 +1,299 @@
+"""
+Set-based soft-delete cascade.
+
+safedelete's SOFT_DELETE_CASCADE collects every related object in Python
+and saves them one at a time. The engine here works out the relation
+graph once per model and issues one UPDATE per table, selecting the rows
+through joins back to the deleted root rows. Per-instance safedelete
+signals are not sent; affected rows are written to the activity log
+instead.
+"""
+
+from collections import Counter, defaultdict
+from functools import lru_cache, reduce
+from operator import or_
+
+from django.apps import apps
+from django.db import connections, models, transaction
+from django.db.models import ProtectedError, Q
+from django.utils import timezone
+from safedelete.config import DELETED_BY_CASCADE_FIELD_NAME, FIELD_NAME, SOFT_DELETE_CASCADE
+from safedelete.models import is_safedelete_cls
+from safedelete.queryset import SafeDeleteQueryset
+
+from .metrics import record_rows
+
+
+# Activity log entity type per model, as in log_activity() of init_database.sql
+AUDITED_ENTITIES = {
+    'users.Usuario': 'USUARIO',
+    'core.Proveedor': 'PROVEEDOR',
+    'core.Cliente': 'CLIENTE',
+    'core.Articulo': 'ARTICULO',
+    'procurement.Solped': 'SOLPED',
+    'procurement.PedidoDeCotizacion': 'PEDIDO_COTIZACION',
+    'procurement.PedidoCotizacionProveedor': 'PEDIDO_COTIZACION',
+    'procurement.CotizacionProveedor': 'COTIZACION',
+    'procurement.Cotizacion': 'COTIZACION',
+    'procurement.OrdenCompraProveedor': 'ORDEN_COMPRA',
+    'procurement.OrdenCompraCliente': 'ORDEN_COMPRA',
+    'procurement.Remito': 'REMITO',
+    'procurement.Envio': 'ENVIO',
+}
+
+
+@lru_cache(maxsize=None)
+def get_cascade_paths(model):
+    """
+    Return every model reached from ``model`` through CASCADE foreign keys.
+
+    Each entry is ``(related_model, lookups, depth)`` where ``lookups`` is
+    the chain of foreign key names from the related model back to
+    ``model``. A model reached along several paths appears once per path.
+    """
+    paths = []
+
+    def walk(parent, chain, seen):
+        for rel in parent._meta.related_objects:
+            if rel.many_to_many or rel.on_delete is not models.CASCADE:
+                continue
+            child = rel.related_model
+            if child in seen:
+                # Self references and cycles would need a recursive query
+                continue
+            child_chain = (rel.field.name,) + chain
+            paths.append((child, child_chain, len(child_chain)))
+            walk(child, child_chain, seen | {child})
+
+    walk(model, (), {model})
+    return tuple(paths)
+
+
+def get_path_filter(chain, roots, cascaded_only=False):
+    """
+    Build the filter selecting rows joined to ``roots`` through ``chain``.
+
+    With ``cascaded_only`` every intermediate row must also have been
+    deleted by cascade, which is how undelete decides where to stop.
+    """
+    lookup = '__'.join(chain)
+    condition = Q(**{f'{lookup}__pk__in': roots})
+    if cascaded_only:
+        for end in range(1, len(chain)):
+            intermediate = '__'.join(chain[:end])
+            condition &= Q(**{f'{intermediate}__{DELETED_BY_CASCADE_FIELD_NAME}': True})
+    return condition
+
+
+def group_paths(model, roots, cascaded_only=False):
+    """Merge the paths per model; return ``(model, condition, depth)`` deepest first."""
+    conditions = defaultdict(list)
+    depths = Counter()
+    for child, chain, depth in get_cascade_paths(model):
+        conditions[child].append(get_path_filter(chain, roots, cascaded_only))
+        depths[child] = max(depths[child], depth)
+    # Every descendant is deeper than its ancestors' deepest path, so this
+    # order updates children before the parents their filters join through.
+    ordered = sorted(conditions, key=lambda child: depths[child], reverse=True)
+    return [(child, reduce(or_, conditions[child]), depths[child]) for child in ordered]
+
+
+def update_returning(queryset, values):
+    """Run a single UPDATE over the rows of ``queryset``; return the updated pks."""
+    model = queryset.model
+    connection = connections[queryset.db]
+    quote = connection.ops.quote_name
+    select = queryset.order_by().values('pk').query
+    select_sql, select_params = select.get_compiler(queryset.db).as_sql()
+
+    assignments, params = [], []
+    for name, value in values.items():
+        field = model._meta.get_field(name)
+        if isinstance(value, models.Model):
+            value = value.pk
+        assignments.append(f'{quote(field.column)} = %s')
+        params.append(field.get_db_prep_save(value, connection))
+    pk_column = quote(model._meta.pk.column)
+    sql = (
+        f'UPDATE {quote(model._meta.db_table)} SET {", ".join(assignments)} '
+        f'WHERE {pk_column} IN ({select_sql}) RETURNING {pk_column}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + list(select_params))
+        return [model._meta.pk.to_python(row[0]) for row in cursor.fetchall()]
+
+
+def get_audit_values(model, now, user, restore):
+    """Columns set on every soft-deleted or restored row of ``model``."""
+    field_names = {field.name for field in model._meta.concrete_fields}
+    values = {
+        FIELD_NAME: None if restore else now,
+    }
+    if 'deleted_by' in field_names:
+        values['deleted_by'] = None if restore else user
+    if 'updated_at' in field_names:
+        values['updated_at'] = now
+    if restore and 'updated_by' in field_names:
+        values['updated_by'] = user
+    return values
+
+
+def log_activity(affected, user, activity_type, data):
+    """Write one activity entry per affected row of the audited models."""
+    Actividad = apps.get_model('procurement', 'Actividad')
+    entries = []
+    for model, (pks, cascaded) in affected.items():
+        entity_type = AUDITED_ENTITIES.get(model._meta.label)
+        if entity_type is None:
+            continue
+        entries.extend(
+            Actividad(
+                usuario=user,
+                tipo=activity_type,
+                id_entidad=pk,
+                tipo_entidad=entity_type,
+                data={**data, 'cascada': cascaded},
+            )
+            for pk in pks
+        )
+    Actividad.objects.bulk_create(entries, batch_size=1000)
+
+
+def check_protected(model, roots):
+    """Raise ProtectedError if live rows reference the rows about to be deleted."""
+    targets = [(model, ())] + [(child, chain) for child, chain, _ in get_cascade_paths(model)]
+    for target, chain in targets:
+        for rel in target._meta.related_objects:
+            if rel.many_to_many or rel.on_delete not in (models.PROTECT, models.RESTRICT):
+                continue
+            protected = rel.related_model._default_manager.filter(
+                get_path_filter((rel.field.name,) + chain, roots)
+            )
+            if protected.exists():
+                raise ProtectedError(
+                    f'No se puede eliminar {model._meta.verbose_name}: '
+                    f'{rel.related_model._meta.verbose_name_plural} la referencian.',
+                    set(protected[:10]),
+                )
+
+
+def apply_field_updates(model, roots):
+    """Apply SET_NULL and SET_DEFAULT for foreign keys into the deleted rows."""
+    targets = [(model, ())] + [(child, chain) for child, chain, _ in get_cascade_paths(model)]
+    for target, chain in targets:
+        for rel in target._meta.related_objects:
+            if rel.many_to_many:
+                continue
+            if rel.on_delete is models.SET_NULL:
+                value = None
+            elif rel.on_delete is models.SET_DEFAULT:
+                value = rel.field.get_default()
+            else:
+                continue
+            rel.related_model._base_manager.filter(
+                get_path_filter((rel.field.name,) + chain, roots)
+            ).update(**{rel.field.name: value})
+
+
+def soft_delete_cascade(queryset, user=None):
+    """
+    Soft-delete the rows of ``queryset`` and everything cascading from them.
+
+    Issues one UPDATE per affected table, plus one per SET_NULL foreign key
+    into them. Returns ``(total, {model label: count})`` like safedelete.
+    """
+    model = queryset.model
+    roots = queryset.filter(**{f'{FIELD_NAME}__isnull': True}).values('pk')
+    now = timezone.now()
+    affected = {}
+
+    with transaction.atomic(using=queryset.db):
+        check_protected(model, roots)
+        # The root goes last: the children's filters join back to live roots
+        apply_field_updates(model, roots)
+        for child, condition, _ in group_paths(model, roots):
+            if not is_safedelete_cls(child):
+                continue
+            rows = child.all_objects.filter(condition, **{f'{FIELD_NAME}__isnull': True})
+            values = get_audit_values(child, now, user, restore=False)
+            values[DELETED_BY_CASCADE_FIELD_NAME] = True
+            affected[child] = (update_returning(rows, values), True)
+        affected[model] = (update_returning(roots, get_audit_values(model, now, user, restore=False)), False)
+        log_activity(affected, user, 'DELETE', {'origen': model._meta.label})
+        for child, (pks, _) in affected.items():
+            record_rows(child, pks, -1)
+
+    counts = {child._meta.label: len(pks) for child, (pks, _) in affected.items() if pks}
+    return sum(counts.values()), counts
+
+
+def undelete_cascade(queryset, user=None):
+    """
+    Restore the soft-deleted rows of ``queryset`` and what was deleted with them.
+
+    Only rows flagged as deleted by cascade are restored, and the walk stops
+    at rows that were deleted on their own, as safedelete's undelete does.
+    """
+    model = queryset.model
+    roots = queryset.filter(**{f'{FIELD_NAME}__isnull': False}).values('pk')
+    now = timezone.now()
+    affected = {}
+
+    with transaction.atomic(using=queryset.db):
+        for child, condition, _ in group_paths(model, roots, cascaded_only=True):
+            if not is_safedelete_cls(child):
+                continue
+            rows = child.all_objects.filter(
+                condition,
+                **{f'{FIELD_NAME}__isnull': False, DELETED_BY_CASCADE_FIELD_NAME: True},
+            )
+            values = get_audit_values(child, now, user, restore=True)
+            values[DELETED_BY_CASCADE_FIELD_NAME] = False
+            affected[child] = (update_returning(rows, values), True)
+        values = get_audit_values(model, now, user, restore=True)
+        values[DELETED_BY_CASCADE_FIELD_NAME] = False
+        affected[model] = (update_returning(roots, values), False)
+        log_activity(affected, user, 'UPDATE', {'origen': model._meta.label, 'restaurado': True})
+        for child, (pks, _) in affected.items():
+            record_rows(child, pks, 1)
+
+    counts = {child._meta.label: len(pks) for child, (pks, _) in affected.items() if pks}
+    return sum(counts.values()), counts
+
+
+class CascadeQuerySet(SafeDeleteQueryset):
+    """Queryset whose delete() and undelete() cascade with set-based UPDATEs."""
+
+    def delete(self, force_policy=None, user=None):
+        if (force_policy or self.model._safedelete_policy) != SOFT_DELETE_CASCADE:
+            return super().delete(force_policy)
+        return soft_delete_cascade(self, user=user)
+    delete.alters_data = True
+
+    def undelete(self, force_policy=None, user=None):
+        if (force_policy or self.model._safedelete_policy) != SOFT_DELETE_CASCADE:
+            return super().undelete(force_policy)
+        return undelete_cascade(self, user=user)
+    undelete.alters_data = True
+
+
+class CascadeSoftDeleteMixin:
+    """
+    SafeDeleteModel mixin routing SOFT_DELETE_CASCADE through the engine.
+
+    ``delete()`` and ``undelete()`` accept the acting ``user``, stored in
+    ``deleted_by``/``updated_by`` and in the activity log.
+    """
+
+    def soft_delete_cascade_policy_action(self, **kwargs):
+        result = soft_delete_cascade(type(self).all_objects.filter(pk=self.pk), user=kwargs.get('user'))
+        self.refresh_from_db(fields=[FIELD_NAME])
+        return result
+
+    def undelete(self, force_policy=None, **kwargs):
+        if (force_policy or self._safedelete_policy) != SOFT_DELETE_CASCADE:
+            return super().undelete(force_policy, **kwargs)
+        assert getattr(self, FIELD_NAME)
+        result = undelete_cascade(type(self).all_objects.filter(pk=self.pk), user=kwargs.get('user'))
+        self.refresh_from_db(fields=[FIELD_NAME, DELETED_BY_CASCADE_FIELD_NAME])
+        return result
@@ -0,0 +1,37 @@
+"""
+System checks for the project's URL configuration.
+"""
+
+from asgiref.sync import iscoroutinefunction
+from django.core import checks
+from django.db import connections
+from django.urls import URLResolver, get_resolver
+
+
+def iter_views(patterns, prefix=''):
+    """Yield ``(route, view)`` for every URL pattern, included ones too."""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_views(pattern.url_patterns, prefix + str(pattern.pattern))
+        else:
+            yield prefix + str(pattern.pattern), pattern.callback
+
+
+@checks.register(checks.Tags.urls)
+def check_async_views_not_atomic(app_configs=None, patterns=None, **kwargs):
+    """
+    Async views must opt out of ATOMIC_REQUESTS.
+
+    Django raises RuntimeError on every request to an async view that
+    ATOMIC_REQUESTS would wrap, which only shows once the view is called.
+    """
+    atomic = {alias for alias, options in connections.settings.items() if options.get('ATOMIC_REQUESTS')}
+    errors = []
+    for route, view in iter_views(get_resolver().url_patterns if patterns is None else patterns):
+        if iscoroutinefunction(view) and atomic - getattr(view, '_non_atomic_requests', set()):
+            errors.append(checks.Error(
+                f'Async view {view.__module__}.{view.__qualname__} at {route!r} runs under ATOMIC_REQUESTS.',
+                hint='Decorate it with transaction.non_atomic_requests.',
+                id='core.E001',
+            ))
+    return errors
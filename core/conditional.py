@@ -0,0 +1,50 @@
+"""
+Conditional GET driven by ``updated_at``.
+
+A list or object is summarised by one aggregate over the rows it is
+built from: the latest ``updated_at`` of the rows and of the rows they
+join, and the row count, which catches deletions and rows leaving a
+filter. Views that can name their queryset answer 304 Not Modified from
+that aggregate before loading any row.
+"""
+
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def get_validators(queryset, related=(), variant=''):
+    """
+    ETag and Last-Modified of the rows of ``queryset``, in one query.
+
+    ``related`` names the foreign keys whose rows are shown too;
+    ``variant`` tells apart representations of the same rows, such as
+    pages or field selections.
+    """
+    latest = {f'latest_{number}': Max(f'{path}__updated_at') for number, path in enumerate(related)}
+    state = queryset.order_by().aggregate(rows=Count('pk'), latest=Max('updated_at'), **latest)
+    stamps = [state['latest'], *(state[key] for key in latest)]
+    digest = hashlib.md5(usedforsecurity=False)
+    digest.update(f'{queryset.model._meta.label}:{state["rows"]}:{variant}'.encode())
+    for stamp in stamps:
+        digest.update(b':' + (stamp.isoformat().encode() if stamp else b'-'))
+    stamps = [stamp for stamp in stamps if stamp is not None]
+    return quote_etag(digest.hexdigest()), max(stamps) if stamps else None
+
+
+def not_modified(request, etag, last_modified):
+    """A 304 response if the request's validators still match, else None."""
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+
+
+def set_validators(response, etag, last_modified):
+    response.headers['ETag'] = etag
+    if last_modified:
+        response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
@@ -0,0 +1,56 @@
+"""
+Per-process database connection pools.
+
+With ``DB_POOL_MODE = 'pool'`` every web and Celery worker process keeps
+its own psycopg pool. Their statistics are exported for Prometheus by
+the process answering the scrape, labelled with its pid. Under
+PgBouncer there are no pools here; PgBouncer's ``SHOW POOLS`` reports.
+"""
+
+from django.db import connections
+from django.db.backends.postgresql.base import DatabaseWrapper
+
+# psycopg_pool statistic -> (metric, type, help). Counters run from the
+# pool's creation; psycopg leaves out the ones still at zero.
+POOL_METRICS = {
+    'pool_min': ('db_pool_min_connections', 'gauge', 'Connections the pool keeps open.'),
+    'pool_max': ('db_pool_max_connections', 'gauge', 'Connections the pool may open.'),
+    'pool_size': ('db_pool_connections', 'gauge', 'Open connections, in use or idle.'),
+    'pool_available': ('db_pool_available_connections', 'gauge', 'Idle connections ready to borrow.'),
+    'requests_waiting': ('db_pool_waiting_requests', 'gauge', 'Requests waiting for a connection.'),
+    'requests_num': ('db_pool_requests_total', 'counter', 'Connections borrowed.'),
+    'requests_queued': ('db_pool_queued_requests_total', 'counter', 'Borrows that had to wait.'),
+    'requests_wait_ms': ('db_pool_wait_milliseconds_total', 'counter', 'Time spent waiting to borrow.'),
+    'requests_errors': ('db_pool_request_errors_total', 'counter', 'Borrows that timed out or failed.'),
+    'usage_ms': ('db_pool_usage_milliseconds_total', 'counter', 'Time connections were borrowed.'),
+    'returns_bad': ('db_pool_bad_returns_total', 'counter', 'Connections returned broken or mid-transaction.'),
+    'connections_num': ('db_pool_connects_total', 'counter', 'Connections opened to the server.'),
+    'connections_ms': ('db_pool_connect_milliseconds_total', 'counter', 'Time spent opening connections.'),
+    'connections_errors': ('db_pool_connect_errors_total', 'counter', 'Failed connection attempts.'),
+    'connections_lost': ('db_pool_lost_connections_total', 'counter', 'Connections that failed the health check.'),
+}
+
+# Pools a forked process inherited; see discard_inherited_pools
+_inherited_pools = []
+
+
+def get_pool_stats():
+    """Return ``{alias: {statistic: value}}`` of the databases pooled in this process."""
+    stats = {}
+    for alias in connections:
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is not None:
+            stats[alias] = pool.get_stats()
+    return stats
+
+
+def discard_inherited_pools():
+    """
+    Make a forked process open its own pools instead of its parent's.
+
+    Pooled connections share their sockets with the parent, so closing
+    them here would end the parent's sessions: they are set aside,
+    never used or closed, and new pools open on the next query.
+    """
+    _inherited_pools.extend(DatabaseWrapper._connection_pools.values())
+    DatabaseWrapper._connection_pools.clear()
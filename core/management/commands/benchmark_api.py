@@ -0,0 +1,76 @@
+"""
+Measure the rows per second a read API list serves, with and without
+the fast serialization path.
+"""
+
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.urls import router as core_router
+from procurement.urls import router as procurement_router
+
+
+def get_viewsets():
+    """URL prefix -> viewset of every read API resource."""
+    return {
+        prefix: viewset
+        for router in (core_router, procurement_router)
+        for prefix, viewset, _ in router.registry
+    }
+
+
+class Command(BaseCommand):
+    help = 'Mide las filas por segundo de un listado de la API, con y sin la serialización rápida.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('recurso', choices=sorted(get_viewsets()))
+        parser.add_argument('--usuario', help='Usuario que consulta; por defecto, el primer superusuario.')
+        parser.add_argument('--page-size', type=int, default=500, help='Filas por página.')
+        parser.add_argument('--paginas', type=int, default=20, help='Páginas a recorrer por pasada.')
+        parser.add_argument('--campos', help='Campos a pedir, como en ?fields=.')
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['usuario'])
+        viewset = get_viewsets()[options['recurso']]
+        params = {'page_size': options['page_size']}
+        if options['campos']:
+            params['fields'] = options['campos']
+
+        for fast_list, label in ((False, 'ModelSerializer'), (True, 'values_list')):
+            view = viewset.as_view({'get': 'list'}, fast_list=fast_list)
+            rows, elapsed = self.walk(view, user, params, options['paginas'])
+            rate = rows / elapsed if elapsed else 0
+            self.stdout.write(f'{label}: {rows} filas en {elapsed:.3f} s, {rate:,.0f} filas/s')
+
+    def get_user(self, username):
+        users = get_user_model()._default_manager
+        user = (
+            users.filter(**{users.model.USERNAME_FIELD: username}).first() if username
+            else users.filter(is_superuser=True).order_by('pk').first()
+        )
+        if user is None:
+            raise CommandError('No se encontró el usuario.')
+        return user
+
+    def walk(self, view, user, params, pages):
+        """Follow the cursor for up to ``pages`` pages; return rows read and seconds spent."""
+        factory = APIRequestFactory()
+        params = dict(params)
+        rows = 0
+        start = time.perf_counter()
+        for _ in range(pages):
+            request = factory.get('/', params)
+            force_authenticate(request, user=user)
+            response = view(request)
+            if response.status_code != 200:
+                raise CommandError(f'La API respondió {response.status_code}: {response.data}')
+            response.render()
+            rows += len(response.data['results'])
+            if not response.data['next']:
+                break
+            params['cursor'] = parse_qs(urlsplit(response.data['next']).query)['cursor'][0]
+        return rows, time.perf_counter() - start
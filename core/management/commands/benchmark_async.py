@@ -0,0 +1,102 @@
+"""
+Compare latency and throughput of the sync and async versions of the
+search, autocomplete and dashboard metric endpoints.
+
+Requests are served in-process the way Django's ASGI handler serves
+them: each in its own thread-sensitive context, sync views through
+``sync_to_async``, async views on the event loop, and the database
+connection closed when the request ends.
+"""
+
+import asyncio
+import statistics
+import time
+from collections import Counter
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import AsyncRequestFactory, override_settings
+
+from core.search import SEARCHES
+from core.views import aautocomplete_view, asearch_view, autocomplete_view, search_view
+from users.views import adashboard_metrics_view, dashboard_metrics_view
+
+# Endpoint -> (sync view, async view, takes a resource)
+ENDPOINTS = {
+    'buscar': (search_view, asearch_view, False),
+    'autocompletar': (autocomplete_view, aautocomplete_view, True),
+    'metricas': (dashboard_metrics_view, adashboard_metrics_view, False),
+}
+
+
+class Command(BaseCommand):
+    help = 'Compara la latencia y el rendimiento de las vistas sync y async de búsqueda, autocompletado y métricas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('endpoint', choices=sorted(ENDPOINTS))
+        parser.add_argument('--q', default='ac', help='Término de búsqueda.')
+        parser.add_argument('--recurso', choices=sorted(SEARCHES), default='proveedores', help='Recurso del autocompletado.')
+        parser.add_argument('--usuario', help='Usuario que consulta; por defecto, el primer superusuario.')
+        parser.add_argument('--peticiones', type=int, default=1000, help='Peticiones por nivel de concurrencia.')
+        parser.add_argument(
+            '--concurrencia', type=int, nargs='+', default=[1, 10, 50],
+            help='Peticiones simultáneas; se mide cada nivel.',
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['usuario'])
+        sync_view, async_view, takes_resource = ENDPOINTS[options['endpoint']]
+        kwargs = {'resource': options['recurso']} if takes_resource else {}
+
+        # The benchmark measures the views, not the user's throttle bucket
+        unthrottled = {user.email.lower(): ('1000000/s', 1000000)}
+        with override_settings(API_THROTTLE_CLIENTS=unthrottled):
+            for concurrency in options['concurrencia']:
+                for label, view, is_async in (('sync', sync_view, False), ('async', async_view, True)):
+                    latencies, statuses, elapsed = asyncio.run(self.run(
+                        view, is_async, kwargs, user, options['q'], options['peticiones'], concurrency,
+                    ))
+                    percentiles = statistics.quantiles(latencies, n=100)
+                    self.stdout.write(
+                        f'{label:>5} x{concurrency}: {len(latencies) / elapsed:,.0f} peticiones/s, '
+                        f'p50 {percentiles[49] * 1000:.1f} ms, p99 {percentiles[98] * 1000:.1f} ms, '
+                        f'estados {dict(statuses)}'
+                    )
+
+    def get_user(self, username):
+        users = get_user_model()._default_manager
+        user = (
+            users.filter(**{users.model.USERNAME_FIELD: username}).first() if username
+            else users.filter(is_superuser=True).order_by('pk').first()
+        )
+        if user is None:
+            raise CommandError('No se encontró el usuario.')
+        return user
+
+    async def run(self, view, is_async, kwargs, user, term, requests, concurrency):
+        """Serve ``requests`` requests, ``concurrency`` at a time; return latencies, statuses and seconds."""
+        factory = AsyncRequestFactory()
+        slots = asyncio.Semaphore(concurrency)
+        latencies, statuses = [], Counter()
+
+        async def get_user():
+            return user
+
+        async def serve():
+            request = factory.get('/', {'q': term})
+            request.user, request.auser = user, get_user
+            async with slots, ThreadSensitiveContext():
+                start = time.perf_counter()
+                if is_async:
+                    response = await view(request, **kwargs)
+                else:
+                    response = await sync_to_async(view)(request, **kwargs)
+                await sync_to_async(close_old_connections)()
+                latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(serve() for _ in range(requests)))
+        return latencies, statuses, time.perf_counter() - start
@@ -0,0 +1,33 @@
+"""
+Compile every Jinja2 template into the bytecode cache.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.template.backends.jinja2 import Jinja2
+from jinja2 import TemplateSyntaxError
+
+
+class Command(BaseCommand):
+    help = 'Compila todas las plantillas Jinja2 al caché de bytecode para acelerar el arranque.'
+
+    def handle(self, *args, **options):
+        errors = 0
+        for engine in engines.all():
+            if not isinstance(engine, Jinja2):
+                continue
+            env = engine.env
+            if env.bytecode_cache is None:
+                raise CommandError('JINJA2_BYTECODE_CACHE está desactivado.')
+            compiled = 0
+            for name in env.list_templates(extensions=['html', 'txt', 'xml']):
+                try:
+                    env.get_template(name)
+                except TemplateSyntaxError as exc:
+                    errors += 1
+                    self.stderr.write(f'{name}:{exc.lineno}: {exc.message}')
+                else:
+                    compiled += 1
+            self.stdout.write(f'{engine.name}: {compiled} plantillas compiladas.')
+        if errors:
+            raise CommandError(f'{errors} plantillas con errores.')
@@ -0,0 +1,29 @@
+"""
+Restore rows archived by the soft-delete purge.
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.archive import list_archive_files, restore_archive
+
+
+class Command(BaseCommand):
+    help = 'Restaura filas archivadas por la purga de eliminados (quedan eliminadas lógicamente).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='+',
+            help='Archivos .jsonl.gz o carpetas del almacenamiento, p. ej. archivo/20250101',
+        )
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        paths = []
+        for prefix in options['paths']:
+            paths.extend(list_archive_files(prefix))
+        restored = restore_archive(paths, batch_size=options['batch_size'])
+        for label, count in sorted(restored.items()):
+            self.stdout.write(f'{label}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{sum(restored.values())} filas leídas de {len(paths)} archivos.'
+        ))
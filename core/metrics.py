@@ -0,0 +1,231 @@
+"""
+Dashboard metrics kept as incremental counters in Redis.
+
+Live rows per status of the tracked models are counted in a single Redis
+hash, so the dashboard reads every figure with one HGETALL. Saves, hard
+deletes, set-based soft deletes and bulk transitions adjust the counters
+once their transaction commits. A periodic task recounts everything from
+the database to repair drift from writes that bypass these hooks (plain
+``QuerySet.update()``, raw SQL) or increments lost while Redis was down.
+"""
+
+import logging
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_init, post_save
+from django.utils import timezone
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+from safedelete.config import FIELD_NAME
+
+from .async_redis import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_KEY = 'dashboard:counters'
+
+# Pub/sub channel notified after every change, read by the live dashboard
+COUNTERS_CHANNEL = 'dashboard:counters:changed'
+
+# Present only once the hash has been rebuilt from the database; a hash
+# without it was created by increments alone and cannot be trusted
+RECONCILED_FIELD = '_reconciled_at'
+
+TRACKED_MODELS = (
+    'core.Proveedor',
+    'core.Cliente',
+    'procurement.Cotizacion',
+    'procurement.OrdenCompraProveedor',
+)
+
+# Dashboard card -> (model label, statuses added up; None adds every status)
+DASHBOARD_CARDS = {
+    'proveedores_activos': ('core.Proveedor', ('ACTIVO',)),
+    'clientes': ('core.Cliente', None),
+    'cotizaciones_pendientes': ('procurement.Cotizacion', ('BORRADOR', 'ENVIADA', 'RECIBIDA', 'EVALUADA')),
+    'ordenes_en_proceso': ('procurement.OrdenCompraProveedor', ('CONFIRMADA', 'EN_PROCESO')),
+}
+
+# Marks instances whose status or deleted_at were not loaded
+UNKNOWN = object()
+
+
+def counter_field(label, status):
+    """Hash field holding the live rows of ``label`` in ``status``."""
+    return f'{label}:{status}'
+
+
+def apply_deltas(deltas):
+    """Add ``{field: delta}`` to the counters once the current transaction commits."""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    def flush():
+        try:
+            pipe = get_redis_connection('default').pipeline(transaction=False)
+            for field, delta in deltas.items():
+                pipe.hincrby(COUNTERS_KEY, field, delta)
+            pipe.publish(COUNTERS_CHANNEL, '')
+            pipe.execute()
+        except RedisError:
+            logger.warning('Could not update dashboard counters; left to reconciliation', exc_info=True)
+
+    transaction.on_commit(flush)
+
+
+# ==============================================================================
+# SIGNAL HANDLERS
+# ==============================================================================
+
+def get_state(instance):
+    """Status the instance is counted under: None if deleted, UNKNOWN if deferred."""
+    if 'status' not in instance.__dict__ or FIELD_NAME not in instance.__dict__:
+        return UNKNOWN
+    if getattr(instance, FIELD_NAME) is not None:
+        return None
+    return instance.status
+
+
+def remember_state(sender, instance, **kwargs):
+    instance._counted_status = get_state(instance)
+
+
+def count_save(sender, instance, created, **kwargs):
+    old = None if created else getattr(instance, '_counted_status', UNKNOWN)
+    new = get_state(instance)
+    instance._counted_status = new
+    if old is UNKNOWN or new is UNKNOWN or old == new:
+        return
+    deltas = Counter()
+    if old is not None:
+        deltas[counter_field(sender._meta.label, old)] -= 1
+    if new is not None:
+        deltas[counter_field(sender._meta.label, new)] += 1
+    apply_deltas(deltas)
+
+
+def count_delete(sender, instance, **kwargs):
+    old = getattr(instance, '_counted_status', UNKNOWN)
+    if old is not UNKNOWN and old is not None:
+        apply_deltas({counter_field(sender._meta.label, old): -1})
+
+
+def connect_signals():
+    """Hook the counters to the tracked models; called from CoreConfig.ready()."""
+    for label in TRACKED_MODELS:
+        model = apps.get_model(label)
+        post_init.connect(remember_state, sender=model, dispatch_uid=f'metrics-init-{label}')
+        post_save.connect(count_save, sender=model, dispatch_uid=f'metrics-save-{label}')
+        post_delete.connect(count_delete, sender=model, dispatch_uid=f'metrics-delete-{label}')
+
+
+# ==============================================================================
+# SET-BASED WRITES
+# ==============================================================================
+
+def record_rows(model, pks, sign):
+    """Count rows soft-deleted (``sign=-1``) or restored (``sign=1``) by one UPDATE."""
+    label = model._meta.label
+    if label not in TRACKED_MODELS or not pks:
+        return
+    statuses = (
+        model.all_objects.filter(pk__in=pks).order_by()
+        .values_list('status').annotate(rows=Count('pk'))
+    )
+    apply_deltas({counter_field(label, status): sign * rows for status, rows in statuses})
+
+
+def record_transition(model, previous, target):
+    """Move live rows from their ``previous`` statuses to ``target``."""
+    label = model._meta.label
+    if label not in TRACKED_MODELS:
+        return
+    deltas = Counter()
+    for status in previous:
+        deltas[counter_field(label, status)] -= 1
+        deltas[counter_field(label, target)] += 1
+    apply_deltas(deltas)
+
+
+# ==============================================================================
+# READING AND RECONCILIATION
+# ==============================================================================
+
+def count_from_database():
+    """Recount the live rows per status with one grouped query per model."""
+    counts = {}
+    for label in TRACKED_MODELS:
+        model = apps.get_model(label)
+        statuses = model.objects.order_by().values_list('status').annotate(rows=Count('pk'))
+        for status, rows in statuses:
+            counts[counter_field(label, status)] = rows
+    return counts
+
+
+def reconcile():
+    """Replace the counters with a fresh count from the database."""
+    counts = count_from_database()
+    pipe = get_redis_connection('default').pipeline(transaction=True)
+    pipe.delete(COUNTERS_KEY)
+    pipe.hset(COUNTERS_KEY, mapping={**counts, RECONCILED_FIELD: timezone.now().isoformat()})
+    pipe.publish(COUNTERS_CHANNEL, '')
+    pipe.execute()
+    return counts
+
+
+def parse_counters(raw):
+    return {
+        field.decode(): int(value) for field, value in raw.items()
+        if field.decode() != RECONCILED_FIELD
+    }
+
+
+def get_counters():
+    """Return ``{field: count}`` with one HGETALL, rebuilding the hash if needed."""
+    try:
+        raw = get_redis_connection('default').hgetall(COUNTERS_KEY)
+        if RECONCILED_FIELD.encode() not in raw:
+            return reconcile()
+    except RedisError:
+        logger.warning('Dashboard counters unavailable; counting from the database', exc_info=True)
+        return count_from_database()
+    return parse_counters(raw)
+
+
+async def aget_counters():
+    """Async ``get_counters``; the HGETALL does not hold a thread."""
+    try:
+        raw = await get_async_redis().hgetall(COUNTERS_KEY)
+        if RECONCILED_FIELD.encode() not in raw:
+            return await sync_to_async(reconcile)()
+    except RedisError:
+        logger.warning('Dashboard counters unavailable; counting from the database', exc_info=True)
+        return await sync_to_async(count_from_database)()
+    return parse_counters(raw)
+
+
+def get_card_metrics(counters):
+    """Add up the counters of each dashboard card."""
+    metrics = {}
+    for card, (label, statuses) in DASHBOARD_CARDS.items():
+        prefix = f'{label}:'
+        metrics[card] = max(0, sum(
+            count for field, count in counters.items()
+            if field.startswith(prefix) and (statuses is None or field[len(prefix):] in statuses)
+        ))
+    return metrics
+
+
+def get_dashboard_metrics():
+    """Return the figure of every dashboard card."""
+    return get_card_metrics(get_counters())
+
+
+async def aget_dashboard_metrics():
+    """Async ``get_dashboard_metrics``."""
+    return get_card_metrics(await aget_counters())
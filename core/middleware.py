@@ -0,0 +1,24 @@
+"""
+Project middleware.
+"""
+
+from django.middleware.http import ConditionalGetMiddleware as BaseConditionalGetMiddleware
+from django.utils.cache import patch_cache_control
+
+
+class ConditionalGetMiddleware(BaseConditionalGetMiddleware):
+    """
+    Django's conditional GET handling, made to revalidate.
+
+    Responses without validators of their own get an ETag of their
+    content, which saves the transfer but not the rendering; views in
+    ``core.conditional`` save both. Every response with validators is
+    marked ``private, no-cache`` so browsers and polling clients ask
+    again with If-None-Match instead of downloading the page anew.
+    """
+
+    def process_response(self, request, response):
+        response = super().process_response(request, response)
+        if request.method in ('GET', 'HEAD') and response.has_header('ETag') and not response.has_header('Cache-Control'):
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
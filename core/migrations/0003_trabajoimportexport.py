@@ -0,0 +1,203 @@
+# Generated by Django 5.1.5 on 2026-10-19 11:23
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrabajoImportExport",
+            fields=[
+                (
+                    "deleted_at",
+                    models.DateTimeField(db_index=True, editable=False, null=True),
+                ),
+                (
+                    "deleted_by_cascade",
+                    models.BooleanField(default=False, editable=False),
+                ),
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Creado"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Actualizado"),
+                ),
+                (
+                    "tipo",
+                    models.CharField(
+                        choices=[
+                            ("IMPORTACION", "Importación"),
+                            ("EXPORTACION", "Exportación"),
+                        ],
+                        max_length=15,
+                        verbose_name="Tipo",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDIENTE", "Pendiente"),
+                            ("EN_PROCESO", "En Proceso"),
+                            ("COMPLETADO", "Completado"),
+                            ("ERROR", "Error"),
+                        ],
+                        default="PENDIENTE",
+                        max_length=15,
+                        verbose_name="Estado",
+                    ),
+                ),
+                ("modelo", models.CharField(max_length=100, verbose_name="Modelo")),
+                ("formato", models.CharField(max_length=20, verbose_name="Formato")),
+                (
+                    "recurso",
+                    models.PositiveSmallIntegerField(default=0, verbose_name="Recurso"),
+                ),
+                (
+                    "archivo",
+                    models.FileField(
+                        blank=True,
+                        upload_to="trabajos/entrada/%Y/%m/",
+                        verbose_name="Archivo",
+                    ),
+                ),
+                (
+                    "resultado",
+                    models.FileField(
+                        blank=True,
+                        upload_to="trabajos/resultado/%Y/%m/",
+                        verbose_name="Resultado",
+                    ),
+                ),
+                (
+                    "consulta",
+                    models.BinaryField(blank=True, null=True, verbose_name="Consulta"),
+                ),
+                (
+                    "campos",
+                    models.JSONField(blank=True, null=True, verbose_name="Campos"),
+                ),
+                (
+                    "total_filas",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Total de Filas"
+                    ),
+                ),
+                (
+                    "filas_procesadas",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Filas Procesadas"
+                    ),
+                ),
+                (
+                    "filas_nuevas",
+                    models.PositiveIntegerField(default=0, verbose_name="Filas Nuevas"),
+                ),
+                (
+                    "filas_actualizadas",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Filas Actualizadas"
+                    ),
+                ),
+                (
+                    "filas_eliminadas",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Filas Eliminadas"
+                    ),
+                ),
+                (
+                    "filas_omitidas",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Filas Omitidas"
+                    ),
+                ),
+                (
+                    "filas_con_error",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Filas con Error"
+                    ),
+                ),
+                (
+                    "errores",
+                    models.JSONField(blank=True, default=list, verbose_name="Errores"),
+                ),
+                (
+                    "mensaje_error",
+                    models.TextField(blank=True, verbose_name="Mensaje de Error"),
+                ),
+                (
+                    "fecha_inicio",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Fecha de Inicio"
+                    ),
+                ),
+                (
+                    "fecha_fin",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Fecha de Fin"
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="%(class)s_creados",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Creado por",
+                    ),
+                ),
+                (
+                    "deleted_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="%(class)s_eliminados",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Eliminado por",
+                    ),
+                ),
+                (
+                    "updated_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="%(class)s_actualizados",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Actualizado por",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Trabajo de Importación/Exportación",
+                "verbose_name_plural": "Trabajos de Importación/Exportación",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(fields=["status"], name="idx_trabajos_status")
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,126 @@
+# Generated by Django 5.1.5 on 2026-10-19 11:24
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking writes on large tables
+    atomic = False
+
+    dependencies = [
+        ("core", "0003_trabajoimportexport"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        RemoveIndexConcurrently(
+            model_name="articulo",
+            name="idx_articulos_status",
+        ),
+        RemoveIndexConcurrently(
+            model_name="articulo",
+            name="idx_articulos_familia",
+        ),
+        RemoveIndexConcurrently(
+            model_name="articulo",
+            name="idx_articulos_marca",
+        ),
+        RemoveIndexConcurrently(
+            model_name="articulo",
+            name="idx_articulos_categoria_lvl1",
+        ),
+        RemoveIndexConcurrently(
+            model_name="cliente",
+            name="idx_clientes_cuit",
+        ),
+        RemoveIndexConcurrently(
+            model_name="cliente",
+            name="idx_clientes_status",
+        ),
+        RemoveIndexConcurrently(
+            model_name="proveedor",
+            name="idx_proveedores_cuit",
+        ),
+        RemoveIndexConcurrently(
+            model_name="proveedor",
+            name="idx_proveedores_status",
+        ),
+        RemoveIndexConcurrently(
+            model_name="trabajoimportexport",
+            name="idx_trabajos_status",
+        ),
+        AddIndexConcurrently(
+            model_name="articulo",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["status", "-created_at"],
+                name="idx_articulos_status_created",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="articulo",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["familia"],
+                name="idx_articulos_familia",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="articulo",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["marca"],
+                name="idx_articulos_marca",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="articulo",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["categoria_lvl1"],
+                name="idx_articulos_categoria_lvl1",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="cliente",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["cuit"],
+                name="idx_clientes_cuit",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="cliente",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["status", "-created_at"],
+                name="idx_clientes_status_created",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="proveedor",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["cuit"],
+                name="idx_proveedores_cuit",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="proveedor",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["status", "-created_at"],
+                name="idx_proveedores_status_created",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="trabajoimportexport",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["status", "-created_at"],
+                name="idx_trabajos_status_created",
+            ),
+        ),
+    ]
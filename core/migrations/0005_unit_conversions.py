@@ -0,0 +1,141 @@
+# Generated by Django 5.1.5 on 2026-10-19 11:48
+
+import core.cascade
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_partial_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="articulo",
+            name="unidad_base",
+            field=models.CharField(
+                choices=[
+                    ("UNIDAD", "Unidad"),
+                    ("CAJA", "Caja"),
+                    ("PALLET", "Pallet"),
+                    ("KG", "Kilogramo"),
+                    ("LITRO", "Litro"),
+                    ("METRO", "Metro"),
+                    ("M2", "Metro Cuadrado"),
+                    ("M3", "Metro Cúbico"),
+                ],
+                default="UNIDAD",
+                max_length=10,
+                verbose_name="Unidad Base",
+            ),
+        ),
+        migrations.CreateModel(
+            name="ConversionUnidad",
+            fields=[
+                (
+                    "deleted_at",
+                    models.DateTimeField(db_index=True, editable=False, null=True),
+                ),
+                (
+                    "deleted_by_cascade",
+                    models.BooleanField(default=False, editable=False),
+                ),
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Creado"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Actualizado"),
+                ),
+                (
+                    "unidad",
+                    models.CharField(
+                        choices=[
+                            ("UNIDAD", "Unidad"),
+                            ("CAJA", "Caja"),
+                            ("PALLET", "Pallet"),
+                            ("KG", "Kilogramo"),
+                            ("LITRO", "Litro"),
+                            ("METRO", "Metro"),
+                            ("M2", "Metro Cuadrado"),
+                            ("M3", "Metro Cúbico"),
+                        ],
+                        max_length=10,
+                        verbose_name="Unidad",
+                    ),
+                ),
+                (
+                    "factor",
+                    models.DecimalField(
+                        decimal_places=6,
+                        help_text="Unidades base contenidas en una unidad",
+                        max_digits=15,
+                        verbose_name="Factor",
+                    ),
+                ),
+                (
+                    "articulo",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="conversiones",
+                        to="core.articulo",
+                        verbose_name="Artículo",
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="%(class)s_creados",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Creado por",
+                    ),
+                ),
+                (
+                    "deleted_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="%(class)s_eliminados",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Eliminado por",
+                    ),
+                ),
+                (
+                    "updated_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="%(class)s_actualizados",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Actualizado por",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Conversión de Unidad",
+                "verbose_name_plural": "Conversiones de Unidad",
+                "unique_together": {("articulo", "unidad")},
+            },
+            bases=(core.cascade.CascadeSoftDeleteMixin, models.Model),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.5 on 2026-10-19 11:55
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking writes on large tables
+    atomic = False
+
+    dependencies = [
+        ("core", "0005_unit_conversions"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="articulo",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["-created_at", "-id"],
+                name="idx_articulos_created_id",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="cliente",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["-created_at", "-id"],
+                name="idx_clientes_created_id",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="proveedor",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["-created_at", "-id"],
+                name="idx_proveedores_created_id",
+            ),
+        ),
+    ]
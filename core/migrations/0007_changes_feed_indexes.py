@@ -0,0 +1,48 @@
+# Generated by Django 5.1.5 on 2026-10-19 12:05
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking writes on large tables
+    atomic = False
+
+    dependencies = [
+        ("core", "0006_keyset_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="articulo",
+            index=models.Index(
+                fields=["updated_at", "id"], name="idx_articulos_updated_id"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="cliente",
+            index=models.Index(
+                fields=["updated_at", "id"], name="idx_clientes_updated_id"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="conversionunidad",
+            index=models.Index(
+                fields=["updated_at", "id"], name="idx_conv_unidad_updated_id"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="despachante",
+            index=models.Index(
+                fields=["updated_at", "id"], name="idx_despachantes_updated_id"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="proveedor",
+            index=models.Index(
+                fields=["updated_at", "id"], name="idx_proveedores_updated_id"
+            ),
+        ),
+    ]
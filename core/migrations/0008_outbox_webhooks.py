@@ -0,0 +1,252 @@
+# Generated by Django 5.1.5 on 2026-10-19 12:09
+
+import core.cascade
+import django.contrib.postgres.fields
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_changes_feed_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EventoOutbox",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("modelo", models.CharField(max_length=100, verbose_name="Modelo")),
+                ("id_entidad", models.UUIDField(verbose_name="ID de Entidad")),
+                (
+                    "status_anterior",
+                    models.CharField(
+                        blank=True, max_length=20, verbose_name="Estado Anterior"
+                    ),
+                ),
+                (
+                    "status_nuevo",
+                    models.CharField(max_length=20, verbose_name="Estado Nuevo"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Creado"),
+                ),
+                (
+                    "despachado_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Despachado"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Evento de Outbox",
+                "verbose_name_plural": "Eventos de Outbox",
+                "ordering": ["-id"],
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("despachado_at__isnull", True)),
+                        fields=["id"],
+                        name="idx_outbox_pendientes",
+                    ),
+                    models.Index(
+                        fields=["despachado_at"], name="idx_outbox_despachado"
+                    ),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="SuscriptorWebhook",
+            fields=[
+                (
+                    "deleted_at",
+                    models.DateTimeField(db_index=True, editable=False, null=True),
+                ),
+                (
+                    "deleted_by_cascade",
+                    models.BooleanField(default=False, editable=False),
+                ),
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Creado"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Actualizado"),
+                ),
+                ("nombre", models.CharField(max_length=255, verbose_name="Nombre")),
+                ("url", models.URLField(max_length=500, verbose_name="URL")),
+                (
+                    "secreto",
+                    models.CharField(
+                        blank=True,
+                        help_text="Firma cada envío con HMAC-SHA256 en la cabecera X-Webhook-Firma",
+                        max_length=255,
+                        verbose_name="Secreto",
+                    ),
+                ),
+                (
+                    "modelos",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.CharField(max_length=100),
+                        blank=True,
+                        default=list,
+                        help_text="Etiquetas como procurement.Remito; vacío recibe todos",
+                        size=None,
+                        verbose_name="Modelos",
+                    ),
+                ),
+                ("activo", models.BooleanField(default=True, verbose_name="Activo")),
+                (
+                    "fallos_consecutivos",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Fallos Consecutivos"
+                    ),
+                ),
+                (
+                    "proximo_intento",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Próximo Intento"
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="%(class)s_creados",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Creado por",
+                    ),
+                ),
+                (
+                    "deleted_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="%(class)s_eliminados",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Eliminado por",
+                    ),
+                ),
+                (
+                    "updated_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="%(class)s_actualizados",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Actualizado por",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Suscriptor de Webhook",
+                "verbose_name_plural": "Suscriptores de Webhook",
+                "ordering": ["nombre"],
+            },
+            bases=(core.cascade.CascadeSoftDeleteMixin, models.Model),
+        ),
+        migrations.CreateModel(
+            name="EntregaWebhook",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDIENTE", "Pendiente"),
+                            ("ENTREGADA", "Entregada"),
+                            ("FALLIDA", "Fallida"),
+                        ],
+                        default="PENDIENTE",
+                        max_length=10,
+                        verbose_name="Estado",
+                    ),
+                ),
+                (
+                    "intentos",
+                    models.PositiveIntegerField(default=0, verbose_name="Intentos"),
+                ),
+                (
+                    "ultimo_error",
+                    models.TextField(blank=True, verbose_name="Último Error"),
+                ),
+                (
+                    "entregada_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Entregada"
+                    ),
+                ),
+                (
+                    "latencia_ms",
+                    models.PositiveIntegerField(
+                        blank=True, null=True, verbose_name="Latencia (ms)"
+                    ),
+                ),
+                (
+                    "evento",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="entregas",
+                        to="core.eventooutbox",
+                        verbose_name="Evento",
+                    ),
+                ),
+                (
+                    "suscriptor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="entregas",
+                        to="core.suscriptorwebhook",
+                        verbose_name="Suscriptor",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Entrega de Webhook",
+                "verbose_name_plural": "Entregas de Webhook",
+                "ordering": ["-id"],
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("status", "PENDIENTE")),
+                        fields=["suscriptor", "evento"],
+                        name="idx_entregas_pendientes",
+                    )
+                ],
+                "unique_together": {("suscriptor", "evento")},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.5 on 2026-10-19 12:35
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fail_queued_exports(apps, schema_editor):
+    """Queued exports hold a pickled query the worker no longer reads."""
+    TrabajoImportExport = apps.get_model("core", "TrabajoImportExport")
+    TrabajoImportExport.objects.filter(
+        tipo="EXPORTACION", status__in=["PENDIENTE", "EN_PROCESO"]
+    ).update(status="ERROR", mensaje_error="Reintente la exportación.", fecha_fin=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_outbox_webhooks"),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_queued_exports, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="trabajoimportexport",
+            name="consulta",
+        ),
+        migrations.AddField(
+            model_name="trabajoimportexport",
+            name="filtros",
+            field=models.JSONField(blank=True, null=True, verbose_name="Filtros"),
+        ),
+        migrations.AddField(
+            model_name="trabajoimportexport",
+            name="seleccion",
+            field=models.JSONField(blank=True, null=True, verbose_name="Selección"),
+        ),
+    ]
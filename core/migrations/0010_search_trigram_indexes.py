@@ -0,0 +1,116 @@
+# Generated by Django 5.1.5 on 2026-10-19 12:39
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking writes on large tables
+    atomic = False
+
+    dependencies = [
+        ("core", "0009_export_job_filters"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name="articulo",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("descripcion"),
+                    name="gin_trgm_ops",
+                ),
+                condition=models.Q(("deleted_at__isnull", True)),
+                name="idx_articulos_desc_trgm",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="articulo",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("marca"), name="gin_trgm_ops"
+                ),
+                condition=models.Q(("deleted_at__isnull", True)),
+                name="idx_articulos_marca_trgm",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="articulo",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("modelo"), name="gin_trgm_ops"
+                ),
+                condition=models.Q(("deleted_at__isnull", True)),
+                name="idx_articulos_modelo_trgm",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="articulo",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("codigo_fabricante"),
+                    name="gin_trgm_ops",
+                ),
+                condition=models.Q(("deleted_at__isnull", True)),
+                name="idx_articulos_codigo_trgm",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="cliente",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("razon_social"),
+                    name="gin_trgm_ops",
+                ),
+                condition=models.Q(("deleted_at__isnull", True)),
+                name="idx_clientes_razon_trgm",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="cliente",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("cuit"), name="gin_trgm_ops"
+                ),
+                condition=models.Q(("deleted_at__isnull", True)),
+                name="idx_clientes_cuit_trgm",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="cliente",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("contact_name"),
+                    name="gin_trgm_ops",
+                ),
+                condition=models.Q(("deleted_at__isnull", True)),
+                name="idx_clientes_contacto_trgm",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="proveedor",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("razon_social"),
+                    name="gin_trgm_ops",
+                ),
+                condition=models.Q(("deleted_at__isnull", True)),
+                name="idx_proveedores_razon_trgm",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="proveedor",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("cuit"), name="gin_trgm_ops"
+                ),
+                condition=models.Q(("deleted_at__isnull", True)),
+                name="idx_proveedores_cuit_trgm",
+            ),
+        ),
+    ]
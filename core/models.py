@@ -6,8 +6,12 @@ import uuid
 from django.db import models
 from django.conf import settings
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models.functions import Upper
+from safedelete.managers import SafeDeleteAllManager, SafeDeleteDeletedManager, SafeDeleteManager
 from safedelete.models import SafeDeleteModel, SOFT_DELETE_CASCADE
 from djmoney.models.fields import MoneyField
+from .cascade import CascadeQuerySet, CascadeSoftDeleteMixin
 
 
 # ==============================================================================
@@ -73,14 +77,58 @@ class UnidadCantidad(models.TextChoices):
     M3 = 'M3', 'Metro Cúbico'
 
 
+class TipoDeTrabajo(models.TextChoices):
+    """Background import/export job type enumeration."""
+    IMPORTACION = 'IMPORTACION', 'Importación'
+    EXPORTACION = 'EXPORTACION', 'Exportación'
+
+
+class StatusTrabajo(models.TextChoices):
+    """Background job status enumeration."""
+    PENDIENTE = 'PENDIENTE', 'Pendiente'
+    EN_PROCESO = 'EN_PROCESO', 'En Proceso'
+    COMPLETADO = 'COMPLETADO', 'Completado'
+    ERROR = 'ERROR', 'Error'
+
+
+class StatusEntrega(models.TextChoices):
+    """Webhook delivery status enumeration."""
+    PENDIENTE = 'PENDIENTE', 'Pendiente'
+    ENTREGADA = 'ENTREGADA', 'Entregada'
+    FALLIDA = 'FALLIDA', 'Fallida'
+
+
 # ==============================================================================
 # ABSTRACT BASE MODEL
 # ==============================================================================
 
-class BaseModel(SafeDeleteModel):
+# Index condition matching the deleted_at IS NULL filter safedelete adds to
+# every query, so indexes skip soft-deleted rows
+NOT_DELETED = models.Q(deleted_at__isnull=True)
+
+
+def trigram_index(field, name):
+    """
+    GIN trigram index for the icontains/istartswith lookups of core.search.
+
+    PostgreSQL compiles both to ``UPPER(column) LIKE UPPER(term)``, so the
+    index covers ``UPPER(column)``; trigrams serve substrings and prefixes.
+    """
+    return GinIndex(OpClass(Upper(field), name='gin_trgm_ops'), name=name, condition=NOT_DELETED)
+
+
+class BaseModel(CascadeSoftDeleteMixin, SafeDeleteModel):
     """Abstract base model with common fields."""
     _safedelete_policy = SOFT_DELETE_CASCADE
     
+    # Deletes and undeletes cascade with one UPDATE per table
+    objects = SafeDeleteManager(CascadeQuerySet)
+    all_objects = SafeDeleteAllManager(CascadeQuerySet)
+    deleted_objects = SafeDeleteDeletedManager(CascadeQuerySet)
+    
+    # Foreign keys read by __str__, used to build admin select_related paths
+    str_select_related = ()
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     
     # Audit fields
@@ -138,8 +186,12 @@ class Proveedor(BaseModel):
         verbose_name_plural = 'Proveedores'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['cuit'], name='idx_proveedores_cuit'),
-            models.Index(fields=['status'], name='idx_proveedores_status'),
+            models.Index(fields=['cuit'], name='idx_proveedores_cuit', condition=NOT_DELETED),
+            models.Index(fields=['status', '-created_at'], name='idx_proveedores_status_created', condition=NOT_DELETED),
+            models.Index(fields=['-created_at', '-id'], name='idx_proveedores_created_id', condition=NOT_DELETED),
+            models.Index(fields=['updated_at', 'id'], name='idx_proveedores_updated_id'),
+            trigram_index('razon_social', 'idx_proveedores_razon_trgm'),
+            trigram_index('cuit', 'idx_proveedores_cuit_trgm'),
         ]
     
     def __str__(self):
@@ -170,8 +222,13 @@ class Cliente(BaseModel):
         verbose_name_plural = 'Clientes'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['cuit'], name='idx_clientes_cuit'),
-            models.Index(fields=['status'], name='idx_clientes_status'),
+            models.Index(fields=['cuit'], name='idx_clientes_cuit', condition=NOT_DELETED),
+            models.Index(fields=['status', '-created_at'], name='idx_clientes_status_created', condition=NOT_DELETED),
+            models.Index(fields=['-created_at', '-id'], name='idx_clientes_created_id', condition=NOT_DELETED),
+            models.Index(fields=['updated_at', 'id'], name='idx_clientes_updated_id'),
+            trigram_index('razon_social', 'idx_clientes_razon_trgm'),
+            trigram_index('cuit', 'idx_clientes_cuit_trgm'),
+            trigram_index('contact_name', 'idx_clientes_contacto_trgm'),
         ]
     
     def __str__(self):
@@ -248,6 +305,14 @@ class Articulo(BaseModel):
     ancho_valor = models.DecimalField('Ancho', max_digits=10, decimal_places=3, null=True, blank=True)
     ancho_unidad = models.CharField('Unidad de Ancho', max_length=10, choices=UnidadLongitud.choices, null=True, blank=True)
     
+    # Unit every quantity of the article is reported in
+    unidad_base = models.CharField(
+        'Unidad Base',
+        max_length=10,
+        choices=UnidadCantidad.choices,
+        default=UnidadCantidad.UNIDAD
+    )
+    
     # Category fields
     categoria_lvl1 = models.CharField('Categoría Nivel 1', max_length=255, blank=True)
     categoria_lvl2 = models.CharField('Categoría Nivel 2', max_length=255, blank=True)
@@ -259,10 +324,16 @@ class Articulo(BaseModel):
         verbose_name_plural = 'Artículos'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['status'], name='idx_articulos_status'),
-            models.Index(fields=['familia'], name='idx_articulos_familia'),
-            models.Index(fields=['marca'], name='idx_articulos_marca'),
-            models.Index(fields=['categoria_lvl1'], name='idx_articulos_categoria_lvl1'),
+            models.Index(fields=['status', '-created_at'], name='idx_articulos_status_created', condition=NOT_DELETED),
+            models.Index(fields=['-created_at', '-id'], name='idx_articulos_created_id', condition=NOT_DELETED),
+            models.Index(fields=['familia'], name='idx_articulos_familia', condition=NOT_DELETED),
+            models.Index(fields=['marca'], name='idx_articulos_marca', condition=NOT_DELETED),
+            models.Index(fields=['categoria_lvl1'], name='idx_articulos_categoria_lvl1', condition=NOT_DELETED),
+            models.Index(fields=['updated_at', 'id'], name='idx_articulos_updated_id'),
+            trigram_index('descripcion', 'idx_articulos_desc_trgm'),
+            trigram_index('marca', 'idx_articulos_marca_trgm'),
+            trigram_index('modelo', 'idx_articulos_modelo_trgm'),
+            trigram_index('codigo_fabricante', 'idx_articulos_codigo_trgm'),
         ]
     
     def __str__(self):
@@ -285,11 +356,49 @@ class Despachante(BaseModel):
         verbose_name = 'Despachante'
         verbose_name_plural = 'Despachantes'
         ordering = ['razon_social']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='idx_despachantes_updated_id'),
+        ]
     
     def __str__(self):
         return self.razon_social
 
 
+# ==============================================================================
+# UNIT CONVERSIONS
+# ==============================================================================
+
+class ConversionUnidad(BaseModel):
+    """How many base units of an article one unit of another kind holds."""
+    
+    articulo = models.ForeignKey(
+        Articulo,
+        on_delete=models.CASCADE,
+        related_name='conversiones',
+        verbose_name='Artículo'
+    )
+    unidad = models.CharField('Unidad', max_length=10, choices=UnidadCantidad.choices)
+    factor = models.DecimalField(
+        'Factor',
+        max_digits=15,
+        decimal_places=6,
+        help_text='Unidades base contenidas en una unidad'
+    )
+    
+    class Meta:
+        verbose_name = 'Conversión de Unidad'
+        verbose_name_plural = 'Conversiones de Unidad'
+        unique_together = ['articulo', 'unidad']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='idx_conv_unidad_updated_id'),
+        ]
+    
+    str_select_related = ('articulo',)
+    
+    def __str__(self):
+        return f"{self.articulo} - 1 {self.unidad} = {self.factor} {self.articulo.unidad_base}"
+
+
 # ==============================================================================
 # JUNCTION TABLES
 # ==============================================================================
@@ -315,5 +424,178 @@ class ProveedorFormaEntrega(BaseModel):
         verbose_name_plural = 'Proveedores-Formas de Entrega'
         unique_together = ['proveedor', 'forma_entrega']
     
+    str_select_related = ('proveedor', 'forma_entrega')
+    
     def __str__(self):
         return f"{self.proveedor} - {self.forma_entrega}"
+
+
+# ==============================================================================
+# BACKGROUND JOBS
+# ==============================================================================
+
+class TrabajoImportExport(BaseModel):
+    """Import or export run by a Celery worker on behalf of an admin user."""
+    
+    tipo = models.CharField('Tipo', max_length=15, choices=TipoDeTrabajo.choices)
+    status = models.CharField(
+        'Estado',
+        max_length=15,
+        choices=StatusTrabajo.choices,
+        default=StatusTrabajo.PENDIENTE
+    )
+    modelo = models.CharField('Modelo', max_length=100)
+    formato = models.CharField('Formato', max_length=20)
+    recurso = models.PositiveSmallIntegerField('Recurso', default=0)
+    
+    # Input file for imports, generated file or error report for both types
+    archivo = models.FileField('Archivo', upload_to='trabajos/entrada/%Y/%m/', blank=True)
+    resultado = models.FileField('Resultado', upload_to='trabajos/resultado/%Y/%m/', blank=True)
+    
+    # Export selection, rebuilt by the worker through the admin: the
+    # changelist's query string (filters, search), the ids picked with an
+    # action if any, and the chosen resource fields
+    filtros = models.JSONField('Filtros', null=True, blank=True)
+    seleccion = models.JSONField('Selección', null=True, blank=True)
+    campos = models.JSONField('Campos', null=True, blank=True)
+    
+    # Progress; filas_procesadas is the resume point after a worker crash
+    total_filas = models.PositiveIntegerField('Total de Filas', default=0)
+    filas_procesadas = models.PositiveIntegerField('Filas Procesadas', default=0)
+    filas_nuevas = models.PositiveIntegerField('Filas Nuevas', default=0)
+    filas_actualizadas = models.PositiveIntegerField('Filas Actualizadas', default=0)
+    filas_eliminadas = models.PositiveIntegerField('Filas Eliminadas', default=0)
+    filas_omitidas = models.PositiveIntegerField('Filas Omitidas', default=0)
+    filas_con_error = models.PositiveIntegerField('Filas con Error', default=0)
+    errores = models.JSONField('Errores', default=list, blank=True)
+    mensaje_error = models.TextField('Mensaje de Error', blank=True)
+    
+    fecha_inicio = models.DateTimeField('Fecha de Inicio', null=True, blank=True)
+    fecha_fin = models.DateTimeField('Fecha de Fin', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Trabajo de Importación/Exportación'
+        verbose_name_plural = 'Trabajos de Importación/Exportación'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-created_at'], name='idx_trabajos_status_created', condition=NOT_DELETED),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.modelo} ({self.get_status_display()})"
+    
+    @property
+    def progreso(self):
+        """Percentage of rows processed so far."""
+        if not self.total_filas:
+            return 100 if self.status == StatusTrabajo.COMPLETADO else 0
+        return min(100, self.filas_procesadas * 100 // self.total_filas)
+
+
+# ==============================================================================
+# OUTBOX AND WEBHOOKS
+# ==============================================================================
+
+class EventoOutbox(models.Model):
+    """Status change written in the transaction that made it (no soft delete)."""
+    
+    modelo = models.CharField('Modelo', max_length=100)
+    id_entidad = models.UUIDField('ID de Entidad')
+    status_anterior = models.CharField('Estado Anterior', max_length=20, blank=True)
+    status_nuevo = models.CharField('Estado Nuevo', max_length=20)
+    created_at = models.DateTimeField('Creado', auto_now_add=True)
+    
+    # Set once the event has been copied into a delivery per subscriber
+    despachado_at = models.DateTimeField('Despachado', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Evento de Outbox'
+        verbose_name_plural = 'Eventos de Outbox'
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['id'], name='idx_outbox_pendientes', condition=models.Q(despachado_at__isnull=True)),
+            models.Index(fields=['despachado_at'], name='idx_outbox_despachado'),
+        ]
+    
+    def __str__(self):
+        return f"{self.modelo} {self.id_entidad}: {self.status_anterior or '-'} → {self.status_nuevo}"
+
+
+class SuscriptorWebhook(BaseModel):
+    """Downstream system receiving status change events by HTTP POST."""
+    
+    nombre = models.CharField('Nombre', max_length=255)
+    url = models.URLField('URL', max_length=500)
+    secreto = models.CharField(
+        'Secreto',
+        max_length=255,
+        blank=True,
+        help_text='Firma cada envío con HMAC-SHA256 en la cabecera X-Webhook-Firma'
+    )
+    modelos = ArrayField(
+        models.CharField(max_length=100),
+        verbose_name='Modelos',
+        default=list,
+        blank=True,
+        help_text='Etiquetas como procurement.Remito; vacío recibe todos'
+    )
+    activo = models.BooleanField('Activo', default=True)
+    
+    # Retry state: consecutive failed POSTs and when the next one may run;
+    # also leased while a worker is delivering
+    fallos_consecutivos = models.PositiveIntegerField('Fallos Consecutivos', default=0)
+    proximo_intento = models.DateTimeField('Próximo Intento', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Suscriptor de Webhook'
+        verbose_name_plural = 'Suscriptores de Webhook'
+        ordering = ['nombre']
+    
+    def __str__(self):
+        return self.nombre
+
+
+class EntregaWebhook(models.Model):
+    """One event to deliver to one subscriber (no soft delete)."""
+    
+    suscriptor = models.ForeignKey(
+        SuscriptorWebhook,
+        on_delete=models.CASCADE,
+        related_name='entregas',
+        verbose_name='Suscriptor'
+    )
+    evento = models.ForeignKey(
+        EventoOutbox,
+        on_delete=models.CASCADE,
+        related_name='entregas',
+        verbose_name='Evento'
+    )
+    status = models.CharField(
+        'Estado',
+        max_length=10,
+        choices=StatusEntrega.choices,
+        default=StatusEntrega.PENDIENTE
+    )
+    intentos = models.PositiveIntegerField('Intentos', default=0)
+    ultimo_error = models.TextField('Último Error', blank=True)
+    entregada_at = models.DateTimeField('Entregada', null=True, blank=True)
+    
+    # Milliseconds from the status change to the subscriber's acknowledgement
+    latencia_ms = models.PositiveIntegerField('Latencia (ms)', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Entrega de Webhook'
+        verbose_name_plural = 'Entregas de Webhook'
+        ordering = ['-id']
+        unique_together = ['suscriptor', 'evento']
+        indexes = [
+            models.Index(
+                fields=['suscriptor', 'evento'], name='idx_entregas_pendientes',
+                condition=models.Q(status=StatusEntrega.PENDIENTE),
+            ),
+        ]
+    
+    str_select_related = ('suscriptor', 'evento')
+    
+    def __str__(self):
+        return f"{self.evento} → {self.suscriptor}"
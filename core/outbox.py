@@ -0,0 +1,127 @@
+"""
+Transactional outbox of document status changes.
+
+Models with ``StatusOutboxMixin`` write an ``EventoOutbox`` row in the
+same transaction as every save that sets or changes their status, and
+``bulk_transition`` writes one per moved row next to its UPDATE, so an
+event exists if and only if the change committed. A periodic task fans
+new events out to one ``EntregaWebhook`` per interested subscriber,
+which ``core.webhooks`` delivers. Subscribers only receive events
+written after they were added.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import EntregaWebhook, EventoOutbox, StatusEntrega, SuscriptorWebhook
+
+OUTBOX_MODELS = (
+    'procurement.CotizacionProveedor',
+    'procurement.OrdenCompraProveedor',
+    'procurement.Remito',
+    'procurement.Envio',
+)
+
+# Events fanned out per transaction
+FAN_OUT_BATCH_SIZE = 1000
+
+# Marks instances whose status was not loaded
+UNKNOWN = object()
+
+
+class StatusOutboxMixin:
+    """
+    Model mixin writing an outbox event whenever a save sets the status.
+
+    The status loaded from the database is remembered on the instance;
+    when it was deferred, the stored one is read inside the transaction.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._outbox_status = instance.__dict__.get('status', UNKNOWN)
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'status' not in update_fields:
+            return super().save(*args, **kwargs)
+        previous = None if self._state.adding else getattr(self, '_outbox_status', UNKNOWN)
+        with transaction.atomic():
+            if previous is UNKNOWN:
+                previous = type(self).all_objects.filter(pk=self.pk).values_list('status', flat=True).first()
+            super().save(*args, **kwargs)
+            if self.status != previous:
+                record_events(type(self), {self.pk: previous}, self.status)
+        self._outbox_status = self.status
+
+
+def record_events(model, previous, target):
+    """Write one event per row of ``{pk: previous status}`` moved to ``target``."""
+    label = model._meta.label
+    if label not in OUTBOX_MODELS or not previous:
+        return
+    EventoOutbox.objects.bulk_create([
+        EventoOutbox(modelo=label, id_entidad=pk, status_anterior=status or '', status_nuevo=target)
+        for pk, status in previous.items()
+    ])
+
+
+# ==============================================================================
+# FAN-OUT
+# ==============================================================================
+
+def fan_out_events(batch_size=FAN_OUT_BATCH_SIZE):
+    """
+    Copy new events into one delivery per interested subscriber.
+
+    Events are locked with SKIP LOCKED and marked as dispatched in the
+    same transaction, so concurrent runs never fan out an event twice.
+    Return how many events were handled.
+    """
+    handled = 0
+    while True:
+        with transaction.atomic():
+            events = list(
+                EventoOutbox.objects.filter(despachado_at__isnull=True)
+                .select_for_update(skip_locked=True).order_by('id')[:batch_size]
+            )
+            if not events:
+                return handled
+            subscribers = list(SuscriptorWebhook.objects.filter(activo=True).only('pk', 'modelos'))
+            EntregaWebhook.objects.bulk_create([
+                EntregaWebhook(suscriptor=subscriber, evento=event)
+                for event in events
+                for subscriber in subscribers
+                if not subscriber.modelos or event.modelo in subscriber.modelos
+            ], batch_size=batch_size)
+            EventoOutbox.objects.filter(pk__in=[event.pk for event in events]).update(despachado_at=timezone.now())
+        handled += len(events)
+        if len(events) < batch_size:
+            return handled
+
+
+def get_due_subscribers():
+    """Active subscribers with pending deliveries whose backoff or lease is over."""
+    pending = EntregaWebhook.objects.filter(suscriptor=OuterRef('pk'), status=StatusEntrega.PENDIENTE)
+    return list(
+        SuscriptorWebhook.objects.filter(activo=True)
+        .exclude(proximo_intento__gt=timezone.now())
+        .filter(Exists(pending))
+        .values_list('pk', flat=True)
+    )
+
+
+def purge_outbox(days):
+    """Delete events dispatched more than ``days`` ago whose deliveries are all settled."""
+    pending = EntregaWebhook.objects.filter(evento=OuterRef('pk'), status=StatusEntrega.PENDIENTE)
+    deleted, _ = (
+        EventoOutbox.objects.filter(despachado_at__lt=timezone.now() - timedelta(days=days))
+        .exclude(Exists(pending))
+        .delete()
+    )
+    return deleted
@@ -0,0 +1,64 @@
+"""
+Paginators for large tables.
+"""
+
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset):
+    """
+    Return the planner's row estimate for a queryset, or None if unavailable.
+
+    Unfiltered querysets read ``pg_class.reltuples``; anything with a WHERE
+    clause (including the safedelete ``deleted_at IS NULL`` filter) is run
+    through ``EXPLAIN`` and the top plan node's row estimate is used.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    query = queryset.order_by().query
+    # Compiling first lets safedelete attach its deleted_at filter to the query.
+    sql, params = query.get_compiler(using=queryset.db).as_sql()
+    with connection.cursor() as cursor:
+        if not query.where and not query.distinct:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            # reltuples is -1 until the table has been vacuumed or analyzed
+            return row[0] if row and row[0] >= 0 else None
+
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that trusts planner estimates for large result sets.
+
+    Small result sets (below ``ADMIN_ESTIMATED_COUNT_THRESHOLD``) are still
+    counted exactly so short lists show accurate totals.
+    """
+
+    is_estimate = False
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query'):
+            return super().count
+        threshold = settings.ADMIN_ESTIMATED_COUNT_THRESHOLD
+        estimate = estimate_count(self.object_list)
+        self.is_estimate = estimate is not None and estimate >= threshold
+        if self.is_estimate:
+            return estimate
+        return super().count
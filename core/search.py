@@ -0,0 +1,120 @@
+"""
+Search and autocomplete over suppliers, clients and articles.
+
+The same querysets back a sync and an async view of each endpoint: the
+sync one evaluates them on its worker thread, the async one with
+``async for`` so the event loop serves other requests while the
+database answers. Autocomplete answers are cached in Redis for
+``AUTOCOMPLETE_CACHE_TTL`` seconds, since many users type the same
+prefixes; the async view reads and fills the cache with the asyncio
+client. A row created meanwhile may take that long to show up.
+"""
+
+import json
+import logging
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+from .async_redis import get_async_redis
+from .models import Articulo, Cliente, Proveedor
+
+logger = logging.getLogger(__name__)
+
+# Resource -> (model, fields matched by the search, columns returned);
+# autocomplete matches the start of the first field
+SEARCHES = {
+    'proveedores': (Proveedor, ['razon_social', 'cuit'], ['id', 'razon_social', 'cuit', 'status']),
+    'clientes': (Cliente, ['razon_social', 'cuit', 'contact_name'], ['id', 'razon_social', 'cuit', 'status']),
+    'articulos': (
+        Articulo,
+        ['descripcion', 'marca', 'modelo', 'codigo_fabricante'],
+        ['id', 'descripcion', 'marca', 'modelo', 'codigo_fabricante', 'status'],
+    ),
+}
+
+MIN_TERM_LENGTH = 2
+
+# Rows per resource in a search, and suggestions per autocomplete
+SEARCH_LIMIT = 20
+AUTOCOMPLETE_LIMIT = 10
+
+
+def get_view_permission(resource):
+    opts = SEARCHES[resource][0]._meta
+    return f'{opts.app_label}.view_{opts.model_name}'
+
+
+def clean_term(value):
+    """Return the stripped search term, or None if it is too short."""
+    term = (value or '').strip()
+    return term if len(term) >= MIN_TERM_LENGTH else None
+
+
+def get_search_queryset(resource, term):
+    """Rows of ``resource`` with ``term`` in any searched field."""
+    model, fields, columns = SEARCHES[resource]
+    condition = Q()
+    for name in fields:
+        condition |= Q(**{f'{name}__icontains': term})
+    return model.objects.filter(condition).order_by(fields[0], 'pk').values(*columns)[:SEARCH_LIMIT]
+
+
+def get_autocomplete_queryset(resource, term):
+    """Rows of ``resource`` whose first searched field starts with ``term``."""
+    model, fields, columns = SEARCHES[resource]
+    return (
+        model.objects.filter(**{f'{fields[0]}__istartswith': term})
+        .order_by(fields[0], 'pk').values(*columns)[:AUTOCOMPLETE_LIMIT]
+    )
+
+
+def get_searchable(user):
+    """Resources the user may view."""
+    return [resource for resource in SEARCHES if user.has_perm(get_view_permission(resource))]
+
+
+def dump(data):
+    return json.dumps(data, cls=DjangoJSONEncoder)
+
+
+# ==============================================================================
+# AUTOCOMPLETE CACHE
+# ==============================================================================
+
+def autocomplete_key(resource, term):
+    return f'autocompletar:{resource}:{term.lower()}'
+
+
+def read_cache(resource, term):
+    """Cached JSON body of an autocomplete, or None."""
+    try:
+        return get_redis_connection('default').get(autocomplete_key(resource, term))
+    except RedisError:
+        logger.warning('Autocomplete cache unavailable', exc_info=True)
+        return None
+
+
+def write_cache(resource, term, body):
+    try:
+        get_redis_connection('default').set(autocomplete_key(resource, term), body, ex=settings.AUTOCOMPLETE_CACHE_TTL)
+    except RedisError:
+        logger.warning('Autocomplete cache unavailable', exc_info=True)
+
+
+async def aread_cache(resource, term):
+    try:
+        return await get_async_redis().get(autocomplete_key(resource, term))
+    except RedisError:
+        logger.warning('Autocomplete cache unavailable', exc_info=True)
+        return None
+
+
+async def awrite_cache(resource, term, body):
+    try:
+        await get_async_redis().set(autocomplete_key(resource, term), body, ex=settings.AUTOCOMPLETE_CACHE_TTL)
+    except RedisError:
+        logger.warning('Autocomplete cache unavailable', exc_info=True)
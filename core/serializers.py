@@ -0,0 +1,55 @@
+"""
+Serializers for the core API.
+"""
+
+from rest_framework import serializers
+
+from .api import ReadSerializer, decode_position
+from .models import Articulo, Cliente, Proveedor
+
+
+class ProveedorSerializer(ReadSerializer):
+    """Supplier as listed by the API."""
+    
+    class Meta:
+        model = Proveedor
+        fields = [
+            'id', 'razon_social', 'cuit', 'localizacion', 'status', 'es_proveedor_nacional',
+            'created_at', 'updated_at',
+        ]
+
+
+class ClienteSerializer(ReadSerializer):
+    """Client as listed by the API."""
+    
+    class Meta:
+        model = Cliente
+        fields = [
+            'id', 'razon_social', 'cuit', 'localizacion', 'status', 'web_page', 'phone_number', 'email',
+            'contact_name', 'contact_phone', 'contact_email', 'created_at', 'updated_at',
+        ]
+
+
+class ArticuloSerializer(ReadSerializer):
+    """Article as listed by the API."""
+    
+    class Meta:
+        model = Articulo
+        fields = [
+            'id', 'descripcion', 'marca', 'modelo', 'tipo', 'codigo_fabricante', 'familia', 'sub_familia',
+            'categoria_lvl1', 'categoria_lvl2', 'categoria_lvl3', 'categoria_lvl4', 'palabras_claves', 'tags',
+            'unidad_base', 'nivel_uso', 'status', 'peso_valor', 'peso_unidad', 'created_at', 'updated_at',
+        ]
+
+
+class ChangesFeedSerializer(serializers.Serializer):
+    """Query parameters of the changes feed."""
+    
+    desde = serializers.CharField(required=False)
+    limite = serializers.IntegerField(default=10000, min_value=1, max_value=50000)
+    
+    def validate_desde(self, value):
+        try:
+            return decode_position(value)
+        except ValueError:
+            raise serializers.ValidationError('Marca inválida.')
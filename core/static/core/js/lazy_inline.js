@@ -0,0 +1,216 @@
+/*
+ * Paginated editor for LazyTabularInline.
+ *
+ * Loads existing detail lines page by page, tracks which rows were edited
+ * and posts only those rows back to the server.
+ */
+(function () {
+    'use strict';
+
+    function csrfToken() {
+        const input = document.querySelector('[name=csrfmiddlewaretoken]');
+        return input ? input.value : '';
+    }
+
+    function postJSON(url, payload) {
+        return fetch(url, {
+            method: 'POST',
+            credentials: 'same-origin',
+            headers: {'Content-Type': 'application/json', 'X-CSRFToken': csrfToken()},
+            body: JSON.stringify(payload)
+        }).then(function (response) {
+            return response.json().then(function (data) {
+                if (!response.ok) {
+                    throw data;
+                }
+                return data;
+            });
+        });
+    }
+
+    function LazyInline(root) {
+        this.root = root;
+        this.page = 1;
+        this.fields = [];
+        this.changed = {};
+        this.deleted = new Set();
+        this.status = root.querySelector('.lazy-inline-status');
+
+        root.querySelector('.lazy-inline-save').addEventListener('click', this.save.bind(this));
+        root.querySelector('.lazy-inline-delete').addEventListener('click', this.bulk.bind(this, 'delete'));
+        root.querySelector('.lazy-inline-bulk-apply').addEventListener('click', this.bulk.bind(this, 'update'));
+        this.load(1);
+    }
+
+    LazyInline.prototype.setStatus = function (text) {
+        this.status.textContent = text;
+    };
+
+    LazyInline.prototype.selectedIds = function () {
+        return Array.from(this.root.querySelectorAll('tbody .lazy-inline-select:checked')).map(function (el) {
+            return el.value;
+        });
+    };
+
+    LazyInline.prototype.load = function (page, message) {
+        const self = this;
+        if (Object.keys(this.changed).length && !window.confirm('Hay cambios sin guardar en esta página. ¿Descartarlos?')) {
+            return;
+        }
+        this.changed = {};
+        this.setStatus('Cargando…');
+        fetch(this.root.dataset.linesUrl + '?page=' + page, {credentials: 'same-origin'})
+            .then(function (response) { return response.json(); })
+            .then(function (data) {
+                self.page = data.page;
+                self.fields = data.fields;
+                self.renderHeader();
+                self.renderRows(data.rows);
+                self.renderPager(data);
+                self.setStatus(message || '');
+            });
+    };
+
+    LazyInline.prototype.renderHeader = function () {
+        const row = this.root.querySelector('thead tr');
+        const select = this.root.querySelector('.lazy-inline-bulk-field');
+        row.innerHTML = '<th></th>';
+        select.innerHTML = '';
+        this.fields.forEach(function (field) {
+            const th = document.createElement('th');
+            th.textContent = field.label;
+            row.appendChild(th);
+            if (!field.readonly) {
+                select.add(new Option(field.label, field.name));
+            }
+        });
+        row.insertAdjacentHTML('beforeend', '<th>Eliminar</th>');
+    };
+
+    LazyInline.prototype.renderInput = function (field, cell, rowId) {
+        const self = this;
+        let input;
+        if (field.choices.length) {
+            input = document.createElement('select');
+            field.choices.forEach(function (choice) {
+                input.add(new Option(choice[1], choice[0]));
+            });
+        } else {
+            input = document.createElement('input');
+            input.type = 'text';
+        }
+        input.value = cell.value === null ? '' : cell.value;
+        input.addEventListener('change', function () {
+            self.changed[rowId] = self.changed[rowId] || {id: rowId};
+            self.changed[rowId][field.name] = input.value;
+        });
+        return input;
+    };
+
+    LazyInline.prototype.renderRows = function (rows) {
+        const self = this;
+        const tbody = this.root.querySelector('tbody');
+        tbody.innerHTML = '';
+        rows.forEach(function (row) {
+            const tr = document.createElement('tr');
+            tr.insertAdjacentHTML('beforeend', '<td><input type="checkbox" class="lazy-inline-select"></td>');
+            tr.querySelector('.lazy-inline-select').value = row.id;
+            self.fields.forEach(function (field) {
+                const td = document.createElement('td');
+                const cell = row.values[field.name];
+                if (field.readonly) {
+                    td.textContent = cell.display;
+                } else {
+                    td.appendChild(self.renderInput(field, cell, row.id));
+                }
+                tr.appendChild(td);
+            });
+            const remove = document.createElement('input');
+            remove.type = 'checkbox';
+            remove.checked = self.deleted.has(row.id);
+            remove.addEventListener('change', function () {
+                if (remove.checked) {
+                    self.deleted.add(row.id);
+                } else {
+                    self.deleted.delete(row.id);
+                }
+            });
+            const td = document.createElement('td');
+            td.appendChild(remove);
+            tr.appendChild(td);
+            tbody.appendChild(tr);
+        });
+    };
+
+    LazyInline.prototype.renderPager = function (data) {
+        const pager = this.root.querySelector('.lazy-inline-pager');
+        pager.innerHTML = '';
+        if (data.page > 1) {
+            pager.appendChild(this.pagerLink('‹ Anterior', data.page - 1));
+        }
+        pager.appendChild(document.createTextNode(' Página ' + data.page + ' de ' + data.num_pages + ' (' + data.count + ' líneas) '));
+        if (data.page < data.num_pages) {
+            pager.appendChild(this.pagerLink('Siguiente ›', data.page + 1));
+        }
+    };
+
+    LazyInline.prototype.pagerLink = function (text, page) {
+        const self = this;
+        const link = document.createElement('a');
+        link.href = '#';
+        link.textContent = text;
+        link.addEventListener('click', function (event) {
+            event.preventDefault();
+            self.load(page);
+        });
+        return link;
+    };
+
+    LazyInline.prototype.save = function () {
+        const self = this;
+        const rows = Object.values(this.changed);
+        if (!rows.length && !this.deleted.size) {
+            return;
+        }
+        this.setStatus('Guardando…');
+        postJSON(this.root.dataset.saveUrl, {rows: rows, deleted: Array.from(this.deleted)})
+            .then(function (data) {
+                self.changed = {};
+                self.deleted.clear();
+                self.load(self.page, data.updated + ' modificadas, ' + data.deleted + ' eliminadas');
+            })
+            .catch(function (data) {
+                self.setStatus('Errores: ' + JSON.stringify(data.errors || data.error));
+            });
+    };
+
+    LazyInline.prototype.bulk = function (action) {
+        const self = this;
+        const ids = this.selectedIds();
+        if (!ids.length) {
+            return;
+        }
+        const payload = {action: action, ids: ids};
+        if (action === 'update') {
+            const values = {};
+            values[this.root.querySelector('.lazy-inline-bulk-field').value] = this.root.querySelector('.lazy-inline-bulk-value').value;
+            payload.values = values;
+        } else if (!window.confirm('¿Eliminar ' + ids.length + ' líneas?')) {
+            return;
+        }
+        postJSON(this.root.dataset.bulkUrl, payload)
+            .then(function (data) {
+                self.changed = {};
+                self.load(self.page, data.count + ' líneas actualizadas');
+            })
+            .catch(function (data) {
+                self.setStatus('Errores: ' + JSON.stringify(data.errors || data.error));
+            });
+    };
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('.lazy-inline').forEach(function (root) {
+            new LazyInline(root);
+        });
+    });
+})();
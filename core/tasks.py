@@ -0,0 +1,299 @@
+"""
+Celery tasks for background jobs of the core app.
+"""
+
+import logging
+
+import tablib
+from celery import shared_task
+from django.apps import apps
+from django.conf import settings
+from django.contrib import admin
+from django.core.files.base import ContentFile
+from django.db import OperationalError, transaction
+from django.db.models import F
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+from django.utils.http import urlencode
+
+from . import metrics, outbox, webhooks
+from .archive import purge_soft_deleted
+from .models import TrabajoImportExport, StatusTrabajo
+
+logger = logging.getLogger(__name__)
+
+# Cap on the row errors kept on the job; the full list goes to the report file
+MAX_STORED_ERRORS = 1000
+
+
+def get_model_admin(job):
+    """Return the admin registered for the job's model."""
+    return admin.site._registry[apps.get_model(job.modelo)]
+
+
+def get_export_queryset(model_admin, job):
+    """
+    Rebuild the changelist queryset the job's user exported.
+
+    The admin applies the stored query string as it did in the browser,
+    with the user's permissions, so the export follows the code deployed
+    when it runs.
+    """
+    request = HttpRequest()
+    request.method = 'GET'
+    request.GET = QueryDict(urlencode(job.filtros or {}, doseq=True))
+    request.user = job.created_by
+    queryset = model_admin.get_export_queryset(request)
+    if job.seleccion is not None:
+        queryset = queryset.filter(pk__in=job.seleccion)
+    return queryset
+
+
+def get_format(formats, title):
+    """Return an instance of the import/export format with the given title."""
+    for format_class in formats:
+        if format_class().get_title() == title:
+            return format_class()
+    raise ValueError(f'Formato no soportado: {title}')
+
+
+def start_job(job_id):
+    """Lock the job and mark it as running; return None if already finished."""
+    with transaction.atomic():
+        job = TrabajoImportExport.objects.select_for_update().get(pk=job_id)
+        if job.status in (StatusTrabajo.COMPLETADO, StatusTrabajo.ERROR):
+            return None
+        job.status = StatusTrabajo.EN_PROCESO
+        job.fecha_inicio = job.fecha_inicio or timezone.now()
+        job.save(update_fields=['status', 'fecha_inicio', 'updated_at'])
+    return job
+
+
+def fail_job(job, exc):
+    """Record an unrecoverable error on the job."""
+    logger.exception('Background %s job %s failed', job.tipo, job.pk)
+    TrabajoImportExport.objects.filter(pk=job.pk).update(
+        status=StatusTrabajo.ERROR,
+        mensaje_error=str(exc),
+        fecha_fin=timezone.now(),
+        updated_at=timezone.now(),
+    )
+
+
+def chunk_errors(result, offset):
+    """Flatten the row errors of an import result, numbered from the file start."""
+    errors = []
+    for number, row_errors in result.row_errors():
+        for error in row_errors:
+            errors.append({'fila': offset + number, 'error': str(error.error)})
+    for row in result.invalid_rows:
+        for field_name, messages in row.error_dict.items():
+            errors.append({'fila': offset + row.number, 'error': f'{field_name}: {"; ".join(messages)}'})
+    for error in result.base_errors:
+        errors.append({'fila': None, 'error': str(error.error)})
+    return errors
+
+
+@shared_task(
+    bind=True,
+    acks_late=True,
+    reject_on_worker_lost=True,
+    autoretry_for=(OperationalError,),
+    retry_backoff=True,
+    max_retries=5,
+)
+def run_import_job(self, job_id):
+    """
+    Import the job's file in chunks, one transaction per chunk.
+
+    The chunk and the progress counters commit together, so a retry after
+    a crash or a redelivered message resumes from ``filas_procesadas``
+    without importing any row twice.
+    """
+    job = start_job(job_id)
+    if job is None:
+        return
+
+    try:
+        model_admin = get_model_admin(job)
+        input_format = get_format(model_admin.get_import_formats(), job.formato)
+        if not input_format.is_binary():
+            input_format.encoding = model_admin.from_encoding
+        with job.archivo.open('rb') as stream:
+            dataset = input_format.create_dataset(stream.read())
+        resource_class = model_admin.get_import_resource_classes(None)[job.recurso]
+        resource = resource_class(**model_admin.get_import_resource_kwargs(None))
+    except OperationalError:
+        raise
+    except Exception as exc:
+        fail_job(job, exc)
+        return
+
+    if job.total_filas != len(dataset):
+        job.total_filas = len(dataset)
+        job.save(update_fields=['total_filas', 'updated_at'])
+
+    chunk_size = settings.IMPORT_EXPORT_JOB_CHUNK_SIZE
+    for start in range(job.filas_procesadas, len(dataset), chunk_size):
+        chunk = tablib.Dataset(*dataset[start:start + chunk_size], headers=dataset.headers)
+        with transaction.atomic():
+            result = resource.import_data(
+                chunk,
+                dry_run=False,
+                raise_errors=False,
+                use_transactions=True,
+                file_name=job.archivo.name,
+                user=job.created_by,
+            )
+            errors = chunk_errors(result, start)
+            counters = {'filas_procesadas': F('filas_procesadas') + len(chunk)}
+            if result.has_errors():
+                # import_data rolled the whole chunk back
+                failed = len(result.row_errors()) + len(result.invalid_rows)
+                counters['filas_con_error'] = F('filas_con_error') + failed
+                counters['filas_omitidas'] = F('filas_omitidas') + len(chunk) - failed
+            else:
+                counters.update(
+                    filas_nuevas=F('filas_nuevas') + result.totals['new'],
+                    filas_actualizadas=F('filas_actualizadas') + result.totals['update'],
+                    filas_eliminadas=F('filas_eliminadas') + result.totals['delete'],
+                    filas_omitidas=F('filas_omitidas') + result.totals['skip'],
+                    filas_con_error=F('filas_con_error') + result.totals['invalid'],
+                )
+            job.errores = (job.errores + errors)[:MAX_STORED_ERRORS]
+            TrabajoImportExport.objects.filter(pk=job.pk).update(
+                errores=job.errores, updated_at=timezone.now(), **counters,
+            )
+
+    job.refresh_from_db()
+    if job.errores:
+        report = tablib.Dataset(headers=['Fila', 'Error'])
+        for error in job.errores:
+            report.append([error['fila'], error['error']])
+        job.resultado.save(f'errores-{job.pk}.csv', ContentFile(report.export('csv')), save=False)
+    job.status = StatusTrabajo.COMPLETADO
+    job.fecha_fin = timezone.now()
+    job.save(update_fields=['resultado', 'status', 'fecha_fin', 'updated_at'])
+
+
+@shared_task(
+    bind=True,
+    acks_late=True,
+    reject_on_worker_lost=True,
+    autoretry_for=(OperationalError,),
+    retry_backoff=True,
+    max_retries=5,
+)
+def run_export_job(self, job_id):
+    """
+    Export the job's changelist selection in chunks and store the file.
+
+    Exports do not write to the database, so a retry starts over and the
+    result file is only saved once every chunk has been rendered.
+    """
+    job = start_job(job_id)
+    if job is None:
+        return
+
+    try:
+        model_admin = get_model_admin(job)
+        file_format = get_format(model_admin.get_export_formats(), job.formato)
+        queryset = get_export_queryset(model_admin, job)
+        resource_class = model_admin.get_export_resource_classes(None)[job.recurso]
+        resource = resource_class(**model_admin.get_export_resource_kwargs(None))
+
+        pks = list(queryset.values_list('pk', flat=True))
+        TrabajoImportExport.objects.filter(pk=job.pk).update(
+            total_filas=len(pks), filas_procesadas=0, updated_at=timezone.now(),
+        )
+
+        dataset = None
+        chunk_size = settings.IMPORT_EXPORT_JOB_CHUNK_SIZE
+        for start in range(0, len(pks), chunk_size):
+            chunk = resource.export(
+                queryset=queryset.filter(pk__in=pks[start:start + chunk_size]),
+                export_fields=job.campos,
+                force_native_type=file_format.is_binary(),
+            )
+            if dataset is None:
+                dataset = chunk
+            else:
+                dataset.extend(chunk)
+            TrabajoImportExport.objects.filter(pk=job.pk).update(
+                filas_procesadas=F('filas_procesadas') + len(chunk), updated_at=timezone.now(),
+            )
+        if dataset is None:
+            dataset = resource.export(queryset=queryset.none(), export_fields=job.campos)
+
+        data = file_format.export_data(dataset)
+        if not file_format.is_binary():
+            data = data.encode(model_admin.to_encoding or 'utf-8')
+    except OperationalError:
+        raise
+    except Exception as exc:
+        fail_job(job, exc)
+        return
+
+    job.refresh_from_db()
+    filename = f'{model_admin.model.__name__}-{job.pk}.{file_format.get_extension()}'
+    job.resultado.save(filename, ContentFile(data), save=False)
+    job.status = StatusTrabajo.COMPLETADO
+    job.fecha_fin = timezone.now()
+    job.save(update_fields=['resultado', 'status', 'fecha_fin', 'updated_at'])
+
+
+@shared_task(
+    acks_late=True,
+    autoretry_for=(OperationalError,),
+    retry_backoff=True,
+    max_retries=3,
+)
+def purge_soft_deleted_rows(days=None):
+    """Archive and hard-delete long soft-deleted rows; scheduled nightly."""
+    purged = purge_soft_deleted(days=days)
+    logger.info('Purged soft-deleted rows: %s', purged)
+    return purged
+
+
+@shared_task
+def reconcile_dashboard_metrics():
+    """Rebuild the dashboard counters from the database."""
+    return metrics.reconcile()
+
+
+@shared_task(
+    acks_late=True,
+    autoretry_for=(OperationalError,),
+    retry_backoff=True,
+    max_retries=3,
+)
+def dispatch_outbox():
+    """Fan new outbox events out and queue a delivery per due subscriber; scheduled every few seconds."""
+    events = outbox.fan_out_events()
+    for subscriber_pk in outbox.get_due_subscribers():
+        deliver_webhooks.delay(str(subscriber_pk))
+    return events
+
+
+@shared_task(
+    acks_late=True,
+    autoretry_for=(OperationalError,),
+    retry_backoff=True,
+    max_retries=3,
+)
+def deliver_webhooks(subscriber_pk):
+    """POST a subscriber's pending events in batches until none are left or one fails."""
+    return webhooks.deliver(subscriber_pk)
+
+
+@shared_task(
+    acks_late=True,
+    autoretry_for=(OperationalError,),
+    retry_backoff=True,
+    max_retries=3,
+)
+def purge_outbox():
+    """Delete settled outbox events past their retention; scheduled nightly."""
+    deleted = outbox.purge_outbox(settings.OUTBOX_RETENTION_DAYS)
+    logger.info('Purged outbox rows: %s', deleted)
+    return deleted
@@ -1,3 +1,672 @@
-from django.test import TestCase
+"""
+Tests for core models and admin.
+"""
 
-# Create your tests here.
+import base64
+import csv
+import itertools
+import json
+import tempfile
+from io import StringIO
+import uuid
+from contextlib import suppress
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from django.apps import apps
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, models, transaction
+from django.db.models import ProtectedError
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, reverse
+from django.utils import timezone
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+from safedelete.models import is_safedelete_cls
+
+from .admin_mixins import QueryBudgetAdminMixin
+from .archive import ARCHIVE_ROOT, purge_soft_deleted
+from .checks import check_async_views_not_atomic
+from procurement.models import (
+    Actividad, Cotizacion, CotizacionSolped, DetalleCotizacionProveedor, DetalleOrdenCompraCliente,
+    DetalleOrdenCompraProveedor, DetalleRemito, DetalleSolped, Envio, OrdenCompraProveedor,
+    PedidoCotizacionSolped, PedidoDeCotizacion, Remito, Solped, StatusRemito, TipoDeActividad, TipoDeEntidad,
+)
+
+from .models import (
+    Articulo, Cliente, EntregaWebhook, EventoOutbox, Proveedor, ProveedorFormaEntrega, StatusEntrega, StatusProveedor,
+    StatusTrabajo, SuscriptorWebhook, TipoDeTrabajo, TrabajoImportExport, UnidadCantidad,
+)
+from .search import autocomplete_key, get_autocomplete_queryset, get_search_queryset
+from .tasks import run_export_job, run_import_job
+from .throttling import BUCKET_PREFIX, get_throttle_stats
+
+
+# Values the tests covering every model set besides foreign keys: those
+# the database requires, and a distinct row for one side of unique_together
+SAMPLE_VALUES = {
+    get_user_model(): lambda n: {'email': f'usuario{n}@example.com'},
+    Solped: lambda n: {'nro_solped': n},
+    DetalleSolped: lambda n: {'cantidad_valor': n, 'cantidad_unidad': UnidadCantidad.UNIDAD},
+    DetalleCotizacionProveedor: lambda n: {
+        'cantidad_valor': n, 'cantidad_unidad': UnidadCantidad.UNIDAD, 'precio_unitario_valor': 10,
+    },
+    DetalleOrdenCompraProveedor: lambda n: {
+        'cantidad_valor': n, 'cantidad_unidad': UnidadCantidad.UNIDAD, 'precio_unitario_valor': 10,
+    },
+    DetalleOrdenCompraCliente: lambda n: {
+        'cantidad_valor': n, 'cantidad_unidad': UnidadCantidad.UNIDAD, 'precio_valor': 10,
+    },
+    DetalleRemito: lambda n: {'cantidad_valor': n, 'cantidad_unidad': UnidadCantidad.UNIDAD},
+    Envio: lambda n: {'numero_seguimiento': f'SEG-{n}'},
+    Actividad: lambda n: {
+        'tipo': TipoDeActividad.UPDATE, 'id_entidad': uuid.uuid4(), 'tipo_entidad': TipoDeEntidad.SOLPED,
+    },
+    EventoOutbox: lambda n: {
+        'modelo': 'procurement.Remito', 'id_entidad': uuid.uuid4(), 'status_nuevo': StatusRemito.BORRADOR,
+    },
+    EntregaWebhook: lambda n: {'evento': EventoOutbox.objects.create(**SAMPLE_VALUES[EventoOutbox](n))},
+    ProveedorFormaEntrega: lambda n: {'proveedor': Proveedor.objects.create(razon_social=f'Proveedor {n}')},
+    TrabajoImportExport: lambda n: {
+        'tipo': TipoDeTrabajo.EXPORTACION, 'modelo': 'core.Proveedor', 'formato': 'csv',
+    },
+}
+
+
+def with_related(model, values, related):
+    """
+    Return ``values`` with each required foreign key they leave out set to
+    the shared row of its model in ``related``.
+
+    Shared rows missing from ``related`` are created with their foreign keys
+    only; rows that need other values must be put there beforehand.
+    """
+    values = dict(values)
+    for field in model._meta.concrete_fields:
+        if field.is_relation and not field.null and field.name not in values:
+            target = field.related_model
+            if target not in related:
+                related[target] = target.objects.create(**with_related(target, {}, related))
+            values[field.name] = related[target]
+    return values
+
+
+def build_samples(model, count, related):
+    """Build ``count`` unsaved rows of ``model`` with the values of SAMPLE_VALUES."""
+    values = SAMPLE_VALUES.get(model, lambda n: {})
+    return [model(**with_related(model, values(n), related)) for n in range(1, count + 1)]
+
+
+def drop_other_indexes(model, keep):
+    """
+    Drop every index of ``model``'s table but ``keep`` for the rest of the
+    transaction, constraints included.
+
+    EXPLAIN then tells whether ``keep`` can serve a query, whichever of
+    several qualifying indexes the planner would otherwise prefer.
+    """
+    with connection.cursor() as cursor:
+        # ALTER TABLE refuses tables with deferred foreign key checks pending
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        cursor.execute(
+            """
+            SELECT i.indexrelid::regclass::text, c.conname
+            FROM pg_index i
+            LEFT JOIN pg_constraint c
+                ON c.conindid = i.indexrelid AND c.conrelid = i.indrelid AND c.contype IN ('p', 'u')
+            WHERE i.indrelid = %s::regclass AND i.indexrelid <> %s::regclass
+            """,
+            [model._meta.db_table, keep],
+        )
+        table = connection.ops.quote_name(model._meta.db_table)
+        for index, constraint in cursor.fetchall():
+            if constraint:
+                # Foreign keys pointing at the table go too, until the rollback
+                cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT {connection.ops.quote_name(constraint)} CASCADE')
+            else:
+                cursor.execute(f'DROP INDEX {index}')
+
+
+def redis_available():
+    try:
+        return get_redis_connection('default').ping()
+    except Exception:
+        return False
+
+
+class ChangelistQueryBudgetTests(TestCase):
+    """Every budgeted changelist must not issue queries per row."""
+
+    rows = 1000
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser('admin@example.com', 'password')
+        self.client.force_login(self.user)
+
+    def test_changelists_stay_within_query_budget(self):
+        related = {get_user_model(): self.user, Solped: Solped.objects.create(nro_solped=0)}
+        for model, model_admin in admin.site._registry.items():
+            if not isinstance(model_admin, QueryBudgetAdminMixin):
+                continue
+            with self.subTest(model=model._meta.label):
+                model.objects.bulk_create(build_samples(model, self.rows, related))
+                url = reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist')
+                with mock.patch.object(model_admin, 'list_per_page', self.rows):
+                    with CaptureQueriesContext(connection) as queries:
+                        response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(
+                    len(queries), model_admin.query_budget,
+                    queries.captured_queries[-1]['sql'],
+                )
+
+    @override_settings(DEBUG=True)
+    def test_over_budget_changelist_is_logged(self):
+        model, model_admin = next(
+            (model, model_admin) for model, model_admin in admin.site._registry.items()
+            if isinstance(model_admin, QueryBudgetAdminMixin)
+        )
+        url = reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist')
+        with mock.patch.object(model_admin, 'query_budget', 0), self.assertLogs('core.admin_mixins', 'WARNING') as logs:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertIn(f'{model._meta.label} changelist ran', logs.output[0])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Partial indexes and EXPLAIN need PostgreSQL')
+class PartialIndexPlanTests(TestCase):
+    """Queries through the safedelete manager must be able to use the partial indexes."""
+
+    rows = 200
+
+    def test_partial_indexes_qualify(self):
+        related = {Solped: Solped.objects.create(nro_solped=0)}
+        for model in apps.get_models():
+            if not is_safedelete_cls(model):
+                continue
+            # Expression (search) indexes are checked by SearchIndexPlanTests
+            indexes = [index for index in model._meta.indexes if index.condition is not None and index.fields]
+            if not indexes:
+                continue
+            instances = model.objects.bulk_create(build_samples(model, self.rows, related))
+            model.all_objects.filter(pk__in=[obj.pk for obj in instances[::2]]).update(
+                deleted_at=timezone.now()
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+                # Tables this small are cheaper to scan; only ask whether an index qualifies
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            live = instances[1]
+            for index in indexes:
+                field = model._meta.get_field(index.fields[0].lstrip('-'))
+                # Columns with a full FK or unique index could legitimately use either
+                if field.is_relation or field.unique:
+                    continue
+                with self.subTest(index=index.name), transaction.atomic():
+                    drop_other_indexes(model, index.name)
+                    queryset = model.objects.filter(**{field.name: getattr(live, field.attname)})
+                    if len(index.fields) > 1:
+                        queryset = queryset.order_by(*index.fields[1:])
+                    self.assertIn(index.name, queryset.explain())
+                    transaction.set_rollback(True)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Partial indexes and EXPLAIN need PostgreSQL')
+class OutboxIndexPlanTests(TestCase):
+    """Fan-out and delivery can read the outbox and the deliveries through their partial indexes."""
+
+    def setUp(self):
+        self.subscriber = SuscriptorWebhook.objects.create(nombre='ERP', url='http://erp.example.com/hooks')
+        events = EventoOutbox.objects.bulk_create([EventoOutbox(**SAMPLE_VALUES[EventoOutbox](n)) for n in range(200)])
+        EventoOutbox.objects.filter(pk__in=[event.pk for event in events[::2]]).update(despachado_at=timezone.now())
+        EntregaWebhook.objects.bulk_create([
+            EntregaWebhook(suscriptor=self.subscriber, evento=event, status=status)
+            for event, status in zip(events, itertools.cycle([StatusEntrega.PENDIENTE, StatusEntrega.ENTREGADA]))
+        ])
+        with connection.cursor() as cursor:
+            for model in (EventoOutbox, EntregaWebhook):
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+            # Tables this small are cheaper to scan; only ask whether an index qualifies
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertIndexQualifies(self, queryset, index):
+        with transaction.atomic():
+            drop_other_indexes(queryset.model, index)
+            self.assertIn(index, queryset.explain())
+            transaction.set_rollback(True)
+
+    def test_pending_events(self):
+        self.assertIndexQualifies(
+            EventoOutbox.objects.filter(despachado_at__isnull=True).order_by('id')[:100], 'idx_outbox_pendientes',
+        )
+
+    def test_pending_deliveries(self):
+        self.assertIndexQualifies(
+            self.subscriber.entregas.filter(status=StatusEntrega.PENDIENTE).order_by('evento_id')[:100],
+            'idx_entregas_pendientes',
+        )
+
+
+@skipUnless(redis_available(), 'Token buckets need Redis')
+class TokenBucketThrottleTests(TestCase):
+    """API requests past a bucket's burst get 429 with Retry-After and are counted."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser('erp@example.com', 'password', rol='VENDEDOR')
+        self.client.force_login(self.user)
+        self.addCleanup(get_redis_connection('default').delete, f'{BUCKET_PREFIX}:user:{self.user.pk}')
+        self.url = reverse('core:proveedor-list')
+
+    def throttled(self, scope):
+        return get_throttle_stats().get((scope, 'throttled'), 0)
+
+    @override_settings(API_THROTTLE_ROLES={'VENDEDOR': ('60/min', 3)})
+    def test_role_bucket(self):
+        before = self.throttled('rol:VENDEDOR')
+        self.assertEqual([self.client.get(self.url).status_code for _ in range(3)], [200] * 3)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(self.throttled('rol:VENDEDOR'), before + 1)
+
+    @override_settings(API_THROTTLE_CLIENTS={'erp@example.com': ('60/min', 1)})
+    def test_client_bucket_overrides_role(self):
+        before = self.throttled('cliente:erp@example.com')
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(self.client.get(self.url).status_code, 429)
+        self.assertEqual(self.throttled('cliente:erp@example.com'), before + 1)
+
+
+class SearchViewTests(TestCase):
+    """Search and autocomplete answer through the handler, ATOMIC_REQUESTS notwithstanding."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser('compras@example.com', 'password')
+        Proveedor.objects.create(razon_social='Acme Industrial', cuit='30-11111111-1')
+        Proveedor.objects.create(razon_social='Beta Servicios Acme', cuit='30-22222222-2')
+        Articulo.objects.create(descripcion='Válvula esférica', marca='Acme')
+        for term in ('ac', 'be'):
+            self.addCleanup(self.forget_autocomplete, term)
+
+    def forget_autocomplete(self, term):
+        with suppress(RedisError):
+            get_redis_connection('default').delete(autocomplete_key('proveedores', term))
+
+    async def test_search(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('core:search'), {'q': 'acme'})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()
+        self.assertEqual(
+            [row['razon_social'] for row in results['proveedores']],
+            ['Acme Industrial', 'Beta Servicios Acme'],
+        )
+        self.assertEqual([row['descripcion'] for row in results['articulos']], ['Válvula esférica'])
+        self.assertEqual(results['clientes'], [])
+
+    async def test_autocomplete_matches_prefix(self):
+        await self.async_client.aforce_login(self.user)
+        url = reverse('core:autocomplete', args=['proveedores'])
+        for term, expected in (('ac', ['Acme Industrial']), ('be', ['Beta Servicios Acme'])):
+            # The second request of each term is answered from the cache
+            for _ in range(2):
+                response = await self.async_client.get(url, {'q': term})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual([row['razon_social'] for row in response.json()['results']], expected)
+
+    async def test_rejected_requests(self):
+        url = reverse('core:autocomplete', args=['proveedores'])
+        self.assertEqual((await self.async_client.get(url, {'q': 'ac'})).status_code, 403)
+        await self.async_client.aforce_login(self.user)
+        self.assertEqual((await self.async_client.get(url, {'q': 'a'})).status_code, 400)
+        missing = reverse('core:autocomplete', args=['remitos'])
+        self.assertEqual((await self.async_client.get(missing, {'q': 'ac'})).status_code, 404)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Trigram indexes and EXPLAIN need PostgreSQL')
+class SearchIndexPlanTests(TestCase):
+    """Search and autocomplete lookups can use the trigram indexes."""
+
+    def test_planner_uses_trigram_indexes(self):
+        Proveedor.objects.bulk_create(
+            [Proveedor(razon_social=f'Proveedor {n}', cuit=f'30-{n:08d}-1') for n in range(200)]
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Proveedor._meta.db_table}')
+            # Tables this small are cheaper to scan; only ask whether an index qualifies
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = get_search_queryset('proveedores', 'acme').explain()
+        self.assertIn('idx_proveedores_razon_trgm', plan)
+        self.assertIn('idx_proveedores_cuit_trgm', plan)
+        self.assertIn('idx_proveedores_razon_trgm', get_autocomplete_queryset('proveedores', 'acm').explain())
+
+
+class AsyncViewAtomicCheckTests(TestCase):
+    """Every routed async view opts out of ATOMIC_REQUESTS."""
+
+    def test_routed_views(self):
+        self.assertEqual(check_async_views_not_atomic(), [])
+
+    @mock.patch.dict(connection.settings_dict, ATOMIC_REQUESTS=True)
+    def test_atomic_async_view_is_reported(self):
+        async def atomic_view(request):
+            pass
+
+        @transaction.non_atomic_requests
+        async def non_atomic_view(request):
+            pass
+
+        errors = check_async_views_not_atomic(patterns=[
+            path('atomica/', atomic_view), path('no-atomica/', non_atomic_view),
+        ])
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+        self.assertIn("'atomica/'", errors[0].msg)
+
+
+class CascadeSoftDeleteTests(TestCase):
+    """Set-based soft-delete cascade and undelete of a document graph."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser('compras@example.com', 'password')
+        self.restorer = get_user_model().objects.create_superuser('supervisor@example.com', 'password')
+        self.cliente = Cliente.objects.create(razon_social='Minera del Sur')
+        articulo = Articulo.objects.create(descripcion='Válvula esférica')
+        self.solped = Solped.objects.create(nro_solped=1001)
+        self.lines = [
+            DetalleSolped.objects.create(
+                solped=self.solped, articulo=articulo, cantidad_valor=quantity, cantidad_unidad=UnidadCantidad.UNIDAD,
+            )
+            for quantity in (5, 10)
+        ]
+        self.junctions = [
+            PedidoCotizacionSolped.objects.create(
+                solped=self.solped, pedido_cotizacion=PedidoDeCotizacion.objects.create(cliente=self.cliente),
+            ),
+            CotizacionSolped.objects.create(
+                solped=self.solped, cotizacion=Cotizacion.objects.create(cliente=self.cliente),
+            ),
+        ]
+
+    def reload(self, instance):
+        return type(instance).all_objects.get(pk=instance.pk)
+
+    def test_delete_and_undelete(self):
+        total, counts = self.solped.delete(user=self.user)
+        self.assertEqual(total, 5)
+        self.assertEqual(counts, {
+            'procurement.Solped': 1,
+            'procurement.DetalleSolped': 2,
+            'procurement.PedidoCotizacionSolped': 1,
+            'procurement.CotizacionSolped': 1,
+        })
+        solped = self.reload(self.solped)
+        self.assertIsNotNone(solped.deleted_at)
+        self.assertEqual(solped.deleted_by, self.user)
+        self.assertFalse(solped.deleted_by_cascade)
+        for row in self.lines + self.junctions:
+            row = self.reload(row)
+            self.assertEqual(row.deleted_at, solped.deleted_at)
+            self.assertEqual(row.deleted_by, self.user)
+            self.assertTrue(row.deleted_by_cascade)
+        # The linked documents themselves stay live
+        self.assertTrue(PedidoDeCotizacion.objects.filter(pk=self.junctions[0].pedido_cotizacion_id).exists())
+        self.assertEqual(
+            list(Actividad.objects.filter(id_entidad=self.solped.pk).values_list('tipo', 'data')),
+            [('DELETE', {'origen': 'procurement.Solped', 'cascada': False})],
+        )
+
+        total, _ = solped.undelete(user=self.restorer)
+        self.assertEqual(total, 5)
+        for row in [solped] + self.lines + self.junctions:
+            row = self.reload(row)
+            self.assertIsNone(row.deleted_at)
+            self.assertIsNone(row.deleted_by)
+            self.assertFalse(row.deleted_by_cascade)
+            self.assertEqual(row.updated_by, self.restorer)
+        self.assertEqual(Actividad.objects.filter(id_entidad=self.solped.pk, tipo='UPDATE').count(), 1)
+
+    def test_rows_deleted_on_their_own_stay_deleted(self):
+        removed = self.lines[0]
+        removed.delete(user=self.user)
+        self.solped.delete(user=self.user)
+        self.assertFalse(self.reload(removed).deleted_by_cascade)
+
+        total, counts = self.reload(self.solped).undelete(user=self.restorer)
+        self.assertEqual(counts['procurement.DetalleSolped'], 1)
+        self.assertIsNotNone(self.reload(removed).deleted_at)
+        self.assertIsNone(self.reload(self.lines[1]).deleted_at)
+        self.assertEqual(list(self.solped.detalles.all()), [self.lines[1]])
+
+    def test_protected_relation_refuses_delete(self):
+        proveedor = Proveedor.objects.create(razon_social='Acme Industrial')
+        orden = OrdenCompraProveedor.objects.create(proveedor=proveedor)
+        remito = Remito.objects.create(destinatario=self.cliente, orden_compra_proveedor=orden)
+        relation = Remito._meta.get_field('orden_compra_proveedor').remote_field
+        with mock.patch.object(relation, 'on_delete', models.PROTECT):
+            # The order is reached through the supplier's cascade
+            with self.assertRaises(ProtectedError):
+                proveedor.delete(user=self.user)
+            self.assertIsNone(self.reload(proveedor).deleted_at)
+            self.assertIsNone(self.reload(orden).deleted_at)
+
+            # A soft-deleted remito no longer holds the order
+            remito.delete(user=self.user)
+            proveedor.delete(user=self.user)
+        self.assertTrue(self.reload(orden).deleted_by_cascade)
+
+
+class ArchivePurgeTests(TestCase):
+    """Long soft-deleted rows round-trip through the archive unchanged."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.user = get_user_model().objects.create_superuser('compras@example.com', 'password')
+        self.articulo = Articulo.objects.create(descripcion='Válvula esférica')
+        self.old = self.create_solped(1001, deleted_days_ago=400)
+        self.recent = self.create_solped(1002, deleted_days_ago=10)
+        self.live = self.create_solped(1003)
+        # Long deleted, but a live line still points at it
+        self.referenced = Articulo.objects.create(descripcion='Brida ciega')
+        DetalleSolped.objects.create(
+            solped=self.live, articulo=self.referenced, cantidad_valor=1, cantidad_unidad=UnidadCantidad.UNIDAD,
+        )
+        self.referenced.delete(user=self.user)
+        self.age(Articulo, [self.referenced.pk], days=400)
+
+    def create_solped(self, number, deleted_days_ago=None):
+        solped = Solped.objects.create(nro_solped=number)
+        for quantity in (5, 10):
+            DetalleSolped.objects.create(
+                solped=solped, articulo=self.articulo, cantidad_valor=quantity, cantidad_unidad=UnidadCantidad.UNIDAD,
+            )
+        if deleted_days_ago is not None:
+            solped.delete(user=self.user)
+            self.age(Solped, [solped.pk], days=deleted_days_ago)
+            self.age(DetalleSolped, DetalleSolped.all_objects.filter(solped=solped).values('pk'), days=deleted_days_ago)
+        return solped
+
+    def age(self, model, pks, days):
+        model.all_objects.filter(pk__in=pks).update(deleted_at=timezone.now() - timedelta(days=days))
+
+    def snapshot(self, model, **filters):
+        return list(model.all_objects.filter(**filters).order_by('pk').values())
+
+    def test_purge_and_restore(self):
+        archived = {
+            Solped: self.snapshot(Solped, pk=self.old.pk),
+            DetalleSolped: self.snapshot(DetalleSolped, solped=self.old),
+        }
+        kept = {
+            Solped: self.snapshot(Solped, pk__in=[self.recent.pk, self.live.pk]),
+            DetalleSolped: self.snapshot(DetalleSolped, solped__in=[self.recent, self.live]),
+            Articulo: self.snapshot(Articulo),
+        }
+
+        self.assertEqual(purge_soft_deleted(days=365), {'procurement.Solped': 1, 'procurement.DetalleSolped': 2})
+        for model, rows in archived.items():
+            self.assertFalse(model.all_objects.filter(pk__in=[row['id'] for row in rows]).exists())
+        # Newer deletions, live rows and still referenced rows are untouched
+        for model, rows in kept.items():
+            self.assertEqual(self.snapshot(model), rows)
+
+        # A second restore skips the rows already back
+        for _ in range(2):
+            call_command('restore_archive', ARCHIVE_ROOT, stdout=StringIO())
+        for model, rows in archived.items():
+            self.assertEqual(self.snapshot(model, pk__in=[row['id'] for row in rows]), rows)
+        self.assertEqual(Solped.all_objects.count(), 3)
+        self.assertEqual(DetalleSolped.all_objects.count(), 7)
+
+
+@override_settings(IMPORT_EXPORT_JOB_CHUNK_SIZE=2)
+class ImportExportJobTests(TestCase):
+    """Background jobs import files and export the changelist rows the user picked."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.user = get_user_model().objects.create_superuser('compras@example.com', 'password')
+        self.client.force_login(self.user)
+        self.activos = [
+            Proveedor.objects.create(razon_social=f'Activo {n}', status=StatusProveedor.ACTIVO) for n in range(3)
+        ]
+        self.inactivo = Proveedor.objects.create(razon_social='Inactivo', status=StatusProveedor.INACTIVO)
+
+    def submit(self, url, data):
+        """Post the form; return the queued job without running it."""
+        with mock.patch('core.admin_mixins.run_export_job'), mock.patch('core.admin_mixins.run_import_job'):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(url, data)
+        job = TrabajoImportExport.objects.get()
+        self.assertRedirects(response, reverse('admin:core_trabajoimportexport_change', args=[job.pk]))
+        return job
+
+    def exported(self, job):
+        run_export_job(str(job.pk))
+        job.refresh_from_db()
+        self.assertEqual(job.status, StatusTrabajo.COMPLETADO)
+        with job.resultado.open('rb') as stream:
+            return sorted(row['razon_social'] for row in csv.DictReader(stream.read().decode().splitlines()))
+
+    def test_export_filtered_changelist(self):
+        url = reverse('admin:core_proveedor_export') + '?status__exact=ACTIVO&q=Activo'
+        job = self.submit(url, {'format': '0', 'resource': '0', 'proveedorresource_razon_social': 'on'})
+
+        self.assertEqual(job.filtros, {'status__exact': ['ACTIVO'], 'q': ['Activo']})
+        self.assertIsNone(job.seleccion)
+        # Rows created after the job was queued but matching its filters are exported
+        Proveedor.objects.create(razon_social='Activo nuevo', status=StatusProveedor.ACTIVO)
+        self.assertEqual(self.exported(job), ['Activo 0', 'Activo 1', 'Activo 2', 'Activo nuevo'])
+        self.assertEqual(job.total_filas, 4)
+
+    def test_export_selected_rows(self):
+        selected = [self.activos[0], self.inactivo]
+        # The export action renders the export form with the selected ids
+        url = reverse('admin:core_proveedor_export') + '?q=a'
+        job = self.submit(url, {
+            'format': '0', 'resource': '0', 'proveedorresource_razon_social': 'on',
+            'export_items': [str(proveedor.pk) for proveedor in selected],
+        })
+
+        self.assertEqual(sorted(job.seleccion), sorted(str(proveedor.pk) for proveedor in selected))
+        self.assertEqual(self.exported(job), ['Activo 0', 'Inactivo'])
+
+    def test_import(self):
+        upload = SimpleUploadedFile('proveedores.csv', (
+            'id,razon_social,status\n'
+            f'{self.inactivo.pk},Inactivo SA,INACTIVO\n'
+            ',Nuevo 1,ACTIVO\n'
+            ',Nuevo 2,ACTIVO\n'
+        ).encode(), content_type='text/csv')
+        job = self.submit(reverse('admin:core_proveedor_import'), {
+            'format': '0', 'resource': '0', 'import_file': upload,
+        })
+
+        run_import_job(str(job.pk))
+        job.refresh_from_db()
+        self.assertEqual(job.status, StatusTrabajo.COMPLETADO)
+        self.assertEqual((job.total_filas, job.filas_procesadas), (3, 3))
+        self.assertEqual((job.filas_nuevas, job.filas_actualizadas, job.filas_con_error), (2, 1, 0))
+        self.inactivo.refresh_from_db()
+        self.assertEqual(self.inactivo.razon_social, 'Inactivo SA')
+        self.assertEqual(Proveedor.objects.filter(razon_social__startswith='Nuevo').count(), 2)
+
+
+@override_settings(CHANGES_FEED_LAG_SECONDS=60)
+class ChangesFeedTests(TestCase):
+    """The feed resumes after its watermark, sends tombstones and holds back recent rows."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser('erp@example.com', 'password')
+        self.client.force_login(self.user)
+        self.url = reverse('core:changes-feed', args=['core.proveedor'])
+        tied = timezone.now() - timedelta(hours=1)
+        self.tied = sorted(
+            [
+                self.stamp(Proveedor.objects.create(razon_social='Acme Industrial'), tied),
+                self.stamp(Proveedor.objects.create(razon_social='Beta Servicios'), tied),
+            ],
+            key=lambda proveedor: str(proveedor.pk),
+        )
+        self.deleted = Proveedor.objects.create(razon_social='Gamma Logística')
+        self.deleted.delete(user=self.user)
+        self.stamp(self.deleted, tied + timedelta(minutes=1))
+        self.recent = Proveedor.objects.create(razon_social='Delta Aceros')
+
+    def stamp(self, proveedor, updated_at):
+        Proveedor.all_objects.filter(pk=proveedor.pk).update(updated_at=updated_at)
+        return proveedor
+
+    def read(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        *rows, end = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        return rows, end
+
+    def test_resume_after_watermark(self):
+        # Two rows share updated_at; one per read must not skip or repeat either
+        rows, end = self.read(limite=1)
+        self.assertEqual([(row['op'], row['id']) for row in rows], [('upsert', str(self.tied[0].pk))])
+        self.assertEqual(rows[0]['data']['razon_social'], self.tied[0].razon_social)
+        self.assertTrue(end['has_more'])
+
+        rows, end = self.read(desde=end['watermark'], limite=1)
+        self.assertEqual([row['id'] for row in rows], [str(self.tied[1].pk)])
+        self.assertTrue(end['has_more'])
+
+        # Exactly limite rows left: the feed knows there are no more
+        rows, end = self.read(desde=end['watermark'], limite=1)
+        self.assertEqual([(row['op'], row['id']) for row in rows], [('delete', str(self.deleted.pk))])
+        self.assertIsNotNone(rows[0]['deleted_at'])
+        self.assertNotIn('data', rows[0])
+        self.assertFalse(end['has_more'])
+
+        # Nothing new: the watermark stays put
+        watermark = end['watermark']
+        rows, end = self.read(desde=watermark)
+        self.assertEqual((rows, end), ([], {'watermark': watermark, 'has_more': False}))
+
+    def test_recent_rows_are_held_back(self):
+        rows, _ = self.read()
+        self.assertNotIn(str(self.recent.pk), [row['id'] for row in rows])
+        with override_settings(CHANGES_FEED_LAG_SECONDS=0):
+            rows, _ = self.read()
+        self.assertEqual(rows[-1]['id'], str(self.recent.pk))
+
+    def test_invalid_parameters(self):
+        response = self.client.get(self.url, {'desde': 'no-es-una-marca'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'desde': ['Marca inválida.']})
+        # Well-formed JSON whose id is not a string
+        watermark = base64.urlsafe_b64encode(json.dumps(['2025-01-01T00:00:00+00:00', 5]).encode()).decode()
+        self.assertEqual(self.client.get(self.url, {'desde': watermark}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'limite': 0}).status_code, 400)
+        missing = reverse('core:changes-feed', args=['core.trabajoimportexport'])
+        self.assertEqual(self.client.get(missing).status_code, 404)
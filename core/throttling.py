@@ -0,0 +1,154 @@
+"""
+Token-bucket throttling of the REST API in Redis.
+
+Each request takes tokens from its client's bucket with one Lua script
+that refills the bucket for the time elapsed, takes the request's cost
+if there is enough and counts the outcome, in a single atomic
+round-trip. DRF's cache throttles read and write the request history in
+two steps, so concurrent requests of one client can all slip through.
+
+Buckets are per user and sized by role (``API_THROTTLE_ROLES``), unless
+the user is the service account of an integration listed in
+``API_THROTTLE_CLIENTS``. Anonymous requests get a bucket per IP. While
+Redis is unreachable requests are let through. Plain Django views,
+async ones included, call ``throttle``/``athrottle`` themselves.
+"""
+
+import logging
+import math
+
+from django.conf import settings
+from django.http import JsonResponse
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+from rest_framework.throttling import BaseThrottle
+
+from .async_redis import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+BUCKET_PREFIX = 'api:throttle'
+
+# Hash of allowed and throttled requests per scope, exported as metrics
+STATS_KEY = 'api:throttle:stats'
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# KEYS: bucket, stats. ARGV: tokens per second, burst, cost, scope.
+# Returns {allowed, seconds until the cost is available}; the bucket
+# expires once it would be full again, as if it had never been used.
+TAKE_TOKENS = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(state[1]) or burst
+local at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - at) * rate)
+
+local allowed = 0
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+    redis.call('HINCRBY', KEYS[2], ARGV[4] .. ':allowed', 1)
+else
+    wait = (cost - tokens) / rate
+    redis.call('HINCRBY', KEYS[2], ARGV[4] .. ':throttled', 1)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil((burst - tokens) / rate) + 1)
+return {allowed, tostring(wait)}
+"""
+
+
+def parse_rate(rate):
+    """Tokens per second of a DRF-style rate such as ``'600/min'``."""
+    count, period = rate.split('/')
+    return int(count) / PERIODS[period[0]]
+
+
+def take_tokens(key, scope, rate, burst, cost=1):
+    """Take ``cost`` tokens from the bucket at ``key``; return ``(allowed, seconds to wait)``."""
+    connection = get_redis_connection('default')
+    script = connection.register_script(TAKE_TOKENS)
+    allowed, wait = script(keys=[key, STATS_KEY], args=[parse_rate(rate), burst, min(cost, burst), scope])
+    return bool(int(allowed)), float(wait)
+
+
+def get_throttle_stats():
+    """Return ``{(scope, outcome): requests}`` since the counters were last reset."""
+    raw = get_redis_connection('default').hgetall(STATS_KEY)
+    stats = {}
+    for field, value in raw.items():
+        scope, outcome = field.decode().rsplit(':', 1)
+        stats[scope, outcome] = int(value)
+    return stats
+
+
+def get_bucket(user, ident):
+    """Return ``(key, scope, (rate, burst))`` of a user, or of the IP ``ident`` if anonymous."""
+    if not user or not user.is_authenticated:
+        return f'{BUCKET_PREFIX}:ip:{ident}', 'anonimo', settings.API_THROTTLE_DEFAULT
+    key = f'{BUCKET_PREFIX}:user:{user.pk}'
+    email = user.email.lower()
+    if email in settings.API_THROTTLE_CLIENTS:
+        return key, f'cliente:{email}', settings.API_THROTTLE_CLIENTS[email]
+    return key, f'rol:{user.rol}', settings.API_THROTTLE_ROLES.get(user.rol, settings.API_THROTTLE_DEFAULT)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttle taking ``throttle_cost`` tokens per request, 1 unless the view sets it.
+
+    Throttled requests get 429 with Retry-After set to when the bucket
+    will hold enough tokens again.
+    """
+
+    def allow_request(self, request, view):
+        key, scope, (rate, burst) = get_bucket(request.user, self.get_ident(request))
+        try:
+            allowed, self.retry_after = take_tokens(key, scope, rate, burst, getattr(view, 'throttle_cost', 1))
+        except RedisError:
+            logger.warning('API throttle unavailable; letting the request through', exc_info=True)
+            return True
+        return allowed
+
+    def wait(self):
+        return self.retry_after
+
+
+# ==============================================================================
+# PLAIN DJANGO VIEWS
+# ==============================================================================
+
+def throttled_response(wait):
+    response = JsonResponse({'detail': 'Demasiadas solicitudes.'}, status=429)
+    response['Retry-After'] = str(math.ceil(wait))
+    return response
+
+
+def throttle(request, user, cost=1):
+    """429 response if the request exceeds the user's bucket, else None; for non-DRF views."""
+    key, scope, (rate, burst) = get_bucket(user, BaseThrottle().get_ident(request))
+    try:
+        allowed, wait = take_tokens(key, scope, rate, burst, cost)
+    except RedisError:
+        logger.warning('API throttle unavailable; letting the request through', exc_info=True)
+        return None
+    return None if allowed else throttled_response(wait)
+
+
+async def athrottle(request, user, cost=1):
+    """Async ``throttle``, through the asyncio Redis client."""
+    key, scope, (rate, burst) = get_bucket(user, BaseThrottle().get_ident(request))
+    script = get_async_redis().register_script(TAKE_TOKENS)
+    try:
+        allowed, wait = await script(keys=[key, STATS_KEY], args=[parse_rate(rate), burst, min(cost, burst), scope])
+    except RedisError:
+        logger.warning('API throttle unavailable; letting the request through', exc_info=True)
+        return None
+    return None if int(allowed) else throttled_response(float(wait))
@@ -0,0 +1,23 @@
+"""
+API URL configuration for core app.
+"""
+
+from django.urls import path
+from rest_framework.routers import SimpleRouter
+
+from . import views
+
+app_name = 'core'
+
+router = SimpleRouter()
+router.register('proveedores', views.ProveedorViewSet)
+router.register('clientes', views.ClienteViewSet)
+router.register('articulos', views.ArticuloViewSet)
+
+urlpatterns = [
+    path('cambios/<str:model_label>/', views.ChangesFeedView.as_view(), name='changes-feed'),
+    path('metricas/throttling/', views.ThrottleMetricsView.as_view(), name='throttle-metrics'),
+    path('metricas/db/', views.DatabasePoolMetricsView.as_view(), name='db-pool-metrics'),
+    path('buscar/', views.asearch_view, name='search'),
+    path('autocompletar/<str:resource>/', views.aautocomplete_view, name='autocomplete'),
+] + router.urls
@@ -1,3 +1,224 @@
-from django.shortcuts import render
+"""
+Read API for the core entities.
+"""
 
-# Create your views here.
+import os
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
+
+from . import search
+from .api import ReadOnlyViewSet
+from .changes import get_feed_model, iter_changes
+from .db_pool import POOL_METRICS, get_pool_stats
+from .models import Articulo, Cliente, Proveedor
+from .serializers import ArticuloSerializer, ChangesFeedSerializer, ClienteSerializer, ProveedorSerializer
+from .throttling import athrottle, get_throttle_stats, throttle
+
+
+class ProveedorViewSet(ReadOnlyViewSet):
+    """Suppliers, newest first."""
+    
+    queryset = Proveedor.objects.all()
+    serializer_class = ProveedorSerializer
+
+
+class ClienteViewSet(ReadOnlyViewSet):
+    """Clients, newest first."""
+    
+    queryset = Cliente.objects.all()
+    serializer_class = ClienteSerializer
+
+
+class ArticuloViewSet(ReadOnlyViewSet):
+    """Articles, newest first."""
+    
+    queryset = Articulo.objects.all()
+    serializer_class = ArticuloSerializer
+
+
+class ChangesFeedView(APIView):
+    """
+    Rows of one model changed since a watermark, streamed as NDJSON.
+    
+    GET /api/core/cambios/procurement.solped/?desde=<marca>&limite=10000
+    sends one line per changed row, deletions included, and ends with
+    ``{"watermark": ..., "has_more": ...}``; pass the watermark as
+    ``desde`` on the next call.
+    """
+    
+    def get(self, request, model_label):
+        model = get_feed_model(model_label)
+        if model is None:
+            raise Http404
+        opts = model._meta
+        if not request.user.has_perm(f'{opts.app_label}.view_{opts.model_name}'):
+            raise PermissionDenied
+        
+        serializer = ChangesFeedSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return StreamingHttpResponse(
+            iter_changes(model, since=serializer.validated_data.get('desde'), limit=serializer.validated_data['limite']),
+            content_type='application/x-ndjson',
+        )
+
+
+class ThrottleMetricsView(APIView):
+    """
+    Requests allowed and throttled per role or integration, for Prometheus.
+    
+    GET /api/core/metricas/throttling/ answers in the text exposition
+    format; staff only, and never throttled itself so scrapes keep working.
+    """
+    
+    permission_classes = [IsAdminUser]
+    throttle_classes = []
+    
+    def get(self, request):
+        lines = [
+            '# HELP api_throttle_requests_total API requests checked by the token-bucket throttle.',
+            '# TYPE api_throttle_requests_total counter',
+        ]
+        for (scope, outcome), count in sorted(get_throttle_stats().items()):
+            lines.append(f'api_throttle_requests_total{{scope="{scope}",result="{outcome}"}} {count}')
+        return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4')
+
+
+class DatabasePoolMetricsView(APIView):
+    """
+    Connection pool statistics of the answering process, for Prometheus.
+    
+    GET /api/core/metricas/db/ answers in the text exposition format, one
+    series per database and pid; staff only and never throttled.
+    """
+    
+    permission_classes = [IsAdminUser]
+    throttle_classes = []
+    
+    def get(self, request):
+        stats = get_pool_stats()
+        pid = os.getpid()
+        lines = []
+        for key, (metric, kind, description) in POOL_METRICS.items():
+            lines += [f'# HELP {metric} {description}', f'# TYPE {metric} {kind}']
+            for alias, values in sorted(stats.items()):
+                lines.append(f'{metric}{{database="{alias}",pid="{pid}"}} {values.get(key, 0)}')
+        return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4')
+
+
+# ==============================================================================
+# SEARCH AND AUTOCOMPLETE
+# ==============================================================================
+# Plain Django views, since DRF views cannot be async. The async versions
+# serve the URLs under ASGI; the sync ones answer the same and are the
+# baseline of ``manage.py benchmark_async``. Django cannot wrap async views
+# in the ATOMIC_REQUESTS transaction, so they opt out; they only read.
+
+def json_response(body, status=200):
+    return HttpResponse(body, status=status, content_type='application/json')
+
+
+def not_authenticated():
+    return JsonResponse({'detail': 'Las credenciales de autenticación no se proveyeron.'}, status=403)
+
+
+def forbidden():
+    return JsonResponse({'detail': 'No tiene permiso para realizar esta acción.'}, status=403)
+
+
+def short_term():
+    return JsonResponse({'q': [f'Ingrese al menos {search.MIN_TERM_LENGTH} caracteres.']}, status=400)
+
+
+def search_view(request):
+    """
+    Suppliers, clients and articles matching a term, per resource.
+
+    GET /api/core/buscar/?q=acme returns ``{recurso: [...]}`` for every
+    resource the user may view.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return not_authenticated()
+    term = search.clean_term(request.GET.get('q'))
+    if term is None:
+        return short_term()
+    throttled = throttle(request, user)
+    if throttled:
+        return throttled
+    return json_response(search.dump({
+        resource: list(search.get_search_queryset(resource, term))
+        for resource in search.get_searchable(user)
+    }))
+
+
+@transaction.non_atomic_requests
+async def asearch_view(request):
+    """Async ``search_view``."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return not_authenticated()
+    term = search.clean_term(request.GET.get('q'))
+    if term is None:
+        return short_term()
+    throttled = await athrottle(request, user)
+    if throttled:
+        return throttled
+    results = {}
+    for resource in await sync_to_async(search.get_searchable)(user):
+        results[resource] = [row async for row in search.get_search_queryset(resource, term)]
+    return json_response(search.dump(results))
+
+
+def autocomplete_view(request, resource):
+    """
+    Up to ten rows of a resource whose name starts with a term.
+
+    GET /api/core/autocompletar/proveedores/?q=ac returns ``{"results": [...]}``,
+    cached briefly per resource and term.
+    """
+    if resource not in search.SEARCHES:
+        raise Http404
+    user = request.user
+    if not user.is_authenticated:
+        return not_authenticated()
+    term = search.clean_term(request.GET.get('q'))
+    if term is None:
+        return short_term()
+    throttled = throttle(request, user)
+    if throttled:
+        return throttled
+    if not user.has_perm(search.get_view_permission(resource)):
+        return forbidden()
+    body = search.read_cache(resource, term)
+    if body is None:
+        body = search.dump({'results': list(search.get_autocomplete_queryset(resource, term))})
+        search.write_cache(resource, term, body)
+    return json_response(body)
+
+
+@transaction.non_atomic_requests
+async def aautocomplete_view(request, resource):
+    """Async ``autocomplete_view``; cache hits never leave the event loop."""
+    if resource not in search.SEARCHES:
+        raise Http404
+    user = await request.auser()
+    if not user.is_authenticated:
+        return not_authenticated()
+    term = search.clean_term(request.GET.get('q'))
+    if term is None:
+        return short_term()
+    throttled = await athrottle(request, user)
+    if throttled:
+        return throttled
+    if not await sync_to_async(user.has_perm)(search.get_view_permission(resource)):
+        return forbidden()
+    body = await search.aread_cache(resource, term)
+    if body is None:
+        body = search.dump({'results': [row async for row in search.get_autocomplete_queryset(resource, term)]})
+        await search.awrite_cache(resource, term, body)
+    return json_response(body)
@@ -0,0 +1,168 @@
+"""
+Batched webhook delivery of outbox events.
+
+Each subscriber gets its pending events in order, up to
+``WEBHOOK_BATCH_SIZE`` per POST, over a keep-alive session that pools
+connections per host. Only one worker delivers to a subscriber at a
+time: claiming a batch leases the subscriber for twice the request
+timeout. A failed POST is retried with exponential backoff and, after
+``WEBHOOK_MAX_ATTEMPTS``, its events are marked failed so later ones are
+not held back forever. Delivered events record their latency from the
+status change to the subscriber's acknowledgement.
+
+The body is ``{"eventos": [...]}``; with a secret, the
+``X-Webhook-Firma`` header carries ``sha256=<HMAC of the body>``.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+from datetime import timedelta
+from functools import lru_cache
+
+import requests
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from .models import EntregaWebhook, StatusEntrega, SuscriptorWebhook
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = 'X-Webhook-Firma'
+
+# Longest error message kept on a delivery
+MAX_ERROR_LENGTH = 1000
+
+
+@lru_cache(maxsize=None)
+def get_session():
+    """HTTP session of this worker process, reusing connections across batches."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=settings.WEBHOOK_POOL_CONNECTIONS,
+        pool_maxsize=settings.WEBHOOK_POOL_MAXSIZE,
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def serialize_event(event):
+    return {
+        'id': event.pk,
+        'modelo': event.modelo,
+        'id_entidad': event.id_entidad,
+        'status_anterior': event.status_anterior or None,
+        'status_nuevo': event.status_nuevo,
+        'fecha': event.created_at,
+    }
+
+
+def sign(secret, body):
+    return 'sha256=' + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def get_backoff(failures):
+    """Seconds to wait after ``failures`` consecutive failed POSTs."""
+    return min(settings.WEBHOOK_BACKOFF_MAX, settings.WEBHOOK_BACKOFF_BASE * 2 ** (failures - 1))
+
+
+def claim_batch(subscriber_pk):
+    """
+    Lease the subscriber and return it with its next pending deliveries.
+
+    Returns ``(None, [])`` when the subscriber is inactive, backing off
+    or leased by another worker.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        subscriber = (
+            SuscriptorWebhook.objects.select_for_update(skip_locked=True)
+            .filter(Q(proximo_intento__isnull=True) | Q(proximo_intento__lte=now), pk=subscriber_pk, activo=True)
+            .first()
+        )
+        if subscriber is None:
+            return None, []
+        deliveries = list(
+            subscriber.entregas.filter(status=StatusEntrega.PENDIENTE)
+            .select_related('evento').order_by('evento_id')[:settings.WEBHOOK_BATCH_SIZE]
+        )
+        if deliveries:
+            SuscriptorWebhook.objects.filter(pk=subscriber.pk).update(
+                proximo_intento=now + timedelta(seconds=2 * settings.WEBHOOK_TIMEOUT),
+            )
+    return subscriber, deliveries
+
+
+def post_batch(subscriber, deliveries):
+    """POST the events of ``deliveries``; return None on a 2xx answer, else the error."""
+    body = json.dumps(
+        {'eventos': [serialize_event(delivery.evento) for delivery in deliveries]},
+        cls=DjangoJSONEncoder,
+    ).encode()
+    headers = {'Content-Type': 'application/json'}
+    if subscriber.secreto:
+        headers[SIGNATURE_HEADER] = sign(subscriber.secreto, body)
+    try:
+        response = get_session().post(subscriber.url, data=body, headers=headers, timeout=settings.WEBHOOK_TIMEOUT)
+    except requests.RequestException as exc:
+        return f'{type(exc).__name__}: {exc}'
+    if not 200 <= response.status_code < 300:
+        return f'HTTP {response.status_code}: {response.text[:200]}'
+    return None
+
+
+def record_success(subscriber, deliveries):
+    now = timezone.now()
+    for delivery in deliveries:
+        delivery.status = StatusEntrega.ENTREGADA
+        delivery.intentos += 1
+        delivery.entregada_at = now
+        delivery.latencia_ms = max(0, int((now - delivery.evento.created_at).total_seconds() * 1000))
+    with transaction.atomic():
+        EntregaWebhook.objects.bulk_update(deliveries, ['status', 'intentos', 'entregada_at', 'latencia_ms'])
+        SuscriptorWebhook.objects.filter(pk=subscriber.pk).update(
+            fallos_consecutivos=0, proximo_intento=None, updated_at=now,
+        )
+
+
+def record_failure(subscriber, deliveries, error):
+    now = timezone.now()
+    failures = subscriber.fallos_consecutivos + 1
+    for delivery in deliveries:
+        delivery.intentos += 1
+        delivery.ultimo_error = error[:MAX_ERROR_LENGTH]
+        if delivery.intentos >= settings.WEBHOOK_MAX_ATTEMPTS:
+            delivery.status = StatusEntrega.FALLIDA
+    with transaction.atomic():
+        EntregaWebhook.objects.bulk_update(deliveries, ['status', 'intentos', 'ultimo_error'])
+        SuscriptorWebhook.objects.filter(pk=subscriber.pk).update(
+            fallos_consecutivos=failures,
+            proximo_intento=now + timedelta(seconds=get_backoff(failures)),
+            updated_at=now,
+        )
+
+
+def deliver(subscriber_pk):
+    """Deliver the subscriber's pending events batch by batch; return how many were delivered."""
+    delivered = 0
+    while True:
+        subscriber, deliveries = claim_batch(subscriber_pk)
+        if not deliveries:
+            return delivered
+        error = post_batch(subscriber, deliveries)
+        if error:
+            record_failure(subscriber, deliveries, error)
+            logger.warning('Webhook delivery to %s failed: %s', subscriber, error)
+            return delivered
+        record_success(subscriber, deliveries)
+        delivered += len(deliveries)
+        logger.info(
+            'Delivered %s event(s) to %s, max latency %s ms',
+            len(deliveries), subscriber, max(delivery.latencia_ms for delivery in deliveries),
+        )
@@ -2,8 +2,12 @@
 Admin configuration for procurement models.
 """
 
-from django.contrib import admin
+from django.contrib import admin, messages
 from import_export.admin import ImportExportModelAdmin
+from core.admin_mixins import (
+    BackgroundImportExportMixin, LargeTableAdminMixin, LazyInlineAdminMixin,
+    LazyTabularInline, QueryBudgetAdminMixin, SoftDeleteAdminMixin
+)
 from .models import (
     Solped, DetalleSolped, PedidoDeCotizacion, PedidoCotizacionProveedor,
     DetallePedidoCotizacionProveedor, CotizacionProveedor, DetalleCotizacionProveedor,
@@ -12,9 +16,43 @@ from .models import (
     Envio, Comunicacion, Actividad, PedidoCotizacionSolped, CotizacionSolped,
     CotizacionGanador
 )
+from .transitions import bulk_transition, get_target_statuses
 
 
-class DetalleSolpedInline(admin.TabularInline):
+class StatusTransitionAdminMixin:
+    """Adds one bulk "change status" action per reachable status."""
+    
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        if not self.has_change_permission(request):
+            return actions
+        labels = dict(self.model._meta.get_field('status').choices)
+        for status in get_target_statuses(self.model):
+            name = 'transition_to_%s' % status.lower().replace(' ', '_')
+            actions[name] = (
+                self._make_transition_action(status),
+                name,
+                'Cambiar estado a %s' % labels[status],
+            )
+        return actions
+    
+    def _make_transition_action(self, status):
+        def action(modeladmin, request, queryset):
+            result = bulk_transition(queryset, status, request.user)
+            if result.updated:
+                modeladmin.message_user(
+                    request, '%d documentos pasaron a %s.' % (len(result.updated), status)
+                )
+            if result.rejected:
+                modeladmin.message_user(
+                    request,
+                    '%d documentos no admiten la transición a %s.' % (len(result.rejected), status),
+                    messages.WARNING,
+                )
+        return action
+
+
+class DetalleSolpedInline(LazyTabularInline):
     """Inline for Solped details."""
     model = DetalleSolped
     extra = 1
@@ -22,7 +60,11 @@ class DetalleSolpedInline(admin.TabularInline):
 
 
 @admin.register(Solped)
-class SolpedAdmin(ImportExportModelAdmin):
+class SolpedAdmin(
+    StatusTransitionAdminMixin, QueryBudgetAdminMixin, SoftDeleteAdminMixin,
+    LazyInlineAdminMixin, LargeTableAdminMixin, BackgroundImportExportMixin,
+    ImportExportModelAdmin
+):
     """Admin interface for Solped model."""
     
     list_display = ['nro_solped', 'status', 'created_at', 'created_by']
@@ -45,7 +87,9 @@ class SolpedAdmin(ImportExportModelAdmin):
 
 
 @admin.register(PedidoDeCotizacion)
-class PedidoDeCotizacionAdmin(admin.ModelAdmin):
+class PedidoDeCotizacionAdmin(
+    QueryBudgetAdminMixin, SoftDeleteAdminMixin, LargeTableAdminMixin, admin.ModelAdmin
+):
     """Admin interface for PedidoDeCotizacion model."""
     
     list_display = ['id', 'cliente', 'status', 'fecha_vencimiento', 'created_at']
@@ -55,14 +99,18 @@ class PedidoDeCotizacionAdmin(admin.ModelAdmin):
     date_hierarchy = 'created_at'
 
 
-class DetallePedidoCotizacionProveedorInline(admin.TabularInline):
+class DetallePedidoCotizacionProveedorInline(LazyTabularInline):
     """Inline for quote request details."""
     model = DetallePedidoCotizacionProveedor
     extra = 1
+    fields = ['articulo', 'cantidad_valor', 'cantidad_unidad']
 
 
 @admin.register(PedidoCotizacionProveedor)
-class PedidoCotizacionProveedorAdmin(admin.ModelAdmin):
+class PedidoCotizacionProveedorAdmin(
+    QueryBudgetAdminMixin, SoftDeleteAdminMixin, LazyInlineAdminMixin,
+    LargeTableAdminMixin, admin.ModelAdmin
+):
     """Admin interface for PedidoCotizacionProveedor model."""
     
     list_display = ['id', 'proveedor', 'status', 'fecha_vencimiento', 'created_at']
@@ -72,7 +120,7 @@ class PedidoCotizacionProveedorAdmin(admin.ModelAdmin):
     inlines = [DetallePedidoCotizacionProveedorInline]
 
 
-class DetalleCotizacionProveedorInline(admin.TabularInline):
+class DetalleCotizacionProveedorInline(LazyTabularInline):
     """Inline for supplier quotation details."""
     model = DetalleCotizacionProveedor
     extra = 1
@@ -80,7 +128,11 @@ class DetalleCotizacionProveedorInline(admin.TabularInline):
 
 
 @admin.register(CotizacionProveedor)
-class CotizacionProveedorAdmin(ImportExportModelAdmin):
+class CotizacionProveedorAdmin(
+    StatusTransitionAdminMixin, QueryBudgetAdminMixin, SoftDeleteAdminMixin,
+    LazyInlineAdminMixin, LargeTableAdminMixin, BackgroundImportExportMixin,
+    ImportExportModelAdmin
+):
     """Admin interface for CotizacionProveedor model."""
     
     list_display = ['id', 'proveedor', 'status', 'fecha_vencimiento', 'created_at']
@@ -92,7 +144,10 @@ class CotizacionProveedorAdmin(ImportExportModelAdmin):
 
 
 @admin.register(Cotizacion)
-class CotizacionAdmin(ImportExportModelAdmin):
+class CotizacionAdmin(
+    StatusTransitionAdminMixin, QueryBudgetAdminMixin, SoftDeleteAdminMixin,
+    LargeTableAdminMixin, BackgroundImportExportMixin, ImportExportModelAdmin
+):
     """Admin interface for Cotizacion model."""
     
     list_display = ['id', 'cliente', 'status', 'margen', 'fecha_vencimiento', 'created_at']
@@ -102,7 +157,7 @@ class CotizacionAdmin(ImportExportModelAdmin):
     date_hierarchy = 'created_at'
 
 
-class DetalleOrdenCompraProveedorInline(admin.TabularInline):
+class DetalleOrdenCompraProveedorInline(LazyTabularInline):
     """Inline for purchase order details."""
     model = DetalleOrdenCompraProveedor
     extra = 1
@@ -110,7 +165,11 @@ class DetalleOrdenCompraProveedorInline(admin.TabularInline):
 
 
 @admin.register(OrdenCompraProveedor)
-class OrdenCompraProveedorAdmin(ImportExportModelAdmin):
+class OrdenCompraProveedorAdmin(
+    StatusTransitionAdminMixin, QueryBudgetAdminMixin, SoftDeleteAdminMixin,
+    LazyInlineAdminMixin, LargeTableAdminMixin, BackgroundImportExportMixin,
+    ImportExportModelAdmin
+):
     """Admin interface for OrdenCompraProveedor model."""
     
     list_display = ['numero_orden', 'proveedor', 'status', 'fecha_entrega_estimada', 'created_at']
@@ -121,7 +180,7 @@ class OrdenCompraProveedorAdmin(ImportExportModelAdmin):
     date_hierarchy = 'created_at'
 
 
-class DetalleOrdenCompraClienteInline(admin.TabularInline):
+class DetalleOrdenCompraClienteInline(LazyTabularInline):
     """Inline for sales order details."""
     model = DetalleOrdenCompraCliente
     extra = 1
@@ -129,7 +188,11 @@ class DetalleOrdenCompraClienteInline(admin.TabularInline):
 
 
 @admin.register(OrdenCompraCliente)
-class OrdenCompraClienteAdmin(ImportExportModelAdmin):
+class OrdenCompraClienteAdmin(
+    StatusTransitionAdminMixin, QueryBudgetAdminMixin, SoftDeleteAdminMixin,
+    LazyInlineAdminMixin, LargeTableAdminMixin, BackgroundImportExportMixin,
+    ImportExportModelAdmin
+):
     """Admin interface for OrdenCompraCliente model."""
     
     list_display = ['numero_orden', 'cliente', 'status', 'fecha_entrega_estimada', 'created_at']
@@ -140,14 +203,19 @@ class OrdenCompraClienteAdmin(ImportExportModelAdmin):
     date_hierarchy = 'created_at'
 
 
-class DetalleRemitoInline(admin.TabularInline):
+class DetalleRemitoInline(LazyTabularInline):
     """Inline for delivery receipt details."""
     model = DetalleRemito
     extra = 1
+    fields = ['articulo', 'cantidad_valor', 'cantidad_unidad']
 
 
 @admin.register(Remito)
-class RemitoAdmin(ImportExportModelAdmin):
+class RemitoAdmin(
+    StatusTransitionAdminMixin, QueryBudgetAdminMixin, SoftDeleteAdminMixin,
+    LazyInlineAdminMixin, LargeTableAdminMixin, BackgroundImportExportMixin,
+    ImportExportModelAdmin
+):
     """Admin interface for Remito model."""
     
     list_display = ['numero_remito', 'destinatario', 'status', 'fecha_envio', 'created_at']
@@ -158,7 +226,10 @@ class RemitoAdmin(ImportExportModelAdmin):
 
 
 @admin.register(Envio)
-class EnvioAdmin(admin.ModelAdmin):
+class EnvioAdmin(
+    StatusTransitionAdminMixin, QueryBudgetAdminMixin, SoftDeleteAdminMixin,
+    LargeTableAdminMixin, admin.ModelAdmin
+):
     """Admin interface for Envio model."""
     
     list_display = ['numero_seguimiento', 'remito', 'despachante', 'status', 'fecha_envio', 'created_at']
@@ -168,7 +239,9 @@ class EnvioAdmin(admin.ModelAdmin):
 
 
 @admin.register(Comunicacion)
-class ComunicacionAdmin(admin.ModelAdmin):
+class ComunicacionAdmin(
+    QueryBudgetAdminMixin, SoftDeleteAdminMixin, LargeTableAdminMixin, admin.ModelAdmin
+):
     """Admin interface for Comunicacion model."""
     
     list_display = ['usuario', 'entidad_tipo', 'entidad_id', 'created_at']
@@ -179,7 +252,7 @@ class ComunicacionAdmin(admin.ModelAdmin):
 
 
 @admin.register(Actividad)
-class ActividadAdmin(admin.ModelAdmin):
+class ActividadAdmin(QueryBudgetAdminMixin, LargeTableAdminMixin, admin.ModelAdmin):
     """Admin interface for Actividad model."""
     
     list_display = ['usuario', 'tipo', 'tipo_entidad', 'id_entidad', 'fecha']
@@ -0,0 +1,435 @@
+"""
+Analytics tables derived from the procurement documents.
+
+``GastoMensual`` holds the four-way join over purchase order lines,
+orders, suppliers and articles pre-aggregated per month of the order.
+``EmbudoSolped`` holds one row per solped with the first document it
+reached at every stage of the chain, for funnel and cycle-time reports.
+
+Both are refreshed incrementally from a watermark: only the months or
+solpeds touched by documents updated since the last run are recomputed,
+inside a transaction, so readers keep seeing the previous figures until
+it commits.
+"""
+
+import warnings
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, DateField, DecimalField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import (
+    CotizacionSolped, Cotizacion, DetalleOrdenCompraProveedor, EmbudoSolped, Envio,
+    GastoMensual, OrdenCompraProveedor, PedidoCotizacionSolped, PedidoDeCotizacion,
+    Remito, Solped, StatusEnvio, StatusOrdenCompra,
+)
+
+
+def next_watermark():
+    """
+    Watermark to store once a refresh commits.
+
+    Taken before reading, minus an overlap that covers transactions still
+    open at that time: their rows may carry an earlier ``updated_at``.
+    """
+    return timezone.now() - timedelta(seconds=settings.ANALYTICS_REFRESH_OVERLAP_SECONDS)
+
+
+def lock_refresh(name):
+    """
+    Hold a transaction-level advisory lock on ``name`` until commit.
+
+    Overlapping refreshes of the same rows would each delete them and then
+    both insert their own copy; the later one waits here instead and reads
+    the documents once the first has committed.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', [name])
+
+
+# ==============================================================================
+# SPEND ROLLUP
+# ==============================================================================
+
+
+# Orders counted as committed spend
+SPEND_STATUSES = [
+    StatusOrdenCompra.ENVIADA, StatusOrdenCompra.CONFIRMADA,
+    StatusOrdenCompra.EN_PROCESO, StatusOrdenCompra.COMPLETADA,
+]
+
+SPEND_WATERMARK_KEY = 'analytics:gasto_mensual:watermark'
+
+ORDER_MONTH = TruncMonth('orden_compra_proveedor__created_at', output_field=DateField())
+
+LINE_TOTAL = ExpressionWrapper(
+    F('cantidad_valor') * F('precio_unitario_valor'),
+    output_field=DecimalField(max_digits=30, decimal_places=5),
+)
+
+
+def month_start(month):
+    """Aware datetime at the start of ``month`` in the current time zone."""
+    return timezone.make_aware(datetime(month.year, month.month, 1))
+
+
+def in_months(months):
+    """Lines whose order was created in one of ``months``, as index-friendly ranges."""
+    condition = Q()
+    for month in months:
+        next_month = (month + timedelta(days=32)).replace(day=1)
+        condition |= Q(
+            orden_compra_proveedor__created_at__gte=month_start(month),
+            orden_compra_proveedor__created_at__lt=month_start(next_month),
+        )
+    return condition
+
+
+def get_changed_months(since):
+    """
+    Months whose rollup may differ since ``since``.
+
+    Soft-deleted lines and orders are included: deleting them updates
+    ``updated_at`` too. Each source is checked on its own so every
+    branch can use its own ``updated_at``.
+    """
+    lines = DetalleOrdenCompraProveedor.all_objects.order_by().annotate(mes=ORDER_MONTH)
+    changed = [
+        lines.filter(updated_at__gte=since),
+        lines.filter(orden_compra_proveedor__updated_at__gte=since),
+        lines.filter(articulo__updated_at__gte=since),
+    ]
+    months = changed[0].values_list('mes', flat=True).union(
+        *(queryset.values_list('mes', flat=True) for queryset in changed[1:])
+    )
+    return set(months)
+
+
+def aggregate_spend(months=None):
+    """Aggregate the live order lines per rollup key, for ``months`` or everything."""
+    lines = DetalleOrdenCompraProveedor.objects.filter(
+        orden_compra_proveedor__status__in=SPEND_STATUSES,
+        # The join does not get safedelete's filter
+        orden_compra_proveedor__deleted_at__isnull=True,
+    )
+    if months is not None:
+        lines = lines.filter(in_months(months))
+    return (
+        lines.order_by()
+        .values(
+            mes=ORDER_MONTH,
+            proveedor_id=F('orden_compra_proveedor__proveedor_id'),
+            familia=F('articulo__familia'),
+            moneda=F('precio_unitario_moneda'),
+        )
+        .annotate(total=Sum(LINE_TOTAL), lineas=Count('pk'))
+    )
+
+
+def refresh_spend_rollup(full=False):
+    """
+    Recompute the rollup rows of the months changed since the last refresh.
+
+    Without a watermark, or with ``full``, the whole table is rebuilt.
+    Returns the months refreshed, or None after a full rebuild.
+    """
+    watermark = next_watermark()
+    since = None if full else cache.get(SPEND_WATERMARK_KEY)
+    months = None
+    if since is not None:
+        months = get_changed_months(since)
+        if not months:
+            cache.set(SPEND_WATERMARK_KEY, watermark, None)
+            return months
+
+    with transaction.atomic():
+        lock_refresh(GastoMensual._meta.db_table)
+        stale = GastoMensual.objects.all() if months is None else GastoMensual.objects.filter(mes__in=months)
+        stale.delete()
+        GastoMensual.objects.bulk_create(
+            [GastoMensual(**row) for row in aggregate_spend(months)],
+            batch_size=1000,
+        )
+    cache.set(SPEND_WATERMARK_KEY, watermark, None)
+    return months
+
+
+# ==============================================================================
+# SPEND REPORT
+# ==============================================================================
+
+def spend_report(year, by_month=False, **filters):
+    """
+    Spend of ``year`` next to the year before, read from the rollup only.
+
+    Rows are grouped per supplier, family and currency, and per calendar
+    month as well with ``by_month``. ``filters`` are applied as given
+    (``proveedor``, ``familia``, ``moneda``).
+    """
+    current = date(year, 1, 1)
+    rows = GastoMensual.objects.filter(
+        mes__gte=date(year - 1, 1, 1), mes__lt=date(year + 1, 1, 1), **filters,
+    )
+    keys = ['proveedor_id', 'proveedor__razon_social', 'familia', 'moneda']
+    if by_month:
+        keys.append('mes__month')
+    rows = (
+        rows.order_by()
+        .values(*keys)
+        .annotate(
+            total_actual=Sum('total', filter=Q(mes__gte=current), default=0),
+            total_anterior=Sum('total', filter=Q(mes__lt=current), default=0),
+        )
+        .order_by(*(['mes__month'] if by_month else []), '-total_actual')
+    )
+    report = []
+    for row in rows:
+        current_total, previous = row['total_actual'], row['total_anterior']
+        report.append({
+            'proveedor': row['proveedor_id'],
+            'proveedor_nombre': row['proveedor__razon_social'],
+            'familia': row['familia'],
+            'moneda': row['moneda'],
+            **({'mes': row['mes__month']} if by_month else {}),
+            'total': current_total,
+            'total_anterior': previous,
+            'variacion': round((current_total - previous) / previous * 100, 2) if previous else None,
+        })
+    return report
+
+
+# ==============================================================================
+# FUNNEL
+# ==============================================================================
+
+FUNNEL_WATERMARK_KEY = 'analytics:embudo:watermark'
+
+# Stage -> (documents, lookup from the documents back to the solped
+# junction, timestamp field on EmbudoSolped, document field ordered by)
+FUNNEL_STAGES = {
+    'pedido_cotizacion': (
+        PedidoDeCotizacion.objects.all(), 'pedido_cotizacion_solpeds',
+        'pedido_cotizacion_creado', 'created_at',
+    ),
+    'cotizacion': (
+        Cotizacion.objects.all(), 'cotizacion_solpeds',
+        'cotizacion_creada', 'created_at',
+    ),
+    'orden_compra': (
+        OrdenCompraProveedor.objects.all(), 'cotizacion__cotizacion_solpeds',
+        'orden_compra_creada', 'created_at',
+    ),
+    'remito': (
+        Remito.objects.all(), 'orden_compra_proveedor__cotizacion__cotizacion_solpeds',
+        'remito_creado', 'created_at',
+    ),
+    'envio': (
+        Envio.objects.filter(status=StatusEnvio.ENTREGADO, fecha_entrega_real__isnull=False),
+        'remito__orden_compra_proveedor__cotizacion__cotizacion_solpeds',
+        'entregado', 'fecha_entrega_real',
+    ),
+}
+
+
+def live_path(path):
+    """Every row joined along ``path`` is live; safedelete only filters the base table."""
+    parts = path.split('__')
+    return Q(**{
+        f"{'__'.join(parts[:depth])}__deleted_at__isnull": True
+        for depth in range(1, len(parts) + 1)
+    })
+
+
+def get_funnel_annotations():
+    """First document and its timestamp per stage, as subqueries on Solped."""
+    annotations = {}
+    for stage, (documents, path, stamp, order) in FUNNEL_STAGES.items():
+        first = (
+            documents.filter(live_path(path), **{f'{path}__solped': OuterRef('pk')})
+            .order_by(order, 'pk')
+        )
+        annotations[f'{stage}_id'] = Subquery(first.values('pk')[:1])
+        annotations[stamp] = Subquery(first.values(order)[:1])
+    return annotations
+
+
+def get_changed_solpeds(since):
+    """
+    Solpeds whose funnel row may differ since ``since``.
+
+    Each document table is checked on its own branch of a UNION, through
+    every junction row including soft-deleted ones, so unlinking or
+    deleting a document is picked up too.
+    """
+    junction = CotizacionSolped.all_objects.order_by()
+    changed = [
+        Solped.all_objects.order_by().filter(updated_at__gte=since).values_list('pk'),
+        PedidoCotizacionSolped.all_objects.order_by().filter(
+            Q(updated_at__gte=since) | Q(pedido_cotizacion__updated_at__gte=since)
+        ).values_list('solped_id'),
+        junction.filter(updated_at__gte=since).values_list('solped_id'),
+        junction.filter(cotizacion__updated_at__gte=since).values_list('solped_id'),
+        junction.filter(
+            cotizacion__ordenes_compra_proveedor__updated_at__gte=since
+        ).values_list('solped_id'),
+        junction.filter(
+            cotizacion__ordenes_compra_proveedor__remitos__updated_at__gte=since
+        ).values_list('solped_id'),
+        junction.filter(
+            cotizacion__ordenes_compra_proveedor__remitos__envios__updated_at__gte=since
+        ).values_list('solped_id'),
+    ]
+    return {pk for pk, in changed[0].union(*changed[1:])}
+
+
+def refresh_funnel_rows(pks):
+    """Replace the funnel rows of the solpeds ``pks``; deleted solpeds lose theirs."""
+    rows = (
+        Solped.objects.filter(pk__in=pks).order_by()
+        .values('pk', 'created_at', **get_funnel_annotations())
+    )
+    with transaction.atomic():
+        lock_refresh(EmbudoSolped._meta.db_table)
+        EmbudoSolped.objects.filter(solped_id__in=pks).delete()
+        EmbudoSolped.objects.bulk_create([
+            EmbudoSolped(solped_id=row.pop('pk'), creada=row.pop('created_at'), **row)
+            for row in rows
+        ])
+
+
+def iter_solped_batches(pks=None):
+    """Batches of solped pks: ``pks`` if given, else every solped by keyset."""
+    size = settings.FUNNEL_BATCH_SIZE
+    if pks is not None:
+        pks = sorted(pks)
+        for start in range(0, len(pks), size):
+            yield pks[start:start + size]
+        return
+    solpeds = Solped.all_objects.order_by('pk').values_list('pk', flat=True)
+    batch = list(solpeds[:size])
+    while batch:
+        yield batch
+        batch = list(solpeds.filter(pk__gt=batch[-1])[:size])
+
+
+def refresh_funnel(full=False):
+    """
+    Recompute the funnel rows of the solpeds touched since the last refresh.
+
+    Without a watermark, or with ``full``, every solped is recomputed, one
+    transaction per batch. Returns the number of solpeds refreshed.
+    """
+    watermark = next_watermark()
+    since = None if full else cache.get(FUNNEL_WATERMARK_KEY)
+    pks = None if since is None else get_changed_solpeds(since)
+    refreshed = 0
+    for batch in iter_solped_batches(pks):
+        refresh_funnel_rows(batch)
+        refreshed += len(batch)
+    cache.set(FUNNEL_WATERMARK_KEY, watermark, None)
+    return refreshed
+
+
+# ==============================================================================
+# FUNNEL REPORT
+# ==============================================================================
+
+# Report name -> EmbudoSolped timestamp, in chain order
+FUNNEL_COLUMNS = {
+    'solped': 'creada',
+    'pedido_cotizacion': 'pedido_cotizacion_creado',
+    'cotizacion': 'cotizacion_creada',
+    'orden_compra': 'orden_compra_creada',
+    'remito': 'remito_creado',
+    'entrega': 'entregado',
+}
+
+# Cycle-time segments as (name, from stage, to stage)
+CYCLE_SEGMENTS = (
+    ('solped_pedido_cotizacion', 'solped', 'pedido_cotizacion'),
+    ('pedido_cotizacion_cotizacion', 'pedido_cotizacion', 'cotizacion'),
+    ('cotizacion_orden_compra', 'cotizacion', 'orden_compra'),
+    ('orden_compra_remito', 'orden_compra', 'remito'),
+    ('remito_entrega', 'remito', 'entrega'),
+    ('solped_entrega', 'solped', 'entrega'),
+)
+
+PERCENTILES = (50, 75, 90, 95)
+
+
+def to_days(values):
+    """Days since the epoch in local time, NaN where the stage was not reached."""
+    stamps = np.array([
+        timezone.localtime(value).replace(tzinfo=None) if isinstance(value, datetime) else value
+        for value in values
+    ], dtype='datetime64[s]')
+    return (stamps - np.datetime64(0, 's')) / np.timedelta64(1, 'D')
+
+
+def to_figure(value):
+    return None if np.isnan(value) else round(float(value), 2)
+
+
+def funnel_report(since=None, until=None):
+    """
+    Funnel counts and cycle-time percentiles, in days, of the solpeds
+    created between ``since`` and ``until`` (dates, both inclusive).
+
+    Reads the fact table once and computes every segment in one pass:
+    a matrix of stage timestamps, its column differences, and
+    ``nanpercentile`` over them, so a solped that has not reached a
+    stage only drops out of the segments that need it.
+    """
+    rows = EmbudoSolped.objects.order_by()
+    if since is not None:
+        rows = rows.filter(creada__gte=timezone.make_aware(datetime.combine(since, datetime.min.time())))
+    if until is not None:
+        next_day = datetime.combine(until + timedelta(days=1), datetime.min.time())
+        rows = rows.filter(creada__lt=timezone.make_aware(next_day))
+    values = list(rows.values_list(*FUNNEL_COLUMNS.values()))
+
+    stages = list(FUNNEL_COLUMNS)
+    if values:
+        stamps = np.column_stack([to_days(column) for column in zip(*values)])
+    else:
+        stamps = np.empty((0, len(stages)))
+    reached = np.count_nonzero(~np.isnan(stamps), axis=0)
+
+    start = [stages.index(source) for _, source, _ in CYCLE_SEGMENTS]
+    end = [stages.index(target) for _, _, target in CYCLE_SEGMENTS]
+    # Documents linked after the fact can predate their solped
+    durations = np.maximum(stamps[:, end] - stamps[:, start], 0)
+    measured = np.count_nonzero(~np.isnan(durations), axis=0)
+    with warnings.catch_warnings():
+        # Segments nobody reached yet come back as NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        percentiles = np.nanpercentile(durations, PERCENTILES, axis=0) if len(values) else None
+
+    return {
+        'solpeds': len(values),
+        'etapas': [
+            {
+                'etapa': stage,
+                'solpeds': int(reached[column]),
+                'conversion': round(100 * reached[column] / len(values), 2) if values else None,
+            }
+            for column, stage in enumerate(stages)
+        ],
+        'tiempos': [
+            {
+                'tramo': name,
+                'solpeds': int(measured[column]),
+                **{
+                    f'p{percentile}': to_figure(percentiles[row, column]) if percentiles is not None else None
+                    for row, percentile in enumerate(PERCENTILES)
+                },
+            }
+            for column, (name, _, _) in enumerate(CYCLE_SEGMENTS)
+        ],
+    }
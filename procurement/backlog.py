@@ -0,0 +1,143 @@
+"""
+Open-order backlog per article, reconciled in base units.
+
+Ordered, dispatched and delivered quantities live in four detail tables,
+each line in its own ``cantidad_unidad``. Every table is reduced with a
+single grouped query per (article, unit); the groups are converted to
+the article's ``unidad_base`` and summed into one matrix with NumPy, so
+the work in Python grows with the number of articles and units, not with
+the number of lines. The resulting snapshot is cached for the warehouse
+screen and rebuilt periodically by Celery.
+"""
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Sum
+from django.utils import timezone
+
+from core.models import Articulo, ConversionUnidad
+
+from .models import (
+    DetalleOrdenCompraCliente, DetalleOrdenCompraProveedor, DetalleRemito, Envio,
+    StatusEnvio, StatusOrdenCompra, StatusRemito,
+)
+
+BACKLOG_KEY = 'backlog:snapshot'
+
+# Orders that still count as ordered
+ORDERED_STATUSES = [
+    StatusOrdenCompra.ENVIADA, StatusOrdenCompra.CONFIRMADA,
+    StatusOrdenCompra.EN_PROCESO, StatusOrdenCompra.COMPLETADA,
+]
+
+# Remitos whose goods left the warehouse
+DISPATCHED_STATUSES = [StatusRemito.ENVIADO, StatusRemito.EN_TRANSITO, StatusRemito.ENTREGADO]
+
+
+def get_sources():
+    """Quantity column -> detail lines counted in it."""
+    return {
+        'pedido_proveedor': DetalleOrdenCompraProveedor.objects.filter(
+            orden_compra_proveedor__status__in=ORDERED_STATUSES,
+            orden_compra_proveedor__deleted_at__isnull=True,
+        ),
+        'pedido_cliente': DetalleOrdenCompraCliente.objects.filter(
+            orden_compra_cliente__status__in=ORDERED_STATUSES,
+            orden_compra_cliente__deleted_at__isnull=True,
+        ),
+        'despachado': DetalleRemito.objects.filter(
+            remito__status__in=DISPATCHED_STATUSES,
+            remito__deleted_at__isnull=True,
+        ),
+        'entregado': DetalleRemito.objects.filter(
+            Exists(Envio.objects.filter(remito=OuterRef('remito'), status=StatusEnvio.ENTREGADO)),
+            remito__deleted_at__isnull=True,
+        ),
+    }
+
+
+def compute_backlog():
+    """
+    Reconcile every article with quantities, in its base unit.
+
+    Issues one grouped query per source, one for the articles and one for
+    their conversions. Lines in a unit without a conversion are left out
+    of the sums and reported in ``sin_conversion``.
+    """
+    grouped = {
+        column: list(
+            lines.order_by().values_list('articulo_id', 'cantidad_unidad').annotate(Sum('cantidad_valor'))
+        )
+        for column, lines in get_sources().items()
+    }
+    pks = sorted({pk for rows in grouped.values() for pk, _, _ in rows})
+    articulos = {
+        pk: (descripcion, familia, unidad_base)
+        for pk, descripcion, familia, unidad_base in Articulo.all_objects.filter(pk__in=pks).values_list(
+            'pk', 'descripcion', 'familia', 'unidad_base',
+        )
+    }
+    factors = {
+        (pk, unidad): float(factor)
+        for pk, unidad, factor in ConversionUnidad.objects.filter(articulo_id__in=pks).values_list(
+            'articulo_id', 'unidad', 'factor',
+        )
+    }
+    for pk, (_, _, unidad_base) in articulos.items():
+        factors[pk, unidad_base] = 1.0
+
+    index = {pk: position for position, pk in enumerate(pks)}
+    totals = np.zeros((len(pks), len(grouped)))
+    unconverted = [set() for _ in pks]
+    for column, rows in enumerate(grouped.values()):
+        if not rows:
+            continue
+        positions = np.fromiter((index[pk] for pk, _, _ in rows), dtype=np.intp, count=len(rows))
+        quantities = np.fromiter((quantity for _, _, quantity in rows), dtype=float, count=len(rows))
+        scale = np.fromiter(
+            (factors.get((pk, unidad), np.nan) for pk, unidad, _ in rows), dtype=float, count=len(rows),
+        )
+        missing = np.isnan(scale)
+        totals[:, column] = np.bincount(
+            positions, weights=np.where(missing, 0, quantities * scale), minlength=len(pks),
+        )
+        for row in np.flatnonzero(missing):
+            pk, unidad, _ = rows[row]
+            unconverted[index[pk]].add(unidad)
+
+    ordered, sold, dispatched, delivered = totals.T
+    pending_dispatch = np.maximum(sold - dispatched, 0)
+    in_transit = np.maximum(dispatched - delivered, 0)
+    order = np.lexsort((-in_transit, -pending_dispatch))
+
+    backlog = []
+    for position in order:
+        pk = pks[position]
+        descripcion, familia, unidad_base = articulos.get(pk, ('', '', None))
+        backlog.append({
+            'articulo': str(pk),
+            'descripcion': descripcion,
+            'familia': familia,
+            'unidad_base': unidad_base,
+            **{column: round(float(totals[position, number]), 3) for number, column in enumerate(grouped)},
+            'pendiente_despacho': round(float(pending_dispatch[position]), 3),
+            'en_transito': round(float(in_transit[position]), 3),
+            'sin_conversion': sorted(unconverted[position]),
+        })
+    return backlog
+
+
+def refresh_backlog_snapshot():
+    """Recompute the backlog and cache it for the warehouse screen."""
+    snapshot = {'generado': timezone.now().isoformat(), 'articulos': compute_backlog()}
+    cache.set(BACKLOG_KEY, snapshot, settings.BACKLOG_SNAPSHOT_TTL)
+    return snapshot
+
+
+def get_backlog_snapshot():
+    """Cached backlog snapshot, computed on the spot if the cache is empty."""
+    snapshot = cache.get(BACKLOG_KEY)
+    if snapshot is None:
+        snapshot = refresh_backlog_snapshot()
+    return snapshot
@@ -0,0 +1,173 @@
+"""
+Bulk writes of document detail lines.
+
+A payload of thousands of lines is validated field by field in one
+pass, its foreign keys are checked with one query per related table,
+and the lines are written with ``bulk_create``/``bulk_update`` inside a
+single transaction. Either every line is written or none is; errors are
+keyed by the line's position in the payload.
+"""
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from core.models import BaseModel
+
+from .models import (
+    DetalleCotizacionProveedor, DetalleOrdenCompraCliente, DetalleOrdenCompraProveedor,
+    DetallePedidoCotizacionProveedor, DetalleRemito, DetalleSolped,
+)
+
+LINE_MODELS = (
+    DetalleSolped, DetallePedidoCotizacionProveedor, DetalleCotizacionProveedor,
+    DetalleOrdenCompraProveedor, DetalleOrdenCompraCliente, DetalleRemito,
+)
+
+# Rows per INSERT or UPDATE statement
+BATCH_SIZE = 1000
+
+# Primary key, audit and soft-delete columns, never set from a payload
+BASE_FIELDS = {f.name for f in BaseModel._meta.get_fields()}
+
+
+def get_line_model(model_name):
+    """Return the detail model for a lowercase model name, or None."""
+    for model in LINE_MODELS:
+        if model._meta.model_name == model_name:
+            return model
+    return None
+
+
+def get_line_fields(model):
+    return [f for f in model._meta.concrete_fields if f.editable and f.name not in BASE_FIELDS]
+
+
+@lru_cache(maxsize=None)
+def get_line_serializer(model):
+    """
+    ModelSerializer of one line, with foreign keys taken as plain UUIDs.
+
+    Related rows are checked afterwards for the whole payload at once
+    instead of one query per line and key.
+    """
+    fields = get_line_fields(model)
+    attrs = {
+        f.name: serializers.UUIDField(required=not f.blank, allow_null=f.null)
+        for f in fields if f.is_relation
+    }
+    attrs['id'] = serializers.UUIDField(required=False)
+    attrs['Meta'] = type('Meta', (), {'model': model, 'fields': ['id', *(f.name for f in fields)]})
+    return type(f'{model.__name__}LineSerializer', (serializers.ModelSerializer,), attrs)
+
+
+@dataclass
+class LineWriteResult:
+    """Outcome of a bulk write: ``(position, pk)`` of every written line, or the errors."""
+    created: list = field(default_factory=list)
+    updated: list = field(default_factory=list)
+    errors: dict = field(default_factory=dict)
+
+
+def validate_lines(model, lines, partial):
+    """Validate every line on its own; return ``({position: data}, {position: errors})``."""
+    serializer = get_line_serializer(model)(partial=partial)
+    validated, errors = {}, {}
+    for position, line in enumerate(lines):
+        try:
+            validated[position] = serializer.run_validation(line)
+        except serializers.ValidationError as exc:
+            errors[position] = exc.detail
+    return validated, errors
+
+
+def check_references(model, validated, errors):
+    """Flag lines pointing at rows that do not exist or were deleted, one query per foreign key."""
+    for f in get_line_fields(model):
+        if not f.is_relation:
+            continue
+        wanted = {data[f.name] for data in validated.values() if data.get(f.name) is not None}
+        if not wanted:
+            continue
+        found = set(f.related_model._default_manager.filter(pk__in=wanted).values_list('pk', flat=True))
+        for position, data in validated.items():
+            if data.get(f.name) is not None and data[f.name] not in found:
+                errors.setdefault(position, {})[f.name] = ['No existe.']
+
+
+def assign(line, data):
+    for name, value in data.items():
+        if name != 'id':
+            setattr(line, line._meta.get_field(name).attname, value)
+
+
+def write_lines(model, lines, user, upsert=False):
+    """
+    Create ``lines`` or, with ``upsert``, update those whose ``id`` exists.
+
+    Lines may carry their own ``id``; a new ``id`` creates the line with
+    it, so an integration can resend a payload safely. Updates only
+    change the fields present in the line.
+    """
+    validated, errors = validate_lines(model, lines, partial=upsert)
+    check_references(model, validated, errors)
+    result = LineWriteResult()
+    required = [name for name, f in get_line_serializer(model)().fields.items() if f.required]
+    now = timezone.now()
+
+    with transaction.atomic():
+        pks = [data['id'] for data in validated.values() if 'id' in data]
+        existing = model.all_objects.select_for_update().in_bulk(pks) if pks else {}
+        seen = set()
+        created, updated, changed = [], [], set()
+        for position, data in validated.items():
+            pk = data.get('id')
+            if pk is not None and pk in seen:
+                errors.setdefault(position, {})['id'] = ['Repetido en el envío.']
+                continue
+            seen.add(pk)
+            line = existing.get(pk)
+            if line is not None and line.deleted_at is not None:
+                errors.setdefault(position, {})['id'] = ['La línea fue eliminada.']
+            elif line is not None and not upsert:
+                errors.setdefault(position, {})['id'] = ['Ya existe.']
+            elif line is not None:
+                assign(line, data)
+                line.updated_at = now
+                line.updated_by = user
+                changed.update(name for name in data if name != 'id')
+                updated.append((position, line))
+            else:
+                missing = [name for name in required if name not in data]
+                if missing:
+                    errors.setdefault(position, {}).update({name: ['Este campo es requerido.'] for name in missing})
+                    continue
+                line = model(created_by=user, updated_by=user, **({'id': pk} if pk else {}))
+                assign(line, data)
+                created.append((position, line))
+
+        if errors:
+            result.errors = dict(sorted(errors.items()))
+            return result
+
+        model.objects.bulk_create([line for _, line in created], batch_size=BATCH_SIZE)
+        if updated:
+            model.objects.bulk_update(
+                [line for _, line in updated], [*sorted(changed), 'updated_at', 'updated_by'],
+                batch_size=BATCH_SIZE,
+            )
+    result.created = [(position, line.pk) for position, line in created]
+    result.updated = [(position, line.pk) for position, line in updated]
+    return result
+
+
+def delete_lines(model, pks, user):
+    """Soft-delete the live lines among ``pks``; return ``(deleted, missing)``."""
+    with transaction.atomic():
+        live = set(model.objects.filter(pk__in=pks).select_for_update().values_list('pk', flat=True))
+        if live:
+            model.objects.filter(pk__in=live).delete(user=user)
+    return [pk for pk in pks if pk in live], [pk for pk in pks if pk not in live]
@@ -0,0 +1,255 @@
+# Generated by Django 5.1.5 on 2026-10-19 11:24
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking writes on large tables
+    atomic = False
+
+    dependencies = [
+        ("core", "0004_partial_indexes"),
+        ("procurement", "0002_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        RemoveIndexConcurrently(
+            model_name="cotizacion",
+            name="idx_cotizaciones_status",
+        ),
+        RemoveIndexConcurrently(
+            model_name="cotizacion",
+            name="idx_cotizaciones_cliente",
+        ),
+        RemoveIndexConcurrently(
+            model_name="cotizacionproveedor",
+            name="idx_cotiz_prov_status",
+        ),
+        RemoveIndexConcurrently(
+            model_name="cotizacionproveedor",
+            name="idx_cotiz_prov_fecha",
+        ),
+        RemoveIndexConcurrently(
+            model_name="detallecotizacionproveedor",
+            name="idx_det_cotiz_prov_cotiz",
+        ),
+        RemoveIndexConcurrently(
+            model_name="detallecotizacionproveedor",
+            name="idx_det_cotiz_prov_art",
+        ),
+        RemoveIndexConcurrently(
+            model_name="detalleordencompracliente",
+            name="idx_det_ord_cli_orden",
+        ),
+        RemoveIndexConcurrently(
+            model_name="detalleordencompraproveedor",
+            name="idx_det_ord_prov_orden",
+        ),
+        RemoveIndexConcurrently(
+            model_name="detalleremito",
+            name="idx_detalle_remito_remito",
+        ),
+        RemoveIndexConcurrently(
+            model_name="detallesolped",
+            name="idx_detalle_solpeds_solped",
+        ),
+        RemoveIndexConcurrently(
+            model_name="detallesolped",
+            name="idx_detalle_solpeds_articulo",
+        ),
+        RemoveIndexConcurrently(
+            model_name="ordencompracliente",
+            name="idx_ord_compra_cli_status",
+        ),
+        RemoveIndexConcurrently(
+            model_name="ordencompracliente",
+            name="idx_ord_compra_cli_num",
+        ),
+        RemoveIndexConcurrently(
+            model_name="ordencompraproveedor",
+            name="idx_ord_compra_prov_status",
+        ),
+        RemoveIndexConcurrently(
+            model_name="ordencompraproveedor",
+            name="idx_ord_compra_prov_num",
+        ),
+        RemoveIndexConcurrently(
+            model_name="solped",
+            name="idx_solpeds_nro",
+        ),
+        RemoveIndexConcurrently(
+            model_name="solped",
+            name="idx_solpeds_status",
+        ),
+        AddIndexConcurrently(
+            model_name="cotizacion",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["status", "-created_at"],
+                name="idx_cotizaciones_st_created",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="cotizacion",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["cliente"],
+                name="idx_cotizaciones_cliente",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="cotizacionproveedor",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["status", "-created_at"],
+                name="idx_cotiz_prov_status_created",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="cotizacionproveedor",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["fecha_vencimiento"],
+                name="idx_cotiz_prov_fecha",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="detallecotizacionproveedor",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["cotizacion_proveedor"],
+                name="idx_det_cotiz_prov_cotiz",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="detallecotizacionproveedor",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["articulo"],
+                name="idx_det_cotiz_prov_art",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="detalleordencompracliente",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["orden_compra_cliente"],
+                name="idx_det_ord_cli_orden",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="detalleordencompraproveedor",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["orden_compra_proveedor"],
+                name="idx_det_ord_prov_orden",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="detalleremito",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["remito"],
+                name="idx_detalle_remito_remito",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="detallesolped",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["solped"],
+                name="idx_detalle_solpeds_solped",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="detallesolped",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["articulo"],
+                name="idx_detalle_solpeds_articulo",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="envio",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["status", "-created_at"],
+                name="idx_envios_status_created",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="ordencompracliente",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["status", "-created_at"],
+                name="idx_ord_cpra_cli_st_created",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="ordencompracliente",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["numero_orden"],
+                name="idx_ord_compra_cli_num",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="ordencompraproveedor",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["status", "-created_at"],
+                name="idx_ord_cpra_prov_st_created",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="ordencompraproveedor",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["numero_orden"],
+                name="idx_ord_compra_prov_num",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="pedidocotizacionproveedor",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["status", "-created_at"],
+                name="idx_ped_cotiz_prov_st_created",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="pedidodecotizacion",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["status", "-created_at"],
+                name="idx_ped_cotiz_status_created",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="remito",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["status", "-created_at"],
+                name="idx_remitos_status_created",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="solped",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["nro_solped"],
+                name="idx_solpeds_nro",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="solped",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["status", "-created_at"],
+                name="idx_solpeds_status_created",
+            ),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.5 on 2026-10-19 11:36
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking writes on large tables
+    atomic = False
+
+    dependencies = [
+        ("core", "0004_partial_indexes"),
+        ("procurement", "0003_partial_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="cotizacionproveedor",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["created_by", "status", "fecha_vencimiento"],
+                name="idx_cotiz_prov_creador_st_venc",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="ordencompraproveedor",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["created_by", "status", "fecha_entrega_estimada"],
+                name="idx_ord_cpra_prov_creador_st",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="pedidocotizacionproveedor",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["created_by", "status", "fecha_vencimiento"],
+                name="idx_ped_cotiz_prov_creador_st",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="solped",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["created_by", "status", "-created_at"],
+                name="idx_solpeds_creador_status",
+            ),
+        ),
+    ]
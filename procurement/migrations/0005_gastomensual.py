@@ -0,0 +1,72 @@
+# Generated by Django 5.1.5 on 2026-10-19 11:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_partial_indexes"),
+        ("procurement", "0004_work_queue_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GastoMensual",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("mes", models.DateField(verbose_name="Mes")),
+                (
+                    "familia",
+                    models.CharField(
+                        blank=True, max_length=255, verbose_name="Familia"
+                    ),
+                ),
+                ("moneda", models.CharField(max_length=3, verbose_name="Moneda")),
+                (
+                    "total",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=20, verbose_name="Total"
+                    ),
+                ),
+                ("lineas", models.IntegerField(verbose_name="Líneas")),
+                (
+                    "actualizado",
+                    models.DateTimeField(auto_now=True, verbose_name="Actualizado"),
+                ),
+                (
+                    "proveedor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="gastos_mensuales",
+                        to="core.proveedor",
+                        verbose_name="Proveedor",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Gasto Mensual",
+                "verbose_name_plural": "Gastos Mensuales",
+                "indexes": [
+                    models.Index(
+                        fields=["proveedor", "mes"], name="idx_gasto_mensual_prov_mes"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("mes", "proveedor", "familia", "moneda"),
+                        name="uniq_gasto_mensual",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,181 @@
+# Generated by Django 5.1.5 on 2026-10-19 11:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking writes on large tables
+    atomic = False
+
+    dependencies = [
+        ("core", "0004_partial_indexes"),
+        ("procurement", "0005_gastomensual"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EmbudoSolped",
+            fields=[
+                (
+                    "solped",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="embudo",
+                        serialize=False,
+                        to="procurement.solped",
+                        verbose_name="Solped",
+                    ),
+                ),
+                ("creada", models.DateTimeField(verbose_name="Solped Creada")),
+                (
+                    "pedido_cotizacion_creado",
+                    models.DateTimeField(
+                        blank=True,
+                        null=True,
+                        verbose_name="Pedido de Cotización Creado",
+                    ),
+                ),
+                (
+                    "cotizacion_creada",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Cotización Creada"
+                    ),
+                ),
+                (
+                    "orden_compra_creada",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Orden de Compra Creada"
+                    ),
+                ),
+                (
+                    "remito_creado",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Remito Creado"
+                    ),
+                ),
+                (
+                    "entregado",
+                    models.DateField(blank=True, null=True, verbose_name="Entregado"),
+                ),
+                (
+                    "actualizado",
+                    models.DateTimeField(auto_now=True, verbose_name="Actualizado"),
+                ),
+            ],
+            options={
+                "verbose_name": "Embudo de Solped",
+                "verbose_name_plural": "Embudo de Solpeds",
+            },
+        ),
+        migrations.AddField(
+            model_name="ordencompraproveedor",
+            name="cotizacion",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="ordenes_compra_proveedor",
+                to="procurement.cotizacion",
+                verbose_name="Cotización",
+            ),
+        ),
+        migrations.AddField(
+            model_name="remito",
+            name="orden_compra_proveedor",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="remitos",
+                to="procurement.ordencompraproveedor",
+                verbose_name="Orden de Compra Proveedor",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="ordencompraproveedor",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["cotizacion"],
+                name="idx_ord_cpra_prov_cotizacion",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="remito",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["orden_compra_proveedor"],
+                name="idx_remitos_orden_compra",
+            ),
+        ),
+        migrations.AddField(
+            model_name="embudosolped",
+            name="cotizacion",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="procurement.cotizacion",
+                verbose_name="Cotización",
+            ),
+        ),
+        migrations.AddField(
+            model_name="embudosolped",
+            name="envio",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="procurement.envio",
+                verbose_name="Envío",
+            ),
+        ),
+        migrations.AddField(
+            model_name="embudosolped",
+            name="orden_compra",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="procurement.ordencompraproveedor",
+                verbose_name="Orden de Compra Proveedor",
+            ),
+        ),
+        migrations.AddField(
+            model_name="embudosolped",
+            name="pedido_cotizacion",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="procurement.pedidodecotizacion",
+                verbose_name="Pedido de Cotización",
+            ),
+        ),
+        migrations.AddField(
+            model_name="embudosolped",
+            name="remito",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="procurement.remito",
+                verbose_name="Remito",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="embudosolped",
+            index=models.Index(fields=["creada"], name="idx_embudo_creada"),
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.1.5 on 2026-10-19 11:55
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking writes on large tables
+    atomic = False
+
+    dependencies = [
+        ("procurement", "0006_funnel"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="cotizacion",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["-created_at", "-id"],
+                name="idx_cotizaciones_created_id",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="cotizacionproveedor",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["-created_at", "-id"],
+                name="idx_cotiz_prov_created_id",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="envio",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["-created_at", "-id"],
+                name="idx_envios_created_id",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="ordencompracliente",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["-created_at", "-id"],
+                name="idx_ord_cpra_cli_created_id",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="ordencompraproveedor",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["-created_at", "-id"],
+                name="idx_ord_cpra_prov_created_id",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="pedidocotizacionproveedor",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["-created_at", "-id"],
+                name="idx_ped_cotiz_prov_created_id",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="pedidodecotizacion",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["-created_at", "-id"],
+                name="idx_ped_cotiz_created_id",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="remito",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["-created_at", "-id"],
+                name="idx_remitos_created_id",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="solped",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["-created_at", "-id"],
+                name="idx_solpeds_created_id",
+            ),
+        ),
+    ]
@@ -0,0 +1,126 @@
+# Generated by Django 5.1.5 on 2026-10-19 12:05
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking writes on large tables
+    atomic = False
+
+    dependencies = [
+        ("procurement", "0007_keyset_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="cotizacion",
+            index=models.Index(
+                fields=["updated_at", "id"], name="idx_cotizaciones_updated_id"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="cotizacionganador",
+            index=models.Index(
+                fields=["updated_at", "id"], name="idx_cotiz_ganador_updated_id"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="cotizacionproveedor",
+            index=models.Index(
+                fields=["updated_at", "id"], name="idx_cotiz_prov_updated_id"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="cotizacionsolped",
+            index=models.Index(
+                fields=["updated_at", "id"], name="idx_cotiz_solped_updated_id"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="detallecotizacionproveedor",
+            index=models.Index(
+                fields=["updated_at", "id"], name="idx_det_cotiz_prov_updated_id"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="detalleordencompracliente",
+            index=models.Index(
+                fields=["updated_at", "id"], name="idx_det_ord_cli_updated_id"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="detalleordencompraproveedor",
+            index=models.Index(
+                fields=["updated_at", "id"], name="idx_det_ord_prov_updated_id"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="detallepedidocotizacionproveedor",
+            index=models.Index(
+                fields=["updated_at", "id"], name="idx_det_ped_cotiz_prov_upd_id"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="detalleremito",
+            index=models.Index(
+                fields=["updated_at", "id"], name="idx_det_remito_updated_id"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="detallesolped",
+            index=models.Index(
+                fields=["updated_at", "id"], name="idx_det_solpeds_updated_id"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="envio",
+            index=models.Index(
+                fields=["updated_at", "id"], name="idx_envios_updated_id"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="ordencompracliente",
+            index=models.Index(
+                fields=["updated_at", "id"], name="idx_ord_cpra_cli_updated_id"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="ordencompraproveedor",
+            index=models.Index(
+                fields=["updated_at", "id"], name="idx_ord_cpra_prov_updated_id"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="pedidocotizacionproveedor",
+            index=models.Index(
+                fields=["updated_at", "id"], name="idx_ped_cotiz_prov_updated_id"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="pedidocotizacionsolped",
+            index=models.Index(
+                fields=["updated_at", "id"], name="idx_ped_cotiz_solped_upd_id"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="pedidodecotizacion",
+            index=models.Index(
+                fields=["updated_at", "id"], name="idx_ped_cotiz_updated_id"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="remito",
+            index=models.Index(
+                fields=["updated_at", "id"], name="idx_remitos_updated_id"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="solped",
+            index=models.Index(
+                fields=["updated_at", "id"], name="idx_solpeds_updated_id"
+            ),
+        ),
+    ]
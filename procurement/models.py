@@ -8,8 +8,9 @@ from django.conf import settings
 from safedelete.models import SafeDeleteModel, SOFT_DELETE_CASCADE
 from core.models import (
     BaseModel, Proveedor, Cliente, Articulo, Despachante,
-    UnidadCantidad
+    UnidadCantidad, NOT_DELETED
 )
+from core.outbox import StatusOutboxMixin
 
 
 # ==============================================================================
@@ -120,8 +121,15 @@ class Solped(BaseModel):
         verbose_name_plural = 'Solpeds'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['nro_solped'], name='idx_solpeds_nro'),
-            models.Index(fields=['status'], name='idx_solpeds_status'),
+            models.Index(fields=['nro_solped'], name='idx_solpeds_nro', condition=NOT_DELETED),
+            models.Index(fields=['status', '-created_at'], name='idx_solpeds_status_created', condition=NOT_DELETED),
+            models.Index(fields=['-created_at', '-id'], name='idx_solpeds_created_id', condition=NOT_DELETED),
+            models.Index(
+                fields=['created_by', 'status', '-created_at'],
+                name='idx_solpeds_creador_status',
+                condition=NOT_DELETED,
+            ),
+            models.Index(fields=['updated_at', 'id'], name='idx_solpeds_updated_id'),
         ]
     
     def __str__(self):
@@ -150,10 +158,13 @@ class DetalleSolped(BaseModel):
         verbose_name = 'Detalle de Solped'
         verbose_name_plural = 'Detalles de Solped'
         indexes = [
-            models.Index(fields=['solped'], name='idx_detalle_solpeds_solped'),
-            models.Index(fields=['articulo'], name='idx_detalle_solpeds_articulo'),
+            models.Index(fields=['solped'], name='idx_detalle_solpeds_solped', condition=NOT_DELETED),
+            models.Index(fields=['articulo'], name='idx_detalle_solpeds_articulo', condition=NOT_DELETED),
+            models.Index(fields=['updated_at', 'id'], name='idx_det_solpeds_updated_id'),
         ]
     
+    str_select_related = ('solped', 'articulo')
+    
     def __str__(self):
         return f"{self.solped} - {self.articulo}"
 
@@ -183,6 +194,13 @@ class PedidoDeCotizacion(BaseModel):
         verbose_name = 'Pedido de Cotización'
         verbose_name_plural = 'Pedidos de Cotización'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-created_at'], name='idx_ped_cotiz_status_created', condition=NOT_DELETED),
+            models.Index(fields=['-created_at', '-id'], name='idx_ped_cotiz_created_id', condition=NOT_DELETED),
+            models.Index(fields=['updated_at', 'id'], name='idx_ped_cotiz_updated_id'),
+        ]
+    
+    str_select_related = ('cliente',)
     
     def __str__(self):
         return f"PC-{self.id} - {self.cliente}"
@@ -209,6 +227,18 @@ class PedidoCotizacionProveedor(BaseModel):
         verbose_name = 'Pedido de Cotización a Proveedor'
         verbose_name_plural = 'Pedidos de Cotización a Proveedores'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-created_at'], name='idx_ped_cotiz_prov_st_created', condition=NOT_DELETED),
+            models.Index(fields=['-created_at', '-id'], name='idx_ped_cotiz_prov_created_id', condition=NOT_DELETED),
+            models.Index(
+                fields=['created_by', 'status', 'fecha_vencimiento'],
+                name='idx_ped_cotiz_prov_creador_st',
+                condition=NOT_DELETED,
+            ),
+            models.Index(fields=['updated_at', 'id'], name='idx_ped_cotiz_prov_updated_id'),
+        ]
+    
+    str_select_related = ('proveedor',)
     
     def __str__(self):
         return f"PCP-{self.id} - {self.proveedor}"
@@ -235,6 +265,11 @@ class DetallePedidoCotizacionProveedor(BaseModel):
     class Meta:
         verbose_name = 'Detalle de Pedido de Cotización a Proveedor'
         verbose_name_plural = 'Detalles de Pedidos de Cotización a Proveedores'
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='idx_det_ped_cotiz_prov_upd_id'),
+        ]
+    
+    str_select_related = ('pedido_cotizacion_proveedor', 'articulo')
     
     def __str__(self):
         return f"{self.pedido_cotizacion_proveedor} - {self.articulo}"
@@ -244,7 +279,7 @@ class DetallePedidoCotizacionProveedor(BaseModel):
 # QUOTATION MODELS
 # ==============================================================================
 
-class CotizacionProveedor(BaseModel):
+class CotizacionProveedor(StatusOutboxMixin, BaseModel):
     """Supplier quotation model."""
     
     proveedor = models.ForeignKey(
@@ -274,10 +309,19 @@ class CotizacionProveedor(BaseModel):
         verbose_name_plural = 'Cotizaciones de Proveedores'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['status'], name='idx_cotiz_prov_status'),
-            models.Index(fields=['fecha_vencimiento'], name='idx_cotiz_prov_fecha'),
+            models.Index(fields=['status', '-created_at'], name='idx_cotiz_prov_status_created', condition=NOT_DELETED),
+            models.Index(fields=['-created_at', '-id'], name='idx_cotiz_prov_created_id', condition=NOT_DELETED),
+            models.Index(fields=['fecha_vencimiento'], name='idx_cotiz_prov_fecha', condition=NOT_DELETED),
+            models.Index(
+                fields=['created_by', 'status', 'fecha_vencimiento'],
+                name='idx_cotiz_prov_creador_st_venc',
+                condition=NOT_DELETED,
+            ),
+            models.Index(fields=['updated_at', 'id'], name='idx_cotiz_prov_updated_id'),
         ]
     
+    str_select_related = ('proveedor',)
+    
     def __str__(self):
         return f"Cotización {self.id} - {self.proveedor}"
 
@@ -306,10 +350,13 @@ class DetalleCotizacionProveedor(BaseModel):
         verbose_name = 'Detalle de Cotización de Proveedor'
         verbose_name_plural = 'Detalles de Cotizaciones de Proveedores'
         indexes = [
-            models.Index(fields=['cotizacion_proveedor'], name='idx_det_cotiz_prov_cotiz'),
-            models.Index(fields=['articulo'], name='idx_det_cotiz_prov_art'),
+            models.Index(fields=['cotizacion_proveedor'], name='idx_det_cotiz_prov_cotiz', condition=NOT_DELETED),
+            models.Index(fields=['articulo'], name='idx_det_cotiz_prov_art', condition=NOT_DELETED),
+            models.Index(fields=['updated_at', 'id'], name='idx_det_cotiz_prov_updated_id'),
         ]
     
+    str_select_related = ('cotizacion_proveedor', 'articulo')
+    
     def __str__(self):
         return f"{self.cotizacion_proveedor} - {self.articulo}"
 
@@ -337,10 +384,14 @@ class Cotizacion(BaseModel):
         verbose_name_plural = 'Cotizaciones'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['status'], name='idx_cotizaciones_status'),
-            models.Index(fields=['cliente'], name='idx_cotizaciones_cliente'),
+            models.Index(fields=['status', '-created_at'], name='idx_cotizaciones_st_created', condition=NOT_DELETED),
+            models.Index(fields=['-created_at', '-id'], name='idx_cotizaciones_created_id', condition=NOT_DELETED),
+            models.Index(fields=['cliente'], name='idx_cotizaciones_cliente', condition=NOT_DELETED),
+            models.Index(fields=['updated_at', 'id'], name='idx_cotizaciones_updated_id'),
         ]
     
+    str_select_related = ('cliente',)
+    
     def __str__(self):
         return f"Cotización {self.id} - {self.cliente}"
 
@@ -349,7 +400,7 @@ class Cotizacion(BaseModel):
 # PURCHASE ORDER MODELS
 # ==============================================================================
 
-class OrdenCompraProveedor(BaseModel):
+class OrdenCompraProveedor(StatusOutboxMixin, BaseModel):
     """Purchase order to supplier model."""
     
     proveedor = models.ForeignKey(
@@ -358,6 +409,15 @@ class OrdenCompraProveedor(BaseModel):
         related_name='ordenes_compra',
         verbose_name='Proveedor'
     )
+    cotizacion = models.ForeignKey(
+        Cotizacion,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_index=False,
+        related_name='ordenes_compra_proveedor',
+        verbose_name='Cotización'
+    )
     numero_orden = models.CharField('Número de Orden', max_length=50, unique=True, null=True, blank=True)
     status = models.CharField(
         'Estado',
@@ -372,10 +432,20 @@ class OrdenCompraProveedor(BaseModel):
         verbose_name_plural = 'Órdenes de Compra a Proveedores'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['status'], name='idx_ord_compra_prov_status'),
-            models.Index(fields=['numero_orden'], name='idx_ord_compra_prov_num'),
+            models.Index(fields=['status', '-created_at'], name='idx_ord_cpra_prov_st_created', condition=NOT_DELETED),
+            models.Index(fields=['-created_at', '-id'], name='idx_ord_cpra_prov_created_id', condition=NOT_DELETED),
+            models.Index(fields=['numero_orden'], name='idx_ord_compra_prov_num', condition=NOT_DELETED),
+            models.Index(fields=['cotizacion'], name='idx_ord_cpra_prov_cotizacion', condition=NOT_DELETED),
+            models.Index(
+                fields=['created_by', 'status', 'fecha_entrega_estimada'],
+                name='idx_ord_cpra_prov_creador_st',
+                condition=NOT_DELETED,
+            ),
+            models.Index(fields=['updated_at', 'id'], name='idx_ord_cpra_prov_updated_id'),
         ]
     
+    str_select_related = ('proveedor',)
+    
     def __str__(self):
         return f"OC-{self.numero_orden or self.id} - {self.proveedor}"
 
@@ -404,9 +474,12 @@ class DetalleOrdenCompraProveedor(BaseModel):
         verbose_name = 'Detalle de Orden de Compra a Proveedor'
         verbose_name_plural = 'Detalles de Órdenes de Compra a Proveedores'
         indexes = [
-            models.Index(fields=['orden_compra_proveedor'], name='idx_det_ord_prov_orden'),
+            models.Index(fields=['orden_compra_proveedor'], name='idx_det_ord_prov_orden', condition=NOT_DELETED),
+            models.Index(fields=['updated_at', 'id'], name='idx_det_ord_prov_updated_id'),
         ]
     
+    str_select_related = ('orden_compra_proveedor', 'articulo')
+    
     def __str__(self):
         return f"{self.orden_compra_proveedor} - {self.articulo}"
 
@@ -434,10 +507,14 @@ class OrdenCompraCliente(BaseModel):
         verbose_name_plural = 'Órdenes de Compra de Clientes'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['status'], name='idx_ord_compra_cli_status'),
-            models.Index(fields=['numero_orden'], name='idx_ord_compra_cli_num'),
+            models.Index(fields=['status', '-created_at'], name='idx_ord_cpra_cli_st_created', condition=NOT_DELETED),
+            models.Index(fields=['-created_at', '-id'], name='idx_ord_cpra_cli_created_id', condition=NOT_DELETED),
+            models.Index(fields=['numero_orden'], name='idx_ord_compra_cli_num', condition=NOT_DELETED),
+            models.Index(fields=['updated_at', 'id'], name='idx_ord_cpra_cli_updated_id'),
         ]
     
+    str_select_related = ('cliente',)
+    
     def __str__(self):
         return f"OCC-{self.numero_orden or self.id} - {self.cliente}"
 
@@ -466,9 +543,12 @@ class DetalleOrdenCompraCliente(BaseModel):
         verbose_name = 'Detalle de Orden de Compra de Cliente'
         verbose_name_plural = 'Detalles de Órdenes de Compra de Clientes'
         indexes = [
-            models.Index(fields=['orden_compra_cliente'], name='idx_det_ord_cli_orden'),
+            models.Index(fields=['orden_compra_cliente'], name='idx_det_ord_cli_orden', condition=NOT_DELETED),
+            models.Index(fields=['updated_at', 'id'], name='idx_det_ord_cli_updated_id'),
         ]
     
+    str_select_related = ('orden_compra_cliente', 'articulo')
+    
     def __str__(self):
         return f"{self.orden_compra_cliente} - {self.articulo}"
 
@@ -477,7 +557,7 @@ class DetalleOrdenCompraCliente(BaseModel):
 # DELIVERY MODELS
 # ==============================================================================
 
-class Remito(BaseModel):
+class Remito(StatusOutboxMixin, BaseModel):
     """Delivery receipt model."""
     
     destinatario = models.ForeignKey(
@@ -486,6 +566,15 @@ class Remito(BaseModel):
         related_name='remitos',
         verbose_name='Destinatario'
     )
+    orden_compra_proveedor = models.ForeignKey(
+        OrdenCompraProveedor,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_index=False,
+        related_name='remitos',
+        verbose_name='Orden de Compra Proveedor'
+    )
     numero_remito = models.CharField('Número de Remito', max_length=50, unique=True, null=True, blank=True)
     status = models.CharField(
         'Estado',
@@ -500,6 +589,12 @@ class Remito(BaseModel):
         verbose_name = 'Remito'
         verbose_name_plural = 'Remitos'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-created_at'], name='idx_remitos_status_created', condition=NOT_DELETED),
+            models.Index(fields=['-created_at', '-id'], name='idx_remitos_created_id', condition=NOT_DELETED),
+            models.Index(fields=['orden_compra_proveedor'], name='idx_remitos_orden_compra', condition=NOT_DELETED),
+            models.Index(fields=['updated_at', 'id'], name='idx_remitos_updated_id'),
+        ]
     
     def __str__(self):
         return f"Remito {self.numero_remito or self.id}"
@@ -527,14 +622,17 @@ class DetalleRemito(BaseModel):
         verbose_name = 'Detalle de Remito'
         verbose_name_plural = 'Detalles de Remitos'
         indexes = [
-            models.Index(fields=['remito'], name='idx_detalle_remito_remito'),
+            models.Index(fields=['remito'], name='idx_detalle_remito_remito', condition=NOT_DELETED),
+            models.Index(fields=['updated_at', 'id'], name='idx_det_remito_updated_id'),
         ]
     
+    str_select_related = ('remito', 'articulo')
+    
     def __str__(self):
         return f"{self.remito} - {self.articulo}"
 
 
-class Envio(BaseModel):
+class Envio(StatusOutboxMixin, BaseModel):
     """Shipment model."""
     
     remito = models.ForeignKey(
@@ -563,6 +661,11 @@ class Envio(BaseModel):
         verbose_name = 'Envío'
         verbose_name_plural = 'Envíos'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-created_at'], name='idx_envios_status_created', condition=NOT_DELETED),
+            models.Index(fields=['-created_at', '-id'], name='idx_envios_created_id', condition=NOT_DELETED),
+            models.Index(fields=['updated_at', 'id'], name='idx_envios_updated_id'),
+        ]
     
     def __str__(self):
         return f"Envío {self.numero_seguimiento or self.id}"
@@ -596,6 +699,8 @@ class Comunicacion(BaseModel):
         verbose_name_plural = 'Comunicaciones'
         ordering = ['-created_at']
     
+    str_select_related = ('usuario',)
+    
     def __str__(self):
         return f"Comunicación de {self.usuario} - {self.created_at}"
 
@@ -628,6 +733,8 @@ class Actividad(models.Model):
             models.Index(fields=['tipo'], name='idx_actividades_tipo'),
         ]
     
+    str_select_related = ('usuario',)
+    
     def __str__(self):
         return f"{self.tipo} - {self.tipo_entidad} - {self.usuario}"
 
@@ -656,6 +763,11 @@ class PedidoCotizacionSolped(BaseModel):
         verbose_name = 'Pedido Cotización-Solped'
         verbose_name_plural = 'Pedidos Cotización-Solpeds'
         unique_together = ['pedido_cotizacion', 'solped']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='idx_ped_cotiz_solped_upd_id'),
+        ]
+    
+    str_select_related = ('pedido_cotizacion', 'solped')
     
     def __str__(self):
         return f"{self.pedido_cotizacion} - {self.solped}"
@@ -681,6 +793,11 @@ class CotizacionSolped(BaseModel):
         verbose_name = 'Cotización-Solped'
         verbose_name_plural = 'Cotizaciones-Solpeds'
         unique_together = ['cotizacion', 'solped']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='idx_cotiz_solped_updated_id'),
+        ]
+    
+    str_select_related = ('cotizacion', 'solped')
     
     def __str__(self):
         return f"{self.cotizacion} - {self.solped}"
@@ -706,6 +823,118 @@ class CotizacionGanador(BaseModel):
         verbose_name = 'Cotización Ganadora'
         verbose_name_plural = 'Cotizaciones Ganadoras'
         unique_together = ['cotizacion', 'detalle_cotizacion_proveedor']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='idx_cotiz_ganador_updated_id'),
+        ]
+    
+    str_select_related = ('cotizacion', 'detalle_cotizacion_proveedor')
     
     def __str__(self):
         return f"Ganador: {self.cotizacion} - {self.detalle_cotizacion_proveedor}"
+
+
+# ==============================================================================
+# ANALYTICS MODELS
+# ==============================================================================
+
+class GastoMensual(models.Model):
+    """Spend rollup per supplier, month, article family and currency, rebuilt by Celery."""
+    
+    proveedor = models.ForeignKey(
+        Proveedor,
+        on_delete=models.CASCADE,
+        related_name='gastos_mensuales',
+        verbose_name='Proveedor'
+    )
+    mes = models.DateField('Mes')
+    familia = models.CharField('Familia', max_length=255, blank=True)
+    moneda = models.CharField('Moneda', max_length=3)
+    total = models.DecimalField('Total', max_digits=20, decimal_places=2)
+    lineas = models.IntegerField('Líneas')
+    actualizado = models.DateTimeField('Actualizado', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Gasto Mensual'
+        verbose_name_plural = 'Gastos Mensuales'
+        constraints = [
+            # Leads with the month: refreshes and reports scan month ranges
+            models.UniqueConstraint(
+                fields=['mes', 'proveedor', 'familia', 'moneda'],
+                name='uniq_gasto_mensual',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['proveedor', 'mes'], name='idx_gasto_mensual_prov_mes'),
+        ]
+    
+    def __str__(self):
+        return f"{self.proveedor_id} - {self.mes:%Y-%m} - {self.familia} - {self.moneda}"
+
+
+class EmbudoSolped(models.Model):
+    """Funnel fact row: when each solped first reached every downstream document."""
+    
+    solped = models.OneToOneField(
+        Solped,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='embudo',
+        verbose_name='Solped'
+    )
+    creada = models.DateTimeField('Solped Creada')
+    pedido_cotizacion = models.ForeignKey(
+        PedidoDeCotizacion,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Pedido de Cotización'
+    )
+    pedido_cotizacion_creado = models.DateTimeField('Pedido de Cotización Creado', null=True, blank=True)
+    cotizacion = models.ForeignKey(
+        Cotizacion,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Cotización'
+    )
+    cotizacion_creada = models.DateTimeField('Cotización Creada', null=True, blank=True)
+    orden_compra = models.ForeignKey(
+        OrdenCompraProveedor,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Orden de Compra Proveedor'
+    )
+    orden_compra_creada = models.DateTimeField('Orden de Compra Creada', null=True, blank=True)
+    remito = models.ForeignKey(
+        Remito,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Remito'
+    )
+    remito_creado = models.DateTimeField('Remito Creado', null=True, blank=True)
+    envio = models.ForeignKey(
+        Envio,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Envío'
+    )
+    entregado = models.DateField('Entregado', null=True, blank=True)
+    actualizado = models.DateTimeField('Actualizado', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Embudo de Solped'
+        verbose_name_plural = 'Embudo de Solpeds'
+        indexes = [
+            models.Index(fields=['creada'], name='idx_embudo_creada'),
+        ]
+    
+    def __str__(self):
+        return f"Embudo {self.solped_id}"
@@ -0,0 +1,314 @@
+"""
+Document reports rendered by Celery workers and stored through the
+default file storage.
+
+Every output is keyed on its document's version: the latest
+``updated_at`` of the document and of the rows printed with it. A
+version already rendered is served from storage and never rendered
+again. A batch of documents shares one compiled template, one font
+configuration and one query per relation.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F, Max, Prefetch
+from django.db.models.functions import Coalesce, Greatest
+from django.template import engines
+from django.utils import timezone
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from .models import Cotizacion, CotizacionGanador, DetalleOrdenCompraProveedor, OrdenCompraProveedor
+
+FORMATS = {
+    'pdf': 'application/pdf',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Rendered outputs stay known to the cache this long; storage keeps them
+# after that, so an expired entry costs one existence check
+REPORT_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+
+# Who queued a render task is kept as long as Celery keeps its result
+REPORT_TASK_TIMEOUT = 24 * 60 * 60
+
+
+class DocumentReport:
+    """
+    One kind of report, rendered for many documents at once.
+
+    Subclasses name the documents' ``model``, the relations whose
+    ``updated_at`` also changes the output (``version_paths``), how to
+    load a batch (``get_queryset``), and the context, title and sheet
+    rows of one document.
+    """
+
+    name = None
+    model = None
+    template_name = None
+    version_paths = ()
+    # Bump when the layout changes to render every document again
+    layout = 1
+
+    def get_queryset(self):
+        return self.model.objects.all()
+
+    def get_context(self, document):
+        raise NotImplementedError
+
+    def get_title(self, document):
+        return str(document)
+
+    def get_rows(self, context):
+        """Header and rows of the document's worksheet."""
+        raise NotImplementedError
+
+    def get_versions(self, pks):
+        """``{pk: version}`` of the live documents among ``pks``, in one query."""
+        latest = [Coalesce(Max(f'{path}__updated_at'), F('updated_at')) for path in self.version_paths]
+        stamp = Greatest(F('updated_at'), *latest) if latest else F('updated_at')
+        rows = self.model.objects.filter(pk__in=pks).order_by().values_list('pk').annotate(version=stamp)
+        return {pk: f'{self.layout}-{version:%Y%m%d%H%M%S%f}' for pk, version in rows}
+
+    def storage_name(self, pk, version, file_format):
+        return f'reportes/{self.name}/{pk}/{version}.{file_format}'
+
+
+class ComparativoCotizacion(DocumentReport):
+    """Winning supplier quotes of a client quotation, with the sale price."""
+
+    name = 'comparativo'
+    model = Cotizacion
+    template_name = 'reportes/comparativo.html'
+    version_paths = (
+        'cliente',
+        'ganadores',
+        'ganadores__detalle_cotizacion_proveedor',
+        'ganadores__detalle_cotizacion_proveedor__articulo',
+        'ganadores__detalle_cotizacion_proveedor__cotizacion_proveedor',
+        'ganadores__detalle_cotizacion_proveedor__cotizacion_proveedor__proveedor',
+    )
+
+    def get_queryset(self):
+        winners = CotizacionGanador.objects.select_related(
+            'detalle_cotizacion_proveedor__articulo',
+            'detalle_cotizacion_proveedor__cotizacion_proveedor__proveedor',
+        ).order_by('detalle_cotizacion_proveedor__cotizacion_proveedor__proveedor__razon_social')
+        return super().get_queryset().select_related('cliente').prefetch_related(
+            Prefetch('ganadores', queryset=winners)
+        )
+
+    def get_title(self, document):
+        return f'Cotización {document.pk}'
+
+    def get_context(self, document):
+        markup = 1 + (document.margen or 0) / Decimal(100)
+        lines = []
+        totals = defaultdict(Decimal)
+        for winner in document.ganadores.all():
+            detail = winner.detalle_cotizacion_proveedor
+            total = detail.cantidad_valor * detail.precio_unitario_valor
+            lines.append({
+                'proveedor': detail.cotizacion_proveedor.proveedor.razon_social,
+                'articulo': str(detail.articulo),
+                'cantidad': detail.cantidad_valor,
+                'unidad': detail.get_cantidad_unidad_display(),
+                'precio_unitario': detail.precio_unitario_valor,
+                'moneda': detail.precio_unitario_moneda,
+                'total': total,
+                'precio_venta': round(total * markup, 2),
+            })
+            totals[detail.precio_unitario_moneda] += total
+        return {
+            'titulo': self.get_title(document),
+            'cotizacion': document,
+            'lineas': lines,
+            'totales': dict(totals),
+        }
+
+    def get_rows(self, context):
+        yield ['Proveedor', 'Artículo', 'Cantidad', 'Unidad', 'Precio Unitario', 'Moneda', 'Total', 'Precio de Venta']
+        for line in context['lineas']:
+            yield [
+                line['proveedor'], line['articulo'], line['cantidad'], line['unidad'],
+                line['precio_unitario'], line['moneda'], line['total'], line['precio_venta'],
+            ]
+
+
+class OrdenCompraReport(DocumentReport):
+    """Purchase order to send to the supplier."""
+
+    name = 'orden_compra'
+    model = OrdenCompraProveedor
+    template_name = 'reportes/orden_compra.html'
+    version_paths = ('proveedor', 'detalles', 'detalles__articulo')
+
+    def get_queryset(self):
+        details = DetalleOrdenCompraProveedor.objects.select_related('articulo').order_by('created_at')
+        return super().get_queryset().select_related('proveedor').prefetch_related(
+            Prefetch('detalles', queryset=details)
+        )
+
+    def get_title(self, document):
+        return f'Orden de Compra {document.numero_orden or document.pk}'
+
+    def get_context(self, document):
+        lines = []
+        totals = defaultdict(Decimal)
+        for detail in document.detalles.all():
+            subtotal = detail.cantidad_valor * detail.precio_unitario_valor
+            lines.append({
+                'articulo': str(detail.articulo),
+                'codigo': detail.articulo.codigo_fabricante,
+                'cantidad': detail.cantidad_valor,
+                'unidad': detail.get_cantidad_unidad_display(),
+                'precio_unitario': detail.precio_unitario_valor,
+                'moneda': detail.precio_unitario_moneda,
+                'subtotal': subtotal,
+            })
+            totals[detail.precio_unitario_moneda] += subtotal
+        return {
+            'titulo': self.get_title(document),
+            'orden': document,
+            'lineas': lines,
+            'totales': dict(totals),
+        }
+
+    def get_rows(self, context):
+        yield ['Artículo', 'Código', 'Cantidad', 'Unidad', 'Precio Unitario', 'Moneda', 'Subtotal']
+        for line in context['lineas']:
+            yield [
+                line['articulo'], line['codigo'], line['cantidad'], line['unidad'],
+                line['precio_unitario'], line['moneda'], line['subtotal'],
+            ]
+
+
+REPORTS = {report.name: report for report in (ComparativoCotizacion(), OrdenCompraReport())}
+
+
+# ==============================================================================
+# CACHE
+# ==============================================================================
+
+def cache_key(report, pk, version, file_format):
+    return f'report:{report.name}:{file_format}:{pk}:{version}'
+
+
+def find_rendered(report, file_format, pks):
+    """
+    Split ``pks`` into outputs already rendered and documents to render.
+
+    Returns ``({pk: storage name}, {pk: version})``. Documents that no
+    longer exist appear in neither.
+    """
+    versions = report.get_versions(pks)
+    keys = {cache_key(report, pk, version, file_format): pk for pk, version in versions.items()}
+    found = {keys[key]: name for key, name in cache.get_many(keys).items()}
+    missing = {}
+    for pk, version in versions.items():
+        if pk in found:
+            continue
+        name = report.storage_name(pk, version, file_format)
+        # The cache entry expired but the file was kept
+        if default_storage.exists(name):
+            found[pk] = name
+            cache.set(cache_key(report, pk, version, file_format), name, REPORT_CACHE_TIMEOUT)
+        else:
+            missing[pk] = version
+    return found, missing
+
+
+def task_key(task_id):
+    return f'report:tarea:{task_id}'
+
+
+def remember_task(task_id, user, report):
+    """Record who queued a render task and for which report."""
+    cache.set(task_key(task_id), {'usuario': user.pk, 'tipo': report.name}, REPORT_TASK_TIMEOUT)
+
+
+def get_task_request(task_id):
+    """``{'usuario': pk, 'tipo': report name}`` of a render task, or None."""
+    return cache.get(task_key(task_id))
+
+
+# ==============================================================================
+# RENDERING
+# ==============================================================================
+
+class PDFRenderer:
+    """HTML from one compiled Jinja2 template, printed by WeasyPrint."""
+
+    def __init__(self, report):
+        # WeasyPrint loads Pango when imported; only workers render PDFs
+        from weasyprint.text.fonts import FontConfiguration
+
+        self.report = report
+        self.template = engines['jinja2'].env.get_template(report.template_name)
+        self.fonts = FontConfiguration()
+
+    def render(self, context):
+        from weasyprint import HTML
+
+        html = self.template.render({**context, 'generado': timezone.localtime()})
+        return HTML(string=html).write_pdf(font_config=self.fonts)
+
+
+class XLSXRenderer:
+    """One worksheet per document, streamed by openpyxl."""
+
+    def __init__(self, report):
+        self.report = report
+        self.header_font = Font(bold=True)
+
+    def render(self, context):
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(context['titulo'][:31])
+        rows = self.report.get_rows(context)
+        header = []
+        for title in next(rows):
+            cell = WriteOnlyCell(sheet, value=title)
+            cell.font = self.header_font
+            header.append(cell)
+        sheet.append(header)
+        for row in rows:
+            sheet.append(row)
+        output = BytesIO()
+        workbook.save(output)
+        return output.getvalue()
+
+
+RENDERERS = {'pdf': PDFRenderer, 'xlsx': XLSXRenderer}
+
+
+def render_documents(report, file_format, versions):
+    """Render and store the documents ``{pk: version}``; return ``{pk: storage name}``."""
+    renderer = RENDERERS[file_format](report)
+    rendered = {}
+    for document in report.get_queryset().filter(pk__in=list(versions)):
+        version = versions[document.pk]
+        name = report.storage_name(document.pk, version, file_format)
+        if not default_storage.exists(name):
+            content = renderer.render(report.get_context(document))
+            name = default_storage.save(name, ContentFile(content))
+        rendered[document.pk] = name
+    cache.set_many(
+        {cache_key(report, pk, versions[pk], file_format): name for pk, name in rendered.items()},
+        REPORT_CACHE_TIMEOUT,
+    )
+    return rendered
+
+
+def render_batch(report_name, file_format, pks):
+    """Render whatever ``pks`` still lacks; return ``{pk: storage name}`` for all of them."""
+    report = REPORTS[report_name]
+    found, missing = find_rendered(report, file_format, pks)
+    if missing:
+        found.update(render_documents(report, file_format, missing))
+    return found
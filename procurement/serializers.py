@@ -0,0 +1,331 @@
+"""
+Serializers for the procurement API.
+"""
+
+from rest_framework import serializers
+
+from core.api import ReadSerializer
+from core.serializers import ArticuloSerializer, ClienteSerializer, ProveedorSerializer
+
+from .models import (
+    Cotizacion, CotizacionGanador, CotizacionProveedor, DetalleOrdenCompraProveedor, DetalleRemito,
+    DetalleSolped, Envio, OrdenCompraCliente, OrdenCompraProveedor, PedidoCotizacionProveedor,
+    PedidoDeCotizacion, Remito, Solped,
+)
+from .reports import FORMATS, REPORTS
+
+
+class StatusTransitionSerializer(serializers.Serializer):
+    """Payload for a bulk status transition."""
+    
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=10000)
+    status = serializers.CharField()
+
+
+class LineBulkSerializer(serializers.Serializer):
+    """Payload for a bulk create or upsert of detail lines; lines are validated by ``lines.write_lines``."""
+    
+    lines = serializers.ListField(allow_empty=False, max_length=10000)
+
+
+class LineDeleteSerializer(serializers.Serializer):
+    """Payload for a bulk delete of detail lines."""
+    
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=10000)
+
+
+class SpendReportSerializer(serializers.Serializer):
+    """Query parameters of the spend report."""
+    
+    anio = serializers.IntegerField(required=False, min_value=2000, max_value=2100)
+    proveedor = serializers.UUIDField(required=False)
+    familia = serializers.CharField(required=False, allow_blank=True)
+    moneda = serializers.CharField(required=False, max_length=3)
+    por = serializers.ChoiceField(choices=['anio', 'mes'], default='anio')
+
+
+class FunnelReportSerializer(serializers.Serializer):
+    """Query parameters of the funnel report."""
+    
+    desde = serializers.DateField(required=False)
+    hasta = serializers.DateField(required=False)
+    
+    def validate(self, attrs):
+        if attrs.get('desde') and attrs.get('hasta') and attrs['desde'] > attrs['hasta']:
+            raise serializers.ValidationError({'hasta': ['Debe ser posterior a desde.']})
+        return attrs
+
+
+class BacklogReportSerializer(serializers.Serializer):
+    """Query parameters of the open-order backlog."""
+    
+    familia = serializers.CharField(required=False)
+    pendientes = serializers.BooleanField(default=False)
+
+
+class DocumentReportSerializer(serializers.Serializer):
+    """Documents to render as one report kind and format."""
+    
+    tipo = serializers.ChoiceField(choices=sorted(REPORTS))
+    formato = serializers.ChoiceField(choices=sorted(FORMATS))
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=500)
+
+
+class SolpedSerializer(ReadSerializer):
+    """Purchase request as listed by the API."""
+    
+    class Meta:
+        model = Solped
+        fields = ['id', 'nro_solped', 'status', 'created_by', 'created_at', 'updated_at']
+
+
+class PedidoDeCotizacionSerializer(ReadSerializer):
+    """Client quote request as listed by the API."""
+    
+    cliente_nombre = serializers.CharField(source='cliente.razon_social', allow_null=True, read_only=True)
+    
+    class Meta:
+        model = PedidoDeCotizacion
+        fields = ['id', 'cliente', 'cliente_nombre', 'status', 'fecha_vencimiento', 'created_at', 'updated_at']
+
+
+class PedidoCotizacionProveedorSerializer(ReadSerializer):
+    """Supplier quote request as listed by the API."""
+    
+    proveedor_nombre = serializers.CharField(source='proveedor.razon_social', read_only=True)
+    
+    class Meta:
+        model = PedidoCotizacionProveedor
+        fields = ['id', 'proveedor', 'proveedor_nombre', 'status', 'fecha_vencimiento', 'created_at', 'updated_at']
+
+
+class CotizacionProveedorSerializer(ReadSerializer):
+    """Supplier quotation as listed by the API."""
+    
+    proveedor_nombre = serializers.CharField(source='proveedor.razon_social', read_only=True)
+    
+    class Meta:
+        model = CotizacionProveedor
+        fields = [
+            'id', 'proveedor', 'proveedor_nombre', 'pedido_cotizacion_proveedor', 'status', 'fecha_vencimiento',
+            'created_at', 'updated_at',
+        ]
+
+
+class CotizacionSerializer(ReadSerializer):
+    """Client quotation as listed by the API."""
+    
+    cliente_nombre = serializers.CharField(source='cliente.razon_social', allow_null=True, read_only=True)
+    
+    class Meta:
+        model = Cotizacion
+        fields = [
+            'id', 'cliente', 'cliente_nombre', 'margen', 'status', 'fecha_vencimiento', 'created_at', 'updated_at',
+        ]
+
+
+class OrdenCompraProveedorSerializer(ReadSerializer):
+    """Supplier purchase order as listed by the API."""
+    
+    proveedor_nombre = serializers.CharField(source='proveedor.razon_social', read_only=True)
+    
+    class Meta:
+        model = OrdenCompraProveedor
+        fields = [
+            'id', 'numero_orden', 'proveedor', 'proveedor_nombre', 'cotizacion', 'status',
+            'fecha_entrega_estimada', 'created_at', 'updated_at',
+        ]
+
+
+class OrdenCompraClienteSerializer(ReadSerializer):
+    """Client purchase order as listed by the API."""
+    
+    cliente_nombre = serializers.CharField(source='cliente.razon_social', allow_null=True, read_only=True)
+    
+    class Meta:
+        model = OrdenCompraCliente
+        fields = [
+            'id', 'numero_orden', 'cliente', 'cliente_nombre', 'status', 'fecha_entrega_estimada',
+            'created_at', 'updated_at',
+        ]
+
+
+class RemitoSerializer(ReadSerializer):
+    """Delivery receipt as listed by the API."""
+    
+    destinatario_nombre = serializers.CharField(source='destinatario.razon_social', allow_null=True, read_only=True)
+    
+    class Meta:
+        model = Remito
+        fields = [
+            'id', 'numero_remito', 'destinatario', 'destinatario_nombre', 'orden_compra_proveedor', 'status',
+            'fecha_envio', 'fecha_entrega_estimada', 'created_at', 'updated_at',
+        ]
+
+
+class EnvioSerializer(ReadSerializer):
+    """Shipment as listed by the API."""
+    
+    remito_numero = serializers.CharField(source='remito.numero_remito', allow_null=True, read_only=True)
+    despachante_nombre = serializers.CharField(source='despachante.razon_social', read_only=True)
+    
+    class Meta:
+        model = Envio
+        fields = [
+            'id', 'remito', 'remito_numero', 'despachante', 'despachante_nombre', 'numero_seguimiento', 'status',
+            'fecha_envio', 'fecha_entrega_real', 'created_at', 'updated_at',
+        ]
+
+
+# ==============================================================================
+# DOCUMENT GRAPHS
+# ==============================================================================
+
+# Article fields shown on every line of a document graph
+ARTICULO_FIELDS = ['id', 'descripcion', 'marca', 'modelo', 'codigo_fabricante', 'familia', 'unidad_base']
+
+
+class DetalleSolpedGraphSerializer(serializers.ModelSerializer):
+    """Solped line with its article."""
+    
+    articulo = ArticuloSerializer(fields=ARTICULO_FIELDS)
+    
+    class Meta:
+        model = DetalleSolped
+        fields = ['id', 'articulo', 'cantidad_valor', 'cantidad_unidad']
+
+
+class DetalleOrdenCompraProveedorGraphSerializer(serializers.ModelSerializer):
+    """Purchase order line with its article."""
+    
+    articulo = ArticuloSerializer(fields=ARTICULO_FIELDS)
+    
+    class Meta:
+        model = DetalleOrdenCompraProveedor
+        fields = [
+            'id', 'articulo', 'cantidad_valor', 'cantidad_unidad', 'precio_unitario_valor', 'precio_unitario_moneda',
+        ]
+
+
+class DetalleRemitoGraphSerializer(serializers.ModelSerializer):
+    """Delivery receipt line with its article."""
+    
+    articulo = ArticuloSerializer(fields=ARTICULO_FIELDS)
+    
+    class Meta:
+        model = DetalleRemito
+        fields = ['id', 'articulo', 'cantidad_valor', 'cantidad_unidad']
+
+
+class EnvioGraphSerializer(EnvioSerializer):
+    """Shipment with its shipping company."""
+    
+    despachante = serializers.SerializerMethodField()
+    
+    class Meta(EnvioSerializer.Meta):
+        fields = [
+            'id', 'despachante', 'numero_seguimiento', 'status', 'fecha_envio', 'fecha_entrega_real',
+            'created_at', 'updated_at',
+        ]
+    
+    def get_despachante(self, envio):
+        despachante = envio.despachante
+        return {'id': despachante.pk, 'razon_social': despachante.razon_social, 'telefono': despachante.telefono}
+
+
+class RemitoGraphSerializer(RemitoSerializer):
+    """Delivery receipt with its lines and shipments."""
+    
+    detalles = DetalleRemitoGraphSerializer(many=True)
+    envios = EnvioGraphSerializer(many=True)
+    
+    class Meta(RemitoSerializer.Meta):
+        fields = [*RemitoSerializer.Meta.fields, 'detalles', 'envios']
+
+
+class OrdenCompraProveedorGraphSerializer(OrdenCompraProveedorSerializer):
+    """Purchase order with its supplier, quotation, lines and remitos."""
+    
+    proveedor = ProveedorSerializer()
+    cotizacion = CotizacionSerializer(fields=['id', 'cliente', 'cliente_nombre', 'status'], allow_null=True)
+    detalles = DetalleOrdenCompraProveedorGraphSerializer(many=True)
+    remitos = RemitoGraphSerializer(many=True)
+    
+    class Meta(OrdenCompraProveedorSerializer.Meta):
+        fields = [
+            'id', 'numero_orden', 'proveedor', 'cotizacion', 'status', 'fecha_entrega_estimada',
+            'created_at', 'updated_at', 'detalles', 'remitos',
+        ]
+
+
+class GanadorGraphSerializer(serializers.ModelSerializer):
+    """Winning supplier quote line of a quotation."""
+    
+    articulo = ArticuloSerializer(source='detalle_cotizacion_proveedor.articulo', fields=ARTICULO_FIELDS)
+    proveedor = ProveedorSerializer(
+        source='detalle_cotizacion_proveedor.cotizacion_proveedor.proveedor', fields=['id', 'razon_social', 'cuit'],
+    )
+    cotizacion_proveedor = serializers.UUIDField(source='detalle_cotizacion_proveedor.cotizacion_proveedor_id')
+    detalle = serializers.UUIDField(source='detalle_cotizacion_proveedor_id')
+    cantidad_valor = serializers.DecimalField(
+        source='detalle_cotizacion_proveedor.cantidad_valor', max_digits=15, decimal_places=3,
+    )
+    cantidad_unidad = serializers.CharField(source='detalle_cotizacion_proveedor.cantidad_unidad')
+    precio_unitario_valor = serializers.DecimalField(
+        source='detalle_cotizacion_proveedor.precio_unitario_valor', max_digits=15, decimal_places=2,
+    )
+    precio_unitario_moneda = serializers.CharField(source='detalle_cotizacion_proveedor.precio_unitario_moneda')
+    
+    class Meta:
+        model = CotizacionGanador
+        fields = [
+            'id', 'detalle', 'cotizacion_proveedor', 'proveedor', 'articulo', 'cantidad_valor', 'cantidad_unidad',
+            'precio_unitario_valor', 'precio_unitario_moneda',
+        ]
+
+
+class CotizacionGraphSerializer(CotizacionSerializer):
+    """Quotation with its client, winning lines, solpeds and purchase orders."""
+    
+    cliente = ClienteSerializer()
+    ganadores = GanadorGraphSerializer(many=True)
+    solpeds = serializers.SerializerMethodField()
+    ordenes_compra_proveedor = OrdenCompraProveedorSerializer(many=True)
+    
+    class Meta(CotizacionSerializer.Meta):
+        fields = [
+            'id', 'cliente', 'margen', 'status', 'fecha_vencimiento', 'created_at', 'updated_at',
+            'ganadores', 'solpeds', 'ordenes_compra_proveedor',
+        ]
+    
+    def get_solpeds(self, cotizacion):
+        solpeds = [link.solped for link in cotizacion.cotizacion_solpeds.all()]
+        return SolpedSerializer(solpeds, many=True, context=self.context).data
+
+
+class SolpedCotizacionGraphSerializer(CotizacionSerializer):
+    """Quotation linked to a solped, with the purchase orders placed from it."""
+    
+    ordenes_compra_proveedor = OrdenCompraProveedorSerializer(many=True)
+    
+    class Meta(CotizacionSerializer.Meta):
+        fields = [*CotizacionSerializer.Meta.fields, 'ordenes_compra_proveedor']
+
+
+class SolpedGraphSerializer(SolpedSerializer):
+    """Solped with its lines, quote requests, quotations and their purchase orders."""
+    
+    detalles = DetalleSolpedGraphSerializer(many=True)
+    pedidos_cotizacion = serializers.SerializerMethodField()
+    cotizaciones = serializers.SerializerMethodField()
+    
+    class Meta(SolpedSerializer.Meta):
+        fields = [*SolpedSerializer.Meta.fields, 'detalles', 'pedidos_cotizacion', 'cotizaciones']
+    
+    def get_pedidos_cotizacion(self, solped):
+        pedidos = [link.pedido_cotizacion for link in solped.pedido_cotizacion_solpeds.all()]
+        return PedidoDeCotizacionSerializer(pedidos, many=True, context=self.context).data
+    
+    def get_cotizaciones(self, solped):
+        cotizaciones = [link.cotizacion for link in solped.cotizacion_solpeds.all()]
+        return SolpedCotizacionGraphSerializer(cotizaciones, many=True, context=self.context).data
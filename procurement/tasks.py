@@ -0,0 +1,65 @@
+"""
+Celery tasks for background jobs of the procurement app.
+"""
+
+import logging
+
+from celery import shared_task
+from django.db import OperationalError
+
+from . import analytics, backlog, reports
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(
+    acks_late=True,
+    autoretry_for=(OperationalError,),
+    retry_backoff=True,
+    max_retries=3,
+)
+def refresh_spend_rollup(full=False):
+    """Recompute the monthly spend rollup; scheduled every few minutes."""
+    months = analytics.refresh_spend_rollup(full=full)
+    if months is None:
+        logger.info('Spend rollup rebuilt')
+        return None
+    logger.info('Spend rollup refreshed for %s month(s)', len(months))
+    return sorted(month.isoformat() for month in months)
+
+
+@shared_task(
+    acks_late=True,
+    autoretry_for=(OperationalError,),
+    retry_backoff=True,
+    max_retries=3,
+)
+def refresh_funnel(full=False):
+    """Recompute the solped funnel rows; scheduled every few minutes."""
+    refreshed = analytics.refresh_funnel(full=full)
+    logger.info('Funnel refreshed for %s solped(s)', refreshed)
+    return refreshed
+
+
+@shared_task(
+    acks_late=True,
+    autoretry_for=(OperationalError,),
+    retry_backoff=True,
+    max_retries=3,
+)
+def refresh_backlog_snapshot():
+    """Recompute the cached open-order backlog; scheduled every few minutes."""
+    snapshot = backlog.refresh_backlog_snapshot()
+    return len(snapshot['articulos'])
+
+
+@shared_task(
+    acks_late=True,
+    autoretry_for=(OperationalError,),
+    retry_backoff=True,
+    max_retries=3,
+)
+def render_reports(report_name, file_format, pks):
+    """Render a batch of document reports; return ``{pk: storage name}``."""
+    rendered = reports.render_batch(report_name, file_format, pks)
+    return {str(pk): name for pk, name in rendered.items()}
@@ -1,3 +1,655 @@
-from django.test import TestCase
+"""
+Tests for the procurement API and integrations.
+"""
 
-# Create your tests here.
+import itertools
+import json
+import tempfile
+import threading
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core import outbox, webhooks
+from core.tests import drop_other_indexes
+from core.models import (
+    Articulo, Cliente, Despachante, EntregaWebhook, EventoOutbox, Proveedor, StatusEntrega, SuscriptorWebhook,
+    UnidadCantidad,
+)
+
+from .admin import DetalleSolpedInline
+from .analytics import refresh_funnel_rows, refresh_spend_rollup
+from .models import (
+    Cotizacion, CotizacionGanador, CotizacionProveedor, CotizacionSolped, DetalleCotizacionProveedor,
+    DetalleOrdenCompraProveedor, DetalleRemito, DetalleSolped, EmbudoSolped, Envio, GastoMensual,
+    OrdenCompraProveedor, PedidoCotizacionProveedor, PedidoCotizacionSolped, PedidoDeCotizacion, Actividad, Remito,
+    Solped, StatusCotizacion, StatusOrdenCompra, StatusPedidoCotizacion, StatusRemito, StatusSolped,
+    TipoDeActividad, TipoDeEntidad,
+)
+from .reports import render_batch
+from .transitions import bulk_transition
+from .work_queue import (
+    WORK_QUEUE_ITEMS, WORK_QUEUE_MODELS, get_pending_querysets, get_work_queue, work_queue_key,
+)
+
+
+class DocumentGraphQueryTests(TestCase):
+    """The compound document endpoints must not issue queries per line or linked document."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser('admin@example.com', 'password')
+        self.client.force_login(self.user)
+        self.proveedor = Proveedor.objects.create(razon_social='Acme Industrial')
+        self.cliente = Cliente.objects.create(razon_social='Refinería Norte')
+        self.numbers = itertools.count(1001)
+
+    def articulos(self, count):
+        return Articulo.objects.bulk_create([Articulo(descripcion=f'Artículo {n}') for n in range(count)])
+
+    def solpeds(self, count):
+        return Solped.objects.bulk_create([Solped(nro_solped=next(self.numbers)) for _ in range(count)])
+
+    def cotizaciones(self, count):
+        return Cotizacion.objects.bulk_create([Cotizacion(cliente=self.cliente) for _ in range(count)])
+
+    def assertConstantQueries(self, url_name, document, grow):
+        """Read the graph of ``document`` with one and with many rows added by ``grow(count)``."""
+        url = reverse(f'procurement:{url_name}', args=[document.pk])
+        grow(1)
+        with CaptureQueriesContext(connection) as few:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        grow(20)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(many), len(few), [query['sql'] for query in many.captured_queries])
+        return response.json()
+
+    def test_orden_compra_proveedor(self):
+        orden = OrdenCompraProveedor.objects.create(proveedor=self.proveedor)
+
+        def grow(count):
+            DetalleOrdenCompraProveedor.objects.bulk_create([
+                DetalleOrdenCompraProveedor(
+                    orden_compra_proveedor=orden, articulo=articulo,
+                    cantidad_valor=5, cantidad_unidad=UnidadCantidad.UNIDAD, precio_unitario_valor=10,
+                )
+                for articulo in self.articulos(count)
+            ])
+            remitos = Remito.objects.bulk_create([
+                Remito(orden_compra_proveedor=orden, destinatario=self.cliente) for _ in range(count)
+            ])
+            DetalleRemito.objects.bulk_create([
+                DetalleRemito(remito=remito, articulo=articulo, cantidad_valor=5, cantidad_unidad=UnidadCantidad.UNIDAD)
+                for remito, articulo in zip(remitos, self.articulos(count))
+            ])
+            despachantes = Despachante.objects.bulk_create([
+                Despachante(razon_social=f'Transportes {n}') for n in range(count)
+            ])
+            Envio.objects.bulk_create([
+                Envio(remito=remito, despachante=despachante, numero_seguimiento=f'SEG-{remito.pk}')
+                for remito, despachante in zip(remitos, despachantes)
+            ])
+
+        data = self.assertConstantQueries('ordencompraproveedor-completo', orden, grow)
+        self.assertEqual(len(data['detalles']), 21)
+        self.assertEqual(len(data['remitos']), 21)
+        self.assertEqual(len(data['remitos'][0]['envios']), 1)
+
+    def test_cotizacion(self):
+        cotizacion = Cotizacion.objects.create(cliente=self.cliente)
+        cotizacion_proveedor = CotizacionProveedor.objects.create(proveedor=self.proveedor)
+
+        def grow(count):
+            detalles = DetalleCotizacionProveedor.objects.bulk_create([
+                DetalleCotizacionProveedor(
+                    cotizacion_proveedor=cotizacion_proveedor, articulo=articulo,
+                    cantidad_valor=5, cantidad_unidad=UnidadCantidad.UNIDAD, precio_unitario_valor=10,
+                )
+                for articulo in self.articulos(count)
+            ])
+            CotizacionGanador.objects.bulk_create([
+                CotizacionGanador(cotizacion=cotizacion, detalle_cotizacion_proveedor=detalle) for detalle in detalles
+            ])
+            CotizacionSolped.objects.bulk_create([
+                CotizacionSolped(cotizacion=cotizacion, solped=solped) for solped in self.solpeds(count)
+            ])
+            OrdenCompraProveedor.objects.bulk_create([
+                OrdenCompraProveedor(cotizacion=cotizacion, proveedor=self.proveedor) for _ in range(count)
+            ])
+
+        data = self.assertConstantQueries('cotizacion-completo', cotizacion, grow)
+        self.assertEqual(len(data['ganadores']), 21)
+        self.assertEqual(len(data['solpeds']), 21)
+        self.assertEqual(len(data['ordenes_compra_proveedor']), 21)
+
+    def test_solped(self):
+        solped = Solped.objects.create(nro_solped=1)
+
+        def grow(count):
+            DetalleSolped.objects.bulk_create([
+                DetalleSolped(solped=solped, articulo=articulo, cantidad_valor=5, cantidad_unidad=UnidadCantidad.UNIDAD)
+                for articulo in self.articulos(count)
+            ])
+            pedidos = PedidoDeCotizacion.objects.bulk_create([
+                PedidoDeCotizacion(cliente=self.cliente) for _ in range(count)
+            ])
+            PedidoCotizacionSolped.objects.bulk_create([
+                PedidoCotizacionSolped(solped=solped, pedido_cotizacion=pedido) for pedido in pedidos
+            ])
+            cotizaciones = self.cotizaciones(count)
+            CotizacionSolped.objects.bulk_create([
+                CotizacionSolped(solped=solped, cotizacion=cotizacion) for cotizacion in cotizaciones
+            ])
+            OrdenCompraProveedor.objects.bulk_create([
+                OrdenCompraProveedor(cotizacion=cotizacion, proveedor=self.proveedor) for cotizacion in cotizaciones
+            ])
+
+        data = self.assertConstantQueries('solped-completo', solped, grow)
+        self.assertEqual(len(data['detalles']), 21)
+        self.assertEqual(len(data['pedidos_cotizacion']), 21)
+        self.assertEqual(len(data['cotizaciones'][0]['ordenes_compra_proveedor']), 1)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Local webhook receiver recording every POST; answers with queued statuses, then 200."""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.received.append((self.headers, body))
+        self.send_response(self.server.statuses.pop(0) if self.server.statuses else 200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@override_settings(WEBHOOK_BATCH_SIZE=2, WEBHOOK_BACKOFF_BASE=60)
+class WebhookDeliveryTests(TestCase):
+    """Status changes reach subscribers through the outbox, in order, batched and retried."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        self.server.received, self.server.statuses = [], []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.user = get_user_model().objects.create_superuser('admin@example.com', 'password')
+        self.subscriber = SuscriptorWebhook.objects.create(
+            nombre='ERP', url=f'http://127.0.0.1:{self.server.server_port}/hooks',
+            secreto='secreto', modelos=['procurement.Remito'],
+        )
+        self.cliente = Cliente.objects.create(razon_social='Refinería Norte')
+
+    def remito(self):
+        return Remito.objects.create(destinatario=self.cliente)
+
+    def received_events(self):
+        return [event for _, body in self.server.received for event in json.loads(body)['eventos']]
+
+    def test_changes_are_delivered_in_batches(self):
+        first, second = self.remito(), self.remito()
+        first.status = StatusRemito.ENVIADO
+        first.save()
+        second.save()
+        bulk_transition(Remito.objects.filter(pk__in=[first.pk, second.pk]), StatusRemito.ENVIADO, self.user)
+        self.assertEqual(EventoOutbox.objects.filter(modelo='procurement.Remito').count(), 4)
+
+        self.assertEqual(outbox.fan_out_events(), EventoOutbox.objects.count())
+        self.assertEqual(webhooks.deliver(self.subscriber.pk), 4)
+
+        self.assertEqual(len(self.server.received), 2)
+        headers, body = self.server.received[0]
+        self.assertEqual(headers[webhooks.SIGNATURE_HEADER], webhooks.sign('secreto', body))
+        self.assertEqual(
+            [(event['id_entidad'], event['status_anterior'], event['status_nuevo']) for event in self.received_events()],
+            [
+                (str(first.pk), None, StatusRemito.BORRADOR),
+                (str(second.pk), None, StatusRemito.BORRADOR),
+                (str(first.pk), StatusRemito.BORRADOR, StatusRemito.ENVIADO),
+                (str(second.pk), StatusRemito.BORRADOR, StatusRemito.ENVIADO),
+            ],
+        )
+        delivered = EntregaWebhook.objects.filter(status=StatusEntrega.ENTREGADA)
+        self.assertEqual(delivered.count(), 4)
+        self.assertFalse(delivered.filter(latencia_ms__isnull=True).exists())
+
+    def test_failed_batch_backs_off_and_retries(self):
+        self.remito()
+        outbox.fan_out_events()
+        self.server.statuses = [503]
+
+        self.assertEqual(webhooks.deliver(self.subscriber.pk), 0)
+        self.subscriber.refresh_from_db()
+        self.assertEqual(self.subscriber.fallos_consecutivos, 1)
+        self.assertGreater(self.subscriber.proximo_intento, timezone.now() + timedelta(seconds=30))
+        self.assertEqual(outbox.get_due_subscribers(), [])
+        self.assertEqual(webhooks.deliver(self.subscriber.pk), 0)
+        self.assertEqual(len(self.server.received), 1)
+
+        SuscriptorWebhook.objects.filter(pk=self.subscriber.pk).update(proximo_intento=timezone.now())
+        self.assertEqual(webhooks.deliver(self.subscriber.pk), 1)
+        delivery = EntregaWebhook.objects.get()
+        self.assertEqual((delivery.status, delivery.intentos), (StatusEntrega.ENTREGADA, 2))
+        self.subscriber.refresh_from_db()
+        self.assertEqual((self.subscriber.fallos_consecutivos, self.subscriber.proximo_intento), (0, None))
+
+
+class BulkTransitionTests(TestCase):
+    """One call moves the allowed rows, leaves the others and logs each move once."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser('compras@example.com', 'password')
+        self.author = get_user_model().objects.create_superuser('deposito@example.com', 'password')
+        self.cliente = Cliente.objects.create(razon_social='Minera del Sur')
+
+    def remito(self, status):
+        return Remito.objects.create(destinatario=self.cliente, status=status, updated_by=self.author)
+
+    def test_allowed_and_rejected_rows(self):
+        drafts = [self.remito(StatusRemito.BORRADOR) for _ in range(2)]
+        delivered = self.remito(StatusRemito.ENTREGADO)
+        events = EventoOutbox.objects.count()
+
+        with mock.patch('procurement.transitions.record_transition') as record_transition:
+            result = bulk_transition(
+                Remito.objects.filter(pk__in=[remito.pk for remito in drafts + [delivered]]),
+                StatusRemito.ENVIADO, self.user,
+            )
+
+        self.assertCountEqual(result.updated, [remito.pk for remito in drafts])
+        self.assertEqual(result.rejected, {delivered.pk: StatusRemito.ENTREGADO})
+        for remito in drafts:
+            remito.refresh_from_db()
+            self.assertEqual((remito.status, remito.updated_by), (StatusRemito.ENVIADO, self.user))
+        delivered.refresh_from_db()
+        self.assertEqual((delivered.status, delivered.updated_by), (StatusRemito.ENTREGADO, self.author))
+
+        activities = Actividad.objects.filter(tipo_entidad=TipoDeEntidad.REMITO)
+        self.assertCountEqual(activities.values_list('id_entidad', flat=True), result.updated)
+        self.assertEqual(
+            set(activities.values_list('usuario', 'tipo')), {(self.user.pk, TipoDeActividad.UPDATE)},
+        )
+        self.assertEqual(
+            activities.first().data,
+            {'status_anterior': StatusRemito.BORRADOR, 'status_nuevo': StatusRemito.ENVIADO},
+        )
+        record_transition.assert_called_once_with(Remito, [StatusRemito.BORRADOR] * 2, StatusRemito.ENVIADO)
+        moved = EventoOutbox.objects.order_by('pk')[events:]
+        self.assertCountEqual(
+            [(event.id_entidad, event.status_anterior, event.status_nuevo) for event in moved],
+            [(remito.pk, StatusRemito.BORRADOR, StatusRemito.ENVIADO) for remito in drafts],
+        )
+
+    def test_approval_is_logged_as_approve(self):
+        solped = Solped.objects.create(nro_solped=1001, status=StatusSolped.ENVIADA)
+        result = bulk_transition(Solped.objects.filter(pk=solped.pk), StatusSolped.APROBADA, self.user)
+        self.assertEqual(result.updated, [solped.pk])
+        activity = Actividad.objects.get(id_entidad=solped.pk)
+        self.assertEqual((activity.tipo, activity.tipo_entidad), (TipoDeActividad.APPROVE, TipoDeEntidad.SOLPED))
+
+    def test_nothing_allowed_writes_nothing(self):
+        solped = Solped.objects.create(nro_solped=1002, status=StatusSolped.BORRADOR)
+        with CaptureQueriesContext(connection) as queries:
+            result = bulk_transition(Solped.objects.filter(pk=solped.pk), StatusSolped.APROBADA, self.user)
+        self.assertEqual((result.updated, result.rejected), ([], {solped.pk: StatusSolped.BORRADOR}))
+        self.assertFalse(Actividad.objects.exists())
+        self.assertFalse(any(query['sql'].startswith('UPDATE') for query in queries.captured_queries))
+
+
+class LineBulkViewTests(TestCase):
+    """Bulk line writes are all or nothing, idempotent by id, with errors keyed by position."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser('compras@example.com', 'password')
+        self.client.force_login(self.user)
+        self.solped = Solped.objects.create(nro_solped=1001)
+        self.articulo = Articulo.objects.create(descripcion='Válvula esférica')
+
+    def post(self, action, payload):
+        url = reverse('procurement:line-bulk', args=['detallesolped', action])
+        return self.client.post(url, payload, content_type='application/json')
+
+    def line(self, pk, quantity):
+        return {
+            'id': str(pk), 'solped': str(self.solped.pk), 'articulo': str(self.articulo.pk),
+            'cantidad_valor': str(quantity), 'cantidad_unidad': 'UNIDAD',
+        }
+
+    def test_create_upsert_and_resend(self):
+        first, second = uuid.uuid4(), uuid.uuid4()
+        lines = [self.line(first, 5), self.line(second, 10)]
+        response = self.post('create', {'lines': lines})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['results'], [
+            {'id': str(first), 'result': 'created'}, {'id': str(second), 'result': 'created'},
+        ])
+
+        # Only the fields sent change
+        response = self.post('upsert', {'lines': [{'id': str(first), 'cantidad_valor': '7'}]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], 1)
+        line = DetalleSolped.objects.get(pk=first)
+        self.assertEqual((line.cantidad_valor, line.cantidad_unidad), (Decimal('7'), 'UNIDAD'))
+        self.assertEqual(line.updated_by, self.user)
+
+        # Resending the original payload updates the same lines
+        response = self.post('upsert', {'lines': lines})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['created'], response.json()['updated']), (0, 2))
+        self.assertEqual(self.solped.detalles.count(), 2)
+        self.assertEqual(DetalleSolped.objects.get(pk=first).cantidad_valor, Decimal('5'))
+        response = self.post('create', {'lines': lines})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['lines']['0'], {'id': ['Ya existe.']})
+
+    def test_one_bad_line_rejects_the_payload(self):
+        first = uuid.uuid4()
+        missing_articulo = {**self.line(uuid.uuid4(), 3), 'articulo': str(uuid.uuid4())}
+        response = self.post('create', {'lines': [self.line(first, 5), missing_articulo, self.line(first, 6)]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'lines': {
+            '1': {'articulo': ['No existe.']},
+            '2': {'id': ['Repetido en el envío.']},
+        }})
+        self.assertFalse(DetalleSolped.all_objects.exists())
+
+    def test_deleted_line_is_not_revived(self):
+        pk = uuid.uuid4()
+        self.post('create', {'lines': [self.line(pk, 5)]})
+        DetalleSolped.objects.get(pk=pk).delete(user=self.user)
+        response = self.post('upsert', {'lines': [self.line(pk, 5)]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'lines': {'0': {'id': ['La línea fue eliminada.']}}})
+
+    def test_delete_reports_missing(self):
+        live, unknown = uuid.uuid4(), uuid.uuid4()
+        self.post('create', {'lines': [self.line(live, 5)]})
+        response = self.post('delete', {'ids': [str(live), str(unknown)]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'deleted': 1, 'results': [
+            {'id': str(live), 'result': 'deleted'}, {'id': str(unknown), 'result': 'missing'},
+        ]})
+        self.assertIsNotNone(DetalleSolped.all_objects.get(pk=live).deleted_at)
+
+
+class LazyInlineViewTests(TestCase):
+    """The admin line endpoints page, save and bulk-edit lines, rejecting malformed ids."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser('compras@example.com', 'password')
+        self.client.force_login(self.user)
+        self.solped = Solped.objects.create(nro_solped=1001)
+        articulo = Articulo.objects.create(descripcion='Válvula esférica')
+        self.lines = [
+            DetalleSolped.objects.create(
+                solped=self.solped, articulo=articulo, cantidad_valor=quantity, cantidad_unidad=UnidadCantidad.UNIDAD,
+            )
+            for quantity in (5, 10, 15)
+        ]
+
+    def url(self, name):
+        return reverse(f'admin:procurement_solped_{name}', args=[self.solped.pk, 'detalles'])
+
+    def post(self, name, payload):
+        return self.client.post(self.url(name), payload, content_type='application/json')
+
+    def quantities(self):
+        return list(self.solped.detalles.order_by('created_at').values_list('cantidad_valor', flat=True))
+
+    def test_page(self):
+        with mock.patch.object(DetalleSolpedInline, 'lines_per_page', 2):
+            response = self.client.get(self.url('lines'), {'page': 2})
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertEqual((data['count'], data['page'], data['num_pages']), (3, 2, 2))
+            self.assertEqual(
+                [field['name'] for field in data['fields']], ['articulo', 'cantidad_valor', 'cantidad_unidad'],
+            )
+            self.assertEqual(data['rows'][0]['id'], str(self.lines[2].pk))
+            self.assertEqual(data['rows'][0]['values']['articulo']['display'], 'Válvula esférica')
+
+            # Unchanged lines revalidate
+            response = self.client.get(self.url('lines'), {'page': 2}, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 304)
+
+    def test_save(self):
+        first, second, third = self.lines
+        response = self.post('lines_save', {
+            'rows': [{'id': str(first.pk), 'cantidad_valor': '7'}, {'id': str(second.pk), 'cantidad_valor': '10'}],
+            'deleted': [str(third.pk)],
+        })
+        self.assertEqual(response.status_code, 200)
+        # Unchanged rows are not written
+        self.assertEqual(response.json(), {'updated': 1, 'deleted': 1})
+        self.assertEqual(self.quantities(), [Decimal('7'), Decimal('10')])
+        first.refresh_from_db()
+        self.assertEqual(first.updated_by, self.user)
+
+        response = self.post('lines_save', {'rows': [{'id': str(first.pk), 'cantidad_valor': 'x'}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cantidad_valor', response.json()['errors'][str(first.pk)])
+
+    def test_save_rejects_malformed_ids(self):
+        for payload in (
+            {'rows': [{'id': 'no-es-un-uuid', 'cantidad_valor': '7'}]},
+            {'deleted': [str(self.lines[0].pk), {'id': 1}]},
+        ):
+            response = self.post('lines_save', payload)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'error': 'Identificador de línea inválido'})
+        self.assertEqual(self.solped.detalles.count(), 3)
+
+    def test_save_rejects_malformed_payloads(self):
+        # A bare string goes through unencoded
+        for payload in ([str(self.lines[0].pk)], '"rows"', {'rows': ['id']}, {'rows': {}}, {'deleted': 'id'}):
+            response = self.post('lines_save', payload)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'error': 'Formato de datos inválido'})
+        self.assertEqual(self.solped.detalles.count(), 3)
+
+    def test_bulk(self):
+        first, second, _ = self.lines
+        response = self.post('lines_bulk', {
+            'action': 'update', 'ids': [str(first.pk), str(second.pk)], 'values': {'cantidad_valor': '8'},
+        })
+        self.assertEqual(response.json(), {'action': 'update', 'count': 2})
+        response = self.post('lines_bulk', {'action': 'scale', 'all': True, 'field': 'cantidad_valor', 'factor': '2'})
+        self.assertEqual(response.json(), {'action': 'scale', 'count': 3})
+        self.assertEqual(self.quantities(), [Decimal('16'), Decimal('16'), Decimal('30')])
+
+        response = self.post('lines_bulk', {'action': 'update', 'ids': [str(first.pk)], 'values': {'solped': 'x'}})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'errors': {'solped': ['Campo no editable']}})
+        response = self.post('lines_bulk', {'action': 'delete', 'ids': ['no-es-un-uuid']})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Identificador de línea inválido'})
+        self.assertEqual(self.solped.detalles.count(), 3)
+
+    def test_bulk_rejects_malformed_payloads(self):
+        for payload in (
+            ['delete'], '"delete"', {'action': 'delete', 'ids': str(self.lines[0].pk)},
+            {'action': 'update', 'all': True, 'values': [['cantidad_valor', '8']]},
+        ):
+            response = self.post('lines_bulk', payload)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'error': 'Formato de datos inválido'})
+        self.assertEqual(self.quantities(), [Decimal('5'), Decimal('10'), Decimal('15')])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Advisory locks need PostgreSQL')
+class AnalyticsRefreshLockTests(TestCase):
+    """Refreshes take their table's advisory lock before replacing rows."""
+
+    def assertLockedBeforeDelete(self, refresh, model):
+        with CaptureQueriesContext(connection) as queries:
+            refresh()
+        statements = [query['sql'] for query in queries.captured_queries]
+        lock = next(n for n, sql in enumerate(statements) if 'pg_advisory_xact_lock' in sql)
+        delete = next(n for n, sql in enumerate(statements) if sql.startswith(f'DELETE FROM "{model._meta.db_table}"'))
+        self.assertLess(lock, delete)
+
+    def test_spend_rollup(self):
+        self.assertLockedBeforeDelete(lambda: refresh_spend_rollup(full=True), GastoMensual)
+
+    def test_funnel_rows(self):
+        solped = Solped.objects.create(nro_solped=1001)
+        self.assertLockedBeforeDelete(lambda: refresh_funnel_rows([solped.pk]), EmbudoSolped)
+
+
+class WorkQueueTests(TestCase):
+    """The work queue reads every group with two UNION ALL queries whose filters can use the partial indexes."""
+
+    # Group -> partial index its filter on created_by and status can use
+    INDEXES = {
+        'solped': 'idx_solpeds_creador_status',
+        'pedidocotizacionproveedor': 'idx_ped_cotiz_prov_creador_st',
+        'cotizacionproveedor': 'idx_cotiz_prov_creador_st_venc',
+        'ordencompraproveedor': 'idx_ord_cpra_prov_creador_st',
+    }
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('compras@example.com', 'password')
+        other = get_user_model().objects.create_user('ventas@example.com', 'password')
+        proveedor = Proveedor.objects.create(razon_social='Acme Industrial')
+        today = timezone.localdate()
+        self.solpeds = [
+            Solped.objects.create(nro_solped=1000 + n, created_by=self.user) for n in range(WORK_QUEUE_ITEMS + 2)
+        ]
+        for days, solped in enumerate(self.solpeds):
+            Solped.objects.filter(pk=solped.pk).update(created_at=timezone.now() - timedelta(days=days))
+        # Not pending, or someone else's
+        Solped.objects.create(nro_solped=2000, created_by=self.user, status=StatusSolped.ENVIADA)
+        Solped.objects.create(nro_solped=2001, created_by=other)
+        PedidoCotizacionProveedor.objects.create(
+            proveedor=proveedor, created_by=self.user, status=StatusPedidoCotizacion.ENVIADO,
+            fecha_vencimiento=today,
+        )
+        CotizacionProveedor.objects.create(
+            proveedor=proveedor, created_by=self.user, status=StatusCotizacion.RECIBIDA,
+            fecha_vencimiento=today + timedelta(days=6 - today.weekday()),
+        )
+        OrdenCompraProveedor.objects.create(
+            proveedor=proveedor, created_by=self.user, status=StatusOrdenCompra.CONFIRMADA,
+            fecha_entrega_estimada=today - timedelta(days=1),
+        )
+        cache.delete(work_queue_key(self.user.pk))
+        self.addCleanup(cache.delete, work_queue_key(self.user.pk))
+
+    @skipUnless(connection.features.supports_slicing_ordering_in_compound, 'Limited UNION branches need PostgreSQL')
+    def test_two_union_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            groups = {group.tipo: group for group in get_work_queue(self.user)}
+        self.assertEqual(len(queries), 2)
+        for query in queries.captured_queries:
+            self.assertEqual(query['sql'].count('UNION ALL'), 3)
+
+        self.assertEqual({tipo: group.total for tipo, group in groups.items()}, {
+            'solped': WORK_QUEUE_ITEMS + 2, 'pedidocotizacionproveedor': 1,
+            'cotizacionproveedor': 1, 'ordencompraproveedor': 1,
+        })
+        # The newest solpeds are listed
+        self.assertEqual(
+            [item['id'] for item in groups['solped'].items],
+            [solped.pk for solped in self.solpeds[:WORK_QUEUE_ITEMS]],
+        )
+        self.assertEqual(groups['ordencompraproveedor'].items[0]['descripcion'], 'Acme Industrial')
+
+        with self.assertNumQueries(0):
+            get_work_queue(self.user)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Partial indexes and EXPLAIN need PostgreSQL')
+    def test_groups_can_use_partial_indexes(self):
+        with connection.cursor() as cursor:
+            for model in WORK_QUEUE_MODELS:
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+            # Tables this small are cheaper to scan; only ask whether an index qualifies
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        pending = get_pending_querysets(self.user, timezone.localdate())
+        for tipo, (_, queryset, _, ordering) in pending.items():
+            # The planner may prefer another index that qualifies too
+            with self.subTest(tipo=tipo), transaction.atomic():
+                drop_other_indexes(queryset.model, self.INDEXES[tipo])
+                self.assertIn(self.INDEXES[tipo], queryset.order_by(ordering).explain())
+                transaction.set_rollback(True)
+
+
+class DocumentReportTests(TestCase):
+    """Outputs are keyed on the document version, and a task is only reported to whoever queued it."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.user = get_user_model().objects.create_user('compras@example.com', 'password')
+        self.user.user_permissions.add(Permission.objects.get(codename='view_ordencompraproveedor'))
+        self.client.force_login(self.user)
+        self.orden = OrdenCompraProveedor.objects.create(proveedor=Proveedor.objects.create(razon_social='Acme'))
+        self.line = DetalleOrdenCompraProveedor.objects.create(
+            orden_compra_proveedor=self.orden, articulo=Articulo.objects.create(descripcion='Válvula esférica'),
+            cantidad_valor=5, cantidad_unidad=UnidadCantidad.UNIDAD, precio_unitario_valor=10,
+        )
+        self.task = self.enterContext(mock.patch('procurement.views.render_reports'))
+        self.task.delay.return_value.id = 'tarea-1'
+
+    def post(self):
+        return self.client.post(
+            reverse('procurement:document-report'),
+            {'tipo': 'orden_compra', 'formato': 'xlsx', 'ids': [str(self.orden.pk)]},
+            content_type='application/json',
+        )
+
+    def test_line_edit_renders_again(self):
+        response = self.post()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['pendientes'], [str(self.orden.pk)])
+        first = render_batch('orden_compra', 'xlsx', [self.orden.pk])[self.orden.pk]
+
+        response = self.post()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['archivos'], {str(self.orden.pk): default_storage.url(first)})
+
+        self.line.cantidad_valor = 7
+        self.line.save()
+        response = self.post()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['pendientes'], [str(self.orden.pk)])
+        self.assertNotEqual(render_batch('orden_compra', 'xlsx', [self.orden.pk])[self.orden.pk], first)
+
+    def test_task_is_reported_to_its_requester(self):
+        self.post()
+        url = reverse('procurement:document-report-task', args=['tarea-1'])
+        with mock.patch('procurement.views.AsyncResult') as result:
+            result.return_value.state = 'SUCCESS'
+            result.return_value.result = {str(self.orden.pk): 'reportes/orden.xlsx'}
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                response.json()['archivos'], {str(self.orden.pk): default_storage.url('reportes/orden.xlsx')},
+            )
+
+            other = get_user_model().objects.create_superuser('ventas@example.com', 'password')
+            self.client.force_login(other)
+            self.assertEqual(self.client.get(url).status_code, 404)
+            self.assertEqual(
+                self.client.get(reverse('procurement:document-report-task', args=['otra'])).status_code, 404,
+            )
+
+            # The requester no longer may view the orders
+            self.user.user_permissions.clear()
+            self.client.force_login(self.user)
+            self.assertEqual(self.client.get(url).status_code, 403)
@@ -0,0 +1,160 @@
+"""
+Set-based status transitions for procurement documents.
+"""
+
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.metrics import record_transition
+from core.outbox import record_events
+
+from .models import (
+    Solped, CotizacionProveedor, Cotizacion, OrdenCompraProveedor,
+    OrdenCompraCliente, Remito, Envio, Actividad,
+    StatusSolped, StatusCotizacion, StatusOrdenCompra, StatusRemito, StatusEnvio,
+    TipoDeActividad, TipoDeEntidad
+)
+
+
+# ==============================================================================
+# ALLOWED TRANSITIONS
+# ==============================================================================
+
+SOLPED_TRANSITIONS = {
+    StatusSolped.BORRADOR: {StatusSolped.ENVIADA},
+    StatusSolped.ENVIADA: {StatusSolped.APROBADA, StatusSolped.RECHAZADA, StatusSolped.BORRADOR},
+    StatusSolped.APROBADA: {StatusSolped.EN_PROCESO},
+    StatusSolped.RECHAZADA: {StatusSolped.BORRADOR},
+    StatusSolped.EN_PROCESO: {StatusSolped.COMPLETADA},
+}
+
+COTIZACION_TRANSITIONS = {
+    StatusCotizacion.BORRADOR: {StatusCotizacion.ENVIADA},
+    StatusCotizacion.ENVIADA: {
+        StatusCotizacion.RECIBIDA, StatusCotizacion.ACEPTADA,
+        StatusCotizacion.RECHAZADA, StatusCotizacion.VENCIDA,
+    },
+    StatusCotizacion.RECIBIDA: {StatusCotizacion.EVALUADA, StatusCotizacion.VENCIDA},
+    StatusCotizacion.EVALUADA: {
+        StatusCotizacion.ACEPTADA, StatusCotizacion.RECHAZADA, StatusCotizacion.VENCIDA,
+    },
+}
+
+ORDEN_COMPRA_TRANSITIONS = {
+    StatusOrdenCompra.BORRADOR: {StatusOrdenCompra.ENVIADA, StatusOrdenCompra.CANCELADA},
+    StatusOrdenCompra.ENVIADA: {StatusOrdenCompra.CONFIRMADA, StatusOrdenCompra.CANCELADA},
+    StatusOrdenCompra.CONFIRMADA: {StatusOrdenCompra.EN_PROCESO, StatusOrdenCompra.CANCELADA},
+    StatusOrdenCompra.EN_PROCESO: {StatusOrdenCompra.COMPLETADA, StatusOrdenCompra.CANCELADA},
+}
+
+REMITO_TRANSITIONS = {
+    StatusRemito.BORRADOR: {StatusRemito.ENVIADO},
+    StatusRemito.ENVIADO: {StatusRemito.EN_TRANSITO, StatusRemito.ENTREGADO, StatusRemito.DEVUELTO},
+    StatusRemito.EN_TRANSITO: {StatusRemito.ENTREGADO, StatusRemito.DEVUELTO},
+}
+
+ENVIO_TRANSITIONS = {
+    StatusEnvio.PREPARANDO: {StatusEnvio.EN_TRANSITO},
+    StatusEnvio.EN_TRANSITO: {
+        StatusEnvio.ENTREGADO, StatusEnvio.DEVUELTO, StatusEnvio.PERDIDO, StatusEnvio.DEMORADO,
+    },
+    StatusEnvio.DEMORADO: {
+        StatusEnvio.EN_TRANSITO, StatusEnvio.ENTREGADO, StatusEnvio.DEVUELTO, StatusEnvio.PERDIDO,
+    },
+}
+
+# Model -> (allowed transitions, entity type used in the activity log)
+TRANSITIONS = {
+    Solped: (SOLPED_TRANSITIONS, TipoDeEntidad.SOLPED),
+    CotizacionProveedor: (COTIZACION_TRANSITIONS, TipoDeEntidad.COTIZACION),
+    Cotizacion: (COTIZACION_TRANSITIONS, TipoDeEntidad.COTIZACION),
+    OrdenCompraProveedor: (ORDEN_COMPRA_TRANSITIONS, TipoDeEntidad.ORDEN_COMPRA),
+    OrdenCompraCliente: (ORDEN_COMPRA_TRANSITIONS, TipoDeEntidad.ORDEN_COMPRA),
+    Remito: (REMITO_TRANSITIONS, TipoDeEntidad.REMITO),
+    Envio: (ENVIO_TRANSITIONS, TipoDeEntidad.ENVIO),
+}
+
+# Target statuses logged as approvals/rejections instead of plain updates
+APPROVAL_STATUSES = {StatusSolped.APROBADA, StatusCotizacion.ACEPTADA}
+REJECTION_STATUSES = {StatusSolped.RECHAZADA, StatusCotizacion.RECHAZADA}
+
+
+def get_transition_model(model_name):
+    """Return the status-bearing model for a lowercase model name, or None."""
+    for model in TRANSITIONS:
+        if model._meta.model_name == model_name:
+            return model
+    return None
+
+
+def get_target_statuses(model):
+    """Return every status some other status can move to, in choice order."""
+    transitions, _ = TRANSITIONS[model]
+    targets = set().union(*transitions.values())
+    return [value for value, _ in model._meta.get_field('status').choices if value in targets]
+
+
+def get_source_statuses(model, target):
+    """Return the statuses allowed to move to ``target``."""
+    transitions, _ = TRANSITIONS[model]
+    return [source for source, targets in transitions.items() if target in targets]
+
+
+@dataclass
+class TransitionResult:
+    """Outcome of a bulk transition: moved ids and rejected ids with their status."""
+    updated: list = field(default_factory=list)
+    rejected: dict = field(default_factory=dict)
+
+
+def bulk_transition(queryset, target, user):
+    """
+    Move every document in ``queryset`` to ``target`` with a single UPDATE.
+
+    Rows whose current status cannot move to ``target`` are left untouched
+    and reported in ``rejected``. One activity entry per moved row is
+    written with a single bulk insert, and so is one outbox event per
+    moved row of the models that publish status changes.
+    """
+    model = queryset.model
+    _, entity_type = TRANSITIONS[model]
+    sources = get_source_statuses(model, target)
+    if target in APPROVAL_STATUSES:
+        activity_type = TipoDeActividad.APPROVE
+    elif target in REJECTION_STATUSES:
+        activity_type = TipoDeActividad.REJECT
+    else:
+        activity_type = TipoDeActividad.UPDATE
+
+    result = TransitionResult()
+    with transaction.atomic():
+        current = dict(
+            queryset.order_by().select_for_update().values_list('pk', 'status')
+        )
+        for pk, status in current.items():
+            if status in sources:
+                result.updated.append(pk)
+            else:
+                result.rejected[pk] = status
+        if not result.updated:
+            return result
+
+        # safedelete only filters deleted rows on SELECT, so spell it out.
+        model.objects.filter(pk__in=result.updated, deleted_at__isnull=True).update(
+            status=target, updated_at=timezone.now(), updated_by=user,
+        )
+        Actividad.objects.bulk_create([
+            Actividad(
+                usuario=user,
+                tipo=activity_type,
+                id_entidad=pk,
+                tipo_entidad=entity_type,
+                data={'status_anterior': current[pk], 'status_nuevo': target},
+            )
+            for pk in result.updated
+        ])
+        record_transition(model, [current[pk] for pk in result.updated], target)
+        record_events(model, {pk: current[pk] for pk in result.updated}, target)
+    return result
@@ -0,0 +1,31 @@
+"""
+API URL configuration for procurement app.
+"""
+
+from django.urls import path
+from rest_framework.routers import SimpleRouter
+
+from . import views
+
+app_name = 'procurement'
+
+router = SimpleRouter()
+router.register('solpeds', views.SolpedViewSet)
+router.register('pedidos-cotizacion', views.PedidoDeCotizacionViewSet)
+router.register('pedidos-cotizacion-proveedor', views.PedidoCotizacionProveedorViewSet)
+router.register('cotizaciones-proveedor', views.CotizacionProveedorViewSet)
+router.register('cotizaciones', views.CotizacionViewSet)
+router.register('ordenes-compra-proveedor', views.OrdenCompraProveedorViewSet)
+router.register('ordenes-compra-cliente', views.OrdenCompraClienteViewSet)
+router.register('remitos', views.RemitoViewSet)
+router.register('envios', views.EnvioViewSet)
+
+urlpatterns = [
+    path('<str:model_name>/transition/', views.StatusTransitionView.as_view(), name='status-transition'),
+    path('<str:model_name>/bulk/<str:action>/', views.LineBulkView.as_view(), name='line-bulk'),
+    path('reportes/gasto/', views.SpendReportView.as_view(), name='spend-report'),
+    path('reportes/embudo/', views.FunnelReportView.as_view(), name='funnel-report'),
+    path('reportes/pendientes/', views.BacklogReportView.as_view(), name='backlog-report'),
+    path('reportes/documentos/', views.DocumentReportView.as_view(), name='document-report'),
+    path('reportes/documentos/<str:task_id>/', views.DocumentReportView.as_view(), name='document-report-task'),
+] + router.urls
@@ -1,3 +1,384 @@
-from django.shortcuts import render
+"""
+API views for procurement documents.
+"""
 
-# Create your views here.
+from celery.result import AsyncResult
+from django.core.files.storage import default_storage
+from django.db.models import Prefetch
+from django.http import Http404
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.api import ReadOnlyViewSet
+
+from .analytics import funnel_report, spend_report
+from .backlog import get_backlog_snapshot
+from .lines import delete_lines, get_line_model, write_lines
+from .reports import REPORTS, find_rendered, get_task_request, remember_task
+from .models import (
+    Cotizacion, CotizacionGanador, CotizacionProveedor, CotizacionSolped, DetalleOrdenCompraProveedor,
+    DetalleRemito, DetalleSolped, Envio, OrdenCompraCliente, OrdenCompraProveedor, PedidoCotizacionProveedor,
+    PedidoCotizacionSolped, PedidoDeCotizacion, Remito, Solped,
+)
+from .serializers import (
+    BacklogReportSerializer, CotizacionGraphSerializer, CotizacionProveedorSerializer, CotizacionSerializer,
+    DocumentReportSerializer, EnvioSerializer, FunnelReportSerializer, LineBulkSerializer, LineDeleteSerializer,
+    OrdenCompraClienteSerializer, OrdenCompraProveedorGraphSerializer, OrdenCompraProveedorSerializer,
+    PedidoCotizacionProveedorSerializer, PedidoDeCotizacionSerializer, RemitoSerializer, SolpedGraphSerializer,
+    SolpedSerializer, SpendReportSerializer, StatusTransitionSerializer
+)
+from .tasks import render_reports
+from .transitions import bulk_transition, get_target_statuses, get_transition_model
+
+
+class StatusTransitionView(APIView):
+    """
+    Move many documents to one status.
+    
+    POST /api/procurement/<model>/transition/ with ``{"ids": [...], "status": "..."}``.
+    Documents whose current status does not allow the move are returned in
+    ``rejected`` and left unchanged.
+    """
+    
+    def post(self, request, model_name):
+        model = get_transition_model(model_name)
+        if model is None:
+            raise Http404
+        opts = model._meta
+        if not request.user.has_perm(f'{opts.app_label}.change_{opts.model_name}'):
+            raise PermissionDenied
+        
+        serializer = StatusTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        target = serializer.validated_data['status']
+        if target not in get_target_statuses(model):
+            raise ValidationError({'status': [f'Estado no alcanzable: {target}']})
+        
+        queryset = model.objects.filter(pk__in=serializer.validated_data['ids'])
+        result = bulk_transition(queryset, target, request.user)
+        return Response({
+            'status': target,
+            'updated': [str(pk) for pk in result.updated],
+            'rejected': {str(pk): current for pk, current in result.rejected.items()},
+        }, status=status.HTTP_200_OK)
+
+
+class LineBulkView(APIView):
+    """
+    Create, upsert or delete many detail lines of one kind.
+    
+    POST /api/procurement/<model>/bulk/create/ or .../bulk/upsert/ with
+    ``{"lines": [...]}``, or .../bulk/delete/ with ``{"ids": [...]}``.
+    Writes are all or nothing: any invalid line rejects the payload with
+    its errors keyed by position. ``results`` follows the payload order.
+    """
+    
+    # Each payload takes the tokens of this many requests from the throttle
+    throttle_cost = 10
+    
+    # Action -> permissions it needs
+    ACTIONS = {
+        'create': ('add',),
+        'upsert': ('add', 'change'),
+        'delete': ('delete',),
+    }
+    
+    def post(self, request, model_name, action):
+        model = get_line_model(model_name)
+        if model is None or action not in self.ACTIONS:
+            raise Http404
+        opts = model._meta
+        if not request.user.has_perms([f'{opts.app_label}.{perm}_{opts.model_name}' for perm in self.ACTIONS[action]]):
+            raise PermissionDenied
+        
+        if action == 'delete':
+            serializer = LineDeleteSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            deleted, missing = delete_lines(model, serializer.validated_data['ids'], request.user)
+            deleted = set(deleted)
+            return Response({
+                'deleted': len(deleted),
+                'results': [
+                    {'id': str(pk), 'result': 'deleted' if pk in deleted else 'missing'}
+                    for pk in serializer.validated_data['ids']
+                ],
+            }, status=status.HTTP_200_OK)
+        
+        serializer = LineBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = write_lines(model, serializer.validated_data['lines'], request.user, upsert=action == 'upsert')
+        if result.errors:
+            raise ValidationError({'lines': {str(position): errors for position, errors in result.errors.items()}})
+        results = sorted(
+            [(position, pk, 'created') for position, pk in result.created]
+            + [(position, pk, 'updated') for position, pk in result.updated]
+        )
+        return Response({
+            'created': len(result.created),
+            'updated': len(result.updated),
+            'results': [{'id': str(pk), 'result': outcome} for _, pk, outcome in results],
+        }, status=status.HTTP_201_CREATED if result.created else status.HTTP_200_OK)
+
+
+class SpendReportView(APIView):
+    """
+    Spend per supplier, article family and currency against the year before.
+    
+    GET /api/procurement/reportes/gasto/?anio=2025[&proveedor=&familia=&moneda=&por=mes]
+    reads only the ``GastoMensual`` rollup, refreshed in the background.
+    """
+    
+    def get(self, request):
+        if not request.user.has_perm('procurement.view_ordencompraproveedor'):
+            raise PermissionDenied
+        
+        serializer = SpendReportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = dict(serializer.validated_data)
+        year = params.pop('anio', timezone.localdate().year)
+        by_month = params.pop('por') == 'mes'
+        if 'proveedor' in params:
+            params['proveedor_id'] = params.pop('proveedor')
+        return Response({
+            'anio': year,
+            'resultados': spend_report(year, by_month=by_month, **params),
+        })
+
+
+class FunnelReportView(APIView):
+    """
+    Solped funnel and cycle times along the document chain.
+    
+    GET /api/procurement/reportes/embudo/?desde=2026-01-01&hasta=2026-06-30
+    counts the solpeds created in the range that reached each stage and
+    returns cycle-time percentiles in days, read from ``EmbudoSolped``.
+    """
+    
+    def get(self, request):
+        if not request.user.has_perm('procurement.view_solped'):
+            raise PermissionDenied
+        
+        serializer = FunnelReportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(funnel_report(
+            since=serializer.validated_data.get('desde'),
+            until=serializer.validated_data.get('hasta'),
+        ))
+
+
+class BacklogReportView(APIView):
+    """
+    Ordered, dispatched and delivered quantities per article, in base units.
+    
+    GET /api/procurement/reportes/pendientes/[?familia=&pendientes=true]
+    serves the cached snapshot; ``pendientes`` keeps only articles with
+    something left to dispatch or in transit.
+    """
+    
+    def get(self, request):
+        if not request.user.has_perm('procurement.view_remito'):
+            raise PermissionDenied
+        
+        serializer = BacklogReportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        snapshot = get_backlog_snapshot()
+        rows = snapshot['articulos']
+        if 'familia' in params:
+            rows = [row for row in rows if row['familia'] == params['familia']]
+        if params['pendientes']:
+            rows = [row for row in rows if row['pendiente_despacho'] or row['en_transito']]
+        return Response({'generado': snapshot['generado'], 'articulos': rows})
+
+
+class DocumentReportView(APIView):
+    """
+    Supplier comparison sheets and purchase orders as PDF or XLSX.
+    
+    POST /api/procurement/reportes/documentos/ with
+    ``{"tipo": "orden_compra", "formato": "pdf", "ids": [...]}`` returns the
+    URLs of outputs already rendered for the documents' current version
+    and queues one Celery task for the rest. GET
+    ``/api/procurement/reportes/documentos/<tarea>/`` reports on that task
+    to the user who queued it, while they may still view the documents.
+    """
+    
+    def check_report_permission(self, request, report):
+        opts = report.model._meta
+        if not request.user.has_perm(f'{opts.app_label}.view_{opts.model_name}'):
+            raise PermissionDenied
+    
+    def post(self, request):
+        serializer = DocumentReportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        report = REPORTS[serializer.validated_data['tipo']]
+        self.check_report_permission(request, report)
+        
+        file_format = serializer.validated_data['formato']
+        found, missing = find_rendered(report, file_format, serializer.validated_data['ids'])
+        data = {'archivos': {str(pk): default_storage.url(name) for pk, name in found.items()}}
+        if not missing:
+            return Response(data, status=status.HTTP_200_OK)
+        task = render_reports.delay(report.name, file_format, [str(pk) for pk in missing])
+        remember_task(task.id, request.user, report)
+        data.update(tarea=task.id, pendientes=[str(pk) for pk in missing])
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+    
+    def get(self, request, task_id):
+        queued = get_task_request(task_id)
+        # Another user's task answers as if it did not exist
+        if queued is None or queued['usuario'] != request.user.pk:
+            raise Http404
+        self.check_report_permission(request, REPORTS[queued['tipo']])
+        
+        result = AsyncResult(task_id)
+        data = {'tarea': task_id, 'estado': result.state}
+        if result.successful():
+            data['archivos'] = {pk: default_storage.url(name) for pk, name in result.result.items()}
+        elif result.failed():
+            data['error'] = str(result.result)
+        return Response(data)
+
+
+class DocumentGraphMixin:
+    """
+    Adds ``GET <id>/completo/``: the document with its whole graph.
+    
+    ``graph_select_related`` and ``graph_prefetch_related`` load the graph
+    with select_related joins and one prefetch per relation, so the number
+    of queries does not depend on how many lines, remitos or shipments the
+    document has.
+    """
+    
+    graph_serializer_class = None
+    graph_select_related = ()
+    graph_prefetch_related = ()
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'completo':
+            queryset = queryset.select_related(*self.graph_select_related).prefetch_related(
+                *self.graph_prefetch_related
+            )
+        return queryset
+    
+    @action(detail=True)
+    def completo(self, request, pk=None):
+        serializer = self.graph_serializer_class(self.get_object(), context=self.get_serializer_context())
+        return Response(serializer.data)
+
+
+class SolpedViewSet(DocumentGraphMixin, ReadOnlyViewSet):
+    """Purchase requests, newest first."""
+    
+    queryset = Solped.objects.all()
+    serializer_class = SolpedSerializer
+    graph_serializer_class = SolpedGraphSerializer
+    
+    # safedelete only filters the base table, so linked documents are filtered by hand
+    graph_prefetch_related = (
+        Prefetch('detalles', queryset=DetalleSolped.objects.select_related('articulo').order_by('created_at')),
+        Prefetch('pedido_cotizacion_solpeds', queryset=PedidoCotizacionSolped.objects.filter(
+            pedido_cotizacion__deleted_at__isnull=True,
+        ).select_related('pedido_cotizacion__cliente').order_by('created_at')),
+        Prefetch('cotizacion_solpeds', queryset=CotizacionSolped.objects.filter(
+            cotizacion__deleted_at__isnull=True,
+        ).select_related('cotizacion__cliente').order_by('created_at')),
+        Prefetch(
+            'cotizacion_solpeds__cotizacion__ordenes_compra_proveedor',
+            queryset=OrdenCompraProveedor.objects.select_related('proveedor').order_by('created_at'),
+        ),
+    )
+
+
+class PedidoDeCotizacionViewSet(ReadOnlyViewSet):
+    """Client quote requests, newest first."""
+    
+    queryset = PedidoDeCotizacion.objects.all()
+    serializer_class = PedidoDeCotizacionSerializer
+
+
+class PedidoCotizacionProveedorViewSet(ReadOnlyViewSet):
+    """Supplier quote requests, newest first."""
+    
+    queryset = PedidoCotizacionProveedor.objects.all()
+    serializer_class = PedidoCotizacionProveedorSerializer
+
+
+class CotizacionProveedorViewSet(ReadOnlyViewSet):
+    """Supplier quotations, newest first."""
+    
+    queryset = CotizacionProveedor.objects.all()
+    serializer_class = CotizacionProveedorSerializer
+
+
+class CotizacionViewSet(DocumentGraphMixin, ReadOnlyViewSet):
+    """Client quotations, newest first."""
+    
+    queryset = Cotizacion.objects.all()
+    serializer_class = CotizacionSerializer
+    graph_serializer_class = CotizacionGraphSerializer
+    
+    graph_select_related = ('cliente',)
+    graph_prefetch_related = (
+        Prefetch('ganadores', queryset=CotizacionGanador.objects.filter(
+            detalle_cotizacion_proveedor__deleted_at__isnull=True,
+        ).select_related(
+            'detalle_cotizacion_proveedor__articulo',
+            'detalle_cotizacion_proveedor__cotizacion_proveedor__proveedor',
+        ).order_by('created_at')),
+        Prefetch('cotizacion_solpeds', queryset=CotizacionSolped.objects.filter(
+            solped__deleted_at__isnull=True,
+        ).select_related('solped').order_by('created_at')),
+        Prefetch(
+            'ordenes_compra_proveedor',
+            queryset=OrdenCompraProveedor.objects.select_related('proveedor').order_by('created_at'),
+        ),
+    )
+
+
+class OrdenCompraProveedorViewSet(DocumentGraphMixin, ReadOnlyViewSet):
+    """Supplier purchase orders, newest first."""
+    
+    queryset = OrdenCompraProveedor.objects.all()
+    serializer_class = OrdenCompraProveedorSerializer
+    graph_serializer_class = OrdenCompraProveedorGraphSerializer
+    
+    graph_select_related = ('proveedor', 'cotizacion__cliente')
+    graph_prefetch_related = (
+        Prefetch(
+            'detalles',
+            queryset=DetalleOrdenCompraProveedor.objects.select_related('articulo').order_by('created_at'),
+        ),
+        Prefetch('remitos', queryset=Remito.objects.select_related('destinatario').order_by('created_at')),
+        Prefetch(
+            'remitos__detalles',
+            queryset=DetalleRemito.objects.select_related('articulo').order_by('created_at'),
+        ),
+        Prefetch('remitos__envios', queryset=Envio.objects.select_related('despachante').order_by('created_at')),
+    )
+
+
+class OrdenCompraClienteViewSet(ReadOnlyViewSet):
+    """Client purchase orders, newest first."""
+    
+    queryset = OrdenCompraCliente.objects.all()
+    serializer_class = OrdenCompraClienteSerializer
+
+
+class RemitoViewSet(ReadOnlyViewSet):
+    """Delivery receipts, newest first."""
+    
+    queryset = Remito.objects.all()
+    serializer_class = RemitoSerializer
+
+
+class EnvioViewSet(ReadOnlyViewSet):
+    """Shipments, newest first."""
+    
+    queryset = Envio.objects.all()
+    serializer_class = EnvioSerializer
@@ -0,0 +1,169 @@
+"""
+Per-user work queue for the dashboard.
+
+Every pending group is filtered on ``created_by`` and ``status`` so the
+``(created_by, status, ...)`` partial indexes serve it. The totals come
+from one UNION ALL of four aggregates and the listed documents from one
+UNION ALL of four ordered, limited branches, and the result is cached per
+user for a short time. Saving a pending document drops its creator's
+cached queue and notifies their open dashboards.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import CharField, Count, F, Value
+from django.db.models.functions import Cast, TruncDate
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+from procurement_system.jinja2 import invalidate_fragment
+
+from .models import (
+    Solped, PedidoCotizacionProveedor, CotizacionProveedor, OrdenCompraProveedor,
+    StatusSolped, StatusPedidoCotizacion, StatusCotizacion, StatusOrdenCompra,
+)
+
+logger = logging.getLogger(__name__)
+
+# Documents listed per group; the totals count all of them
+WORK_QUEUE_ITEMS = 5
+
+AWAITING_RESPONSE = [StatusPedidoCotizacion.PENDIENTE_DE_RESPUESTA, StatusPedidoCotizacion.ENVIADO]
+OPEN_QUOTATIONS = [
+    StatusCotizacion.BORRADOR, StatusCotizacion.ENVIADA,
+    StatusCotizacion.RECIBIDA, StatusCotizacion.EVALUADA,
+]
+OPEN_ORDERS = [StatusOrdenCompra.ENVIADA, StatusOrdenCompra.CONFIRMADA, StatusOrdenCompra.EN_PROCESO]
+
+WORK_QUEUE_MODELS = (Solped, PedidoCotizacionProveedor, CotizacionProveedor, OrdenCompraProveedor)
+
+# Pub/sub channel carrying the pk of the user whose queue changed
+WORK_QUEUE_CHANNEL = 'dashboard:work_queue:changed'
+
+
+@dataclass
+class WorkQueueGroup:
+    """One kind of pending document: its total and the first few rows."""
+    tipo: str
+    titulo: str
+    admin_url: str
+    total: int = 0
+    items: list = field(default_factory=list)
+
+
+def get_pending_querysets(user, today):
+    """
+    Return ``{tipo: (title, queryset, columns, ordering)}`` for the user's work.
+
+    ``columns`` has the same annotations for every kind of document so the
+    listed rows can be combined with UNION ALL; the totals skip them, and
+    with them the join to the supplier.
+    """
+    week_end = today + timedelta(days=6 - today.weekday())
+    return {
+        'solped': (
+            'Solpeds en borrador',
+            Solped.objects.filter(created_by=user, status=StatusSolped.BORRADOR),
+            {'descripcion': Cast('nro_solped', CharField()), 'fecha': TruncDate('created_at')},
+            '-created_at',
+        ),
+        'pedidocotizacionproveedor': (
+            'Pedidos de cotización sin respuesta',
+            PedidoCotizacionProveedor.objects.filter(created_by=user, status__in=AWAITING_RESPONSE),
+            {'descripcion': F('proveedor__razon_social'), 'fecha': F('fecha_vencimiento')},
+            F('fecha_vencimiento').asc(nulls_last=True),
+        ),
+        'cotizacionproveedor': (
+            'Cotizaciones que vencen esta semana',
+            CotizacionProveedor.objects.filter(
+                created_by=user, status__in=OPEN_QUOTATIONS,
+                fecha_vencimiento__range=(today, week_end),
+            ),
+            {'descripcion': F('proveedor__razon_social'), 'fecha': F('fecha_vencimiento')},
+            'fecha_vencimiento',
+        ),
+        'ordencompraproveedor': (
+            'Órdenes de compra demoradas',
+            OrdenCompraProveedor.objects.filter(
+                created_by=user, status__in=OPEN_ORDERS, fecha_entrega_estimada__lt=today,
+            ),
+            {'descripcion': F('proveedor__razon_social'), 'fecha': F('fecha_entrega_estimada')},
+            'fecha_entrega_estimada',
+        ),
+    }
+
+
+def build_work_queue(user):
+    """Run the two UNION ALL queries and group the rows per kind of document."""
+    pending = get_pending_querysets(user, timezone.localdate())
+    groups = {
+        tipo: WorkQueueGroup(tipo, title, f'/admin/procurement/{tipo}/')
+        for tipo, (title, _, _, _) in pending.items()
+    }
+
+    totals = [
+        queryset.order_by().annotate(tipo=Value(tipo)).values('tipo').annotate(total=Count('pk'))
+        .values_list('tipo', 'total')
+        for tipo, (_, queryset, _, _) in pending.items()
+    ]
+    for tipo, total in totals[0].union(*totals[1:], all=True):
+        groups[tipo].total = total
+
+    rows = [
+        queryset.annotate(tipo=Value(tipo), **columns).order_by(ordering)
+        .values_list('tipo', 'id', 'status', 'descripcion', 'fecha')[:WORK_QUEUE_ITEMS]
+        for tipo, (_, queryset, columns, ordering) in pending.items()
+        if groups[tipo].total
+    ]
+    if rows:
+        for tipo, pk, status, descripcion, fecha in rows[0].union(*rows[1:], all=True):
+            groups[tipo].items.append({
+                'id': pk, 'status': status, 'descripcion': descripcion, 'fecha': fecha,
+            })
+    return list(groups.values())
+
+
+def work_queue_key(user_pk):
+    """Cache key of a user's work queue."""
+    return f'dashboard:work_queue:{user_pk}'
+
+
+def get_work_queue(user):
+    """Return the user's work queue, cached for ``DASHBOARD_WORK_QUEUE_TTL`` seconds."""
+    return cache.get_or_set(
+        work_queue_key(user.pk),
+        lambda: build_work_queue(user),
+        settings.DASHBOARD_WORK_QUEUE_TTL,
+    )
+
+
+def notify_work_queue(sender, instance, **kwargs):
+    """Drop the creator's cached queue and fragment and notify their dashboards on commit."""
+    user_pk = instance.created_by_id
+    if user_pk is None:
+        return
+
+    def flush():
+        try:
+            cache.delete(work_queue_key(user_pk))
+            invalidate_fragment(f'work_queue:{user_pk}')
+            get_redis_connection('default').publish(WORK_QUEUE_CHANNEL, str(user_pk))
+        except RedisError:
+            logger.warning('Could not notify the work queue of %s', user_pk, exc_info=True)
+
+    transaction.on_commit(flush)
+
+
+def connect_signals():
+    """Hook the notifications to the queued models; called from ProcurementConfig.ready()."""
+    for model in WORK_QUEUE_MODELS:
+        label = model._meta.label
+        post_save.connect(notify_work_queue, sender=model, dispatch_uid=f'work-queue-save-{label}')
+        post_delete.connect(notify_work_queue, sender=model, dispatch_uid=f'work-queue-delete-{label}')
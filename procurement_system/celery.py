@@ -4,6 +4,7 @@ Celery configuration for the procurement system.
 
 import os
 from celery import Celery
+from celery.signals import worker_process_init
 
 # Set the default Django settings module
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'procurement_system.settings')
@@ -17,6 +18,13 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
 
 
+@worker_process_init.connect
+def on_worker_process_init(**kwargs):
+    """Give each prefork child its own database pool."""
+    from core.db_pool import discard_inherited_pools
+    discard_inherited_pools()
+
+
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
     """Debug task for testing Celery setup."""
@@ -2,19 +2,105 @@
 Jinja2 environment configuration for the procurement system.
 """
 
+import hashlib
+import time
+
+from django.conf import settings
 from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import caches
 from django.urls import reverse
-from jinja2 import Environment
+from jinja2 import Environment, FileSystemBytecodeCache, MemcachedBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+
+# ==============================================================================
+# BYTECODE CACHE
+# ==============================================================================
+
+def get_bytecode_cache():
+    """
+    Return the bytecode cache selected by ``JINJA2_BYTECODE_CACHE``.
+
+    ``filesystem`` shares compiled templates between the workers of one
+    host, ``cache`` between every host through Django's cache (Jinja's
+    memcached cache only needs ``get``/``set``), and ``none`` disables it.
+    """
+    if settings.JINJA2_BYTECODE_CACHE == 'filesystem':
+        return FileSystemBytecodeCache(settings.JINJA2_BYTECODE_CACHE_DIR or None)
+    if settings.JINJA2_BYTECODE_CACHE == 'cache':
+        return MemcachedBytecodeCache(
+            caches['default'],
+            prefix='jinja2:bytecode:',
+            timeout=settings.JINJA2_BYTECODE_CACHE_TIMEOUT,
+        )
+    return None
+
+
+# ==============================================================================
+# FRAGMENT CACHE
+# ==============================================================================
+
+def fragment_version_key(name):
+    return f'jinja2:fragment_version:{name}'
+
+
+def get_fragment_version(name):
+    """Current version of a fragment; a lost version restarts from the clock."""
+    return caches['default'].get_or_set(fragment_version_key(name), lambda: int(time.time()), None)
+
+
+def invalidate_fragment(name):
+    """Expire every cached copy of the fragment ``name``."""
+    cache = caches['default']
+    try:
+        cache.incr(fragment_version_key(name))
+    except ValueError:
+        cache.set(fragment_version_key(name), int(time.time()), None)
+
+
+class FragmentCacheExtension(Extension):
+    """
+    ``{% cache name, timeout[, vary...] %}...{% endcache %}`` backed by Django's cache.
+
+    The key combines the fragment name, its current version and a hash of
+    the vary values; ``invalidate_fragment(name)`` bumps the version.
+    """
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        parser.stream.expect('comma')
+        args.append(parser.parse_expression())
+        vary = []
+        while parser.stream.skip_if('comma'):
+            vary.append(parser.parse_expression())
+        args.append(nodes.List(vary))
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', args), [], [], body).set_lineno(lineno)
+
+    def _render(self, name, timeout, vary, caller):
+        cache = caches['default']
+        digest = hashlib.md5(repr(vary).encode(), usedforsecurity=False).hexdigest()
+        key = f'jinja2:fragment:{name}:{get_fragment_version(name)}:{digest}'
+        value = cache.get(key)
+        if value is None:
+            value = str(caller())
+            cache.set(key, value, timeout)
+        return Markup(value)
 
 
 def environment(**options):
     """
     Configure Jinja2 environment with Django-specific functions.
     """
+    options.setdefault('bytecode_cache', get_bytecode_cache())
+    options['extensions'] = [*options.get('extensions', []), FragmentCacheExtension]
     env = Environment(**options)
     env.globals.update({
         'static': staticfiles_storage.url,
         'url': reverse,
     })
     return env
-
@@ -3,6 +3,7 @@ Django settings for procurement_system project.
 """
 
 from pathlib import Path
+from celery.schedules import crontab
 from decouple import config, Csv
 import dj_database_url
 
@@ -70,6 +71,7 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'core.middleware.ConditionalGetMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -112,6 +114,11 @@ TEMPLATES = [
     },
 ]
 
+# Compiled Jinja2 templates: 'filesystem' (per host), 'cache' (Redis, shared) or 'none'
+JINJA2_BYTECODE_CACHE = config('JINJA2_BYTECODE_CACHE', default='filesystem')
+JINJA2_BYTECODE_CACHE_DIR = config('JINJA2_BYTECODE_CACHE_DIR', default='')
+JINJA2_BYTECODE_CACHE_TIMEOUT = config('JINJA2_BYTECODE_CACHE_TIMEOUT', default=7 * 24 * 3600, cast=int)
+
 WSGI_APPLICATION = 'procurement_system.wsgi.application'
 
 
@@ -127,11 +134,43 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD', default='procurement_password'),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
+        # Sync views run in one transaction each and borrow a connection for it.
+        # Async views cannot; they must be marked non_atomic_requests
+        # (system check core.E001) and open transactions themselves.
         'ATOMIC_REQUESTS': True,
-        'CONN_MAX_AGE': 600,
+        # Check connections before use, replacing ones dropped by a restart or failover
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# How connections are shared: 'pool' or 'pgbouncer'.
+# - 'pool': each web and Celery worker process keeps a psycopg pool.
+#   A request or task borrows a connection while it runs, so a process
+#   holds at most DB_POOL_MAX_SIZE however many threads it has; the rest
+#   wait up to DB_POOL_TIMEOUT seconds. Budget max_connections as
+#   processes * DB_POOL_MAX_SIZE.
+# - 'pgbouncer': DB_HOST is a PgBouncer in transaction mode, which pools
+#   for every process. Server-side cursors are off, since a cursor cannot
+#   outlive the transaction PgBouncer pins to a server connection.
+# psycopg never prepares statements under Django, so neither mode trips
+# over statements prepared on another client's server connection.
+DB_POOL_MODE = config('DB_POOL_MODE', default='pool')
+
+if DB_POOL_MODE == 'pool':
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+            # Seconds before idle connections above min_size, and any connection, are replaced
+            'max_idle': 300,
+            'max_lifetime': 1800,
+        },
+    }
+elif DB_POOL_MODE == 'pgbouncer':
+    DATABASES['default']['CONN_MAX_AGE'] = 600
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
 
 # ==============================================================================
 # CACHING
@@ -164,6 +203,41 @@ CELERY_TIMEZONE = 'America/Argentina/Buenos_Aires'
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
 
+# Rows handled per transaction by background import/export jobs; an
+# interrupted import resumes from the last committed chunk
+IMPORT_EXPORT_JOB_CHUNK_SIZE = config('IMPORT_EXPORT_JOB_CHUNK_SIZE', default=1000, cast=int)
+
+CELERY_BEAT_SCHEDULE = {
+    'purge-soft-deleted': {
+        'task': 'core.tasks.purge_soft_deleted_rows',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'reconcile-dashboard-metrics': {
+        'task': 'core.tasks.reconcile_dashboard_metrics',
+        'schedule': crontab(minute='*/15'),
+    },
+    'refresh-spend-rollup': {
+        'task': 'procurement.tasks.refresh_spend_rollup',
+        'schedule': crontab(minute='*/10'),
+    },
+    'refresh-funnel': {
+        'task': 'procurement.tasks.refresh_funnel',
+        'schedule': crontab(minute='5-59/10'),
+    },
+    'refresh-backlog-snapshot': {
+        'task': 'procurement.tasks.refresh_backlog_snapshot',
+        'schedule': crontab(minute='*/5'),
+    },
+    'dispatch-outbox': {
+        'task': 'core.tasks.dispatch_outbox',
+        'schedule': config('OUTBOX_DISPATCH_INTERVAL', default=5.0, cast=float),
+    },
+    'purge-outbox': {
+        'task': 'core.tasks.purge_outbox',
+        'schedule': crontab(hour=3, minute=30),
+    },
+}
+
 
 # ==============================================================================
 # AUTHENTICATION
@@ -268,10 +342,29 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.TokenBucketThrottle',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 50,
 }
 
+# Token buckets as (sustained rate, burst): a client may send up to
+# `burst` requests at once, then `rate` on average
+API_THROTTLE_ROLES = {
+    'VENDEDOR': ('120/min', 30),
+    'COMPRADOR': ('300/min', 60),
+    'SUPERVISOR': ('300/min', 60),
+    'ADMINISTRADOR': ('600/min', 120),
+}
+
+# Anonymous requests, per IP, and roles missing above
+API_THROTTLE_DEFAULT = ('60/min', 10)
+
+# Integrations by the email of the user they sign in as, overriding its
+# role, e.g. {'erp@bkk.com.ar': ('1200/min', 200)}
+API_THROTTLE_CLIENTS = {}
+
 
 # ==============================================================================
 # CORS SETTINGS
@@ -334,12 +427,90 @@ BATON = {
 }
 
 
+# ==============================================================================
+# ADMIN CHANGELISTS
+# ==============================================================================
+
+# Above this many rows, large-table changelists show planner estimates
+# instead of running an exact COUNT(*)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = config('ADMIN_ESTIMATED_COUNT_THRESHOLD', default=100000, cast=int)
+
+
+# ==============================================================================
+# DASHBOARD
+# ==============================================================================
+
+# Seconds each user's pending-work list is cached
+DASHBOARD_WORK_QUEUE_TTL = config('DASHBOARD_WORK_QUEUE_TTL', default=60, cast=int)
+
+
+# ==============================================================================
+# SEARCH
+# ==============================================================================
+
+# Seconds an autocomplete answer is cached per resource and term
+AUTOCOMPLETE_CACHE_TTL = config('AUTOCOMPLETE_CACHE_TTL', default=30, cast=int)
+
+
+# ==============================================================================
+# ANALYTICS
+# ==============================================================================
+
+# Each analytics refresh also rescans changes this many seconds older
+# than the previous run, to catch transactions that committed late
+ANALYTICS_REFRESH_OVERLAP_SECONDS = config('ANALYTICS_REFRESH_OVERLAP_SECONDS', default=600, cast=int)
+
+# Solpeds recomputed per transaction by the funnel refresh
+FUNNEL_BATCH_SIZE = config('FUNNEL_BATCH_SIZE', default=1000, cast=int)
+
+# Seconds the open-order backlog snapshot is cached; refreshed by beat
+# well before it expires
+BACKLOG_SNAPSHOT_TTL = config('BACKLOG_SNAPSHOT_TTL', default=900, cast=int)
+
+
+# ==============================================================================
+# CHANGES FEED
+# ==============================================================================
+
+# Rows changed this recently are held back from the feed, so transactions
+# still open when it is read cannot commit behind a watermark
+CHANGES_FEED_LAG_SECONDS = config('CHANGES_FEED_LAG_SECONDS', default=60, cast=int)
+
+
+# ==============================================================================
+# OUTBOX AND WEBHOOKS
+# ==============================================================================
+
+# Events per POST to a subscriber
+WEBHOOK_BATCH_SIZE = config('WEBHOOK_BATCH_SIZE', default=100, cast=int)
+
+# Seconds to wait for a subscriber's answer
+WEBHOOK_TIMEOUT = config('WEBHOOK_TIMEOUT', default=10, cast=int)
+
+# Failed POSTs wait BASE * 2^(failures - 1) seconds, up to MAX; a batch
+# is marked failed after MAX_ATTEMPTS tries
+WEBHOOK_BACKOFF_BASE = config('WEBHOOK_BACKOFF_BASE', default=5, cast=int)
+WEBHOOK_BACKOFF_MAX = config('WEBHOOK_BACKOFF_MAX', default=3600, cast=int)
+WEBHOOK_MAX_ATTEMPTS = config('WEBHOOK_MAX_ATTEMPTS', default=10, cast=int)
+
+# Keep-alive connection pools per worker process: hosts kept, connections per host
+WEBHOOK_POOL_CONNECTIONS = config('WEBHOOK_POOL_CONNECTIONS', default=10, cast=int)
+WEBHOOK_POOL_MAXSIZE = config('WEBHOOK_POOL_MAXSIZE', default=4, cast=int)
+
+# Days dispatched events and their deliveries are kept
+OUTBOX_RETENTION_DAYS = config('OUTBOX_RETENTION_DAYS', default=30, cast=int)
+
+
 # ==============================================================================
 # SAFEDELETE
 # ==============================================================================
 
 SAFE_DELETE_FIELD_NAME = 'deleted_at'
 
+# Soft-deleted rows older than this are archived to storage and removed
+PURGE_SOFT_DELETED_AFTER_DAYS = config('PURGE_SOFT_DELETED_AFTER_DAYS', default=365, cast=int)
+PURGE_BATCH_SIZE = config('PURGE_BATCH_SIZE', default=1000, cast=int)
+
 
 # ==============================================================================
 # LOGGING
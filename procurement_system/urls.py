@@ -16,6 +16,10 @@ urlpatterns = [
     # Authentication (allauth)
     path('accounts/', include('allauth.urls')),
     
+    # API
+    path('api/core/', include('core.urls')),
+    path('api/procurement/', include('procurement.urls')),
+    
     # Dashboard and custom views
     path('', include('users.urls')),
     
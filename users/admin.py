@@ -5,11 +5,12 @@ Admin configuration for user models.
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
+from core.admin_mixins import QueryBudgetAdminMixin, SoftDeleteAdminMixin
 from .models import Usuario
 
 
 @admin.register(Usuario)
-class UsuarioAdmin(BaseUserAdmin):
+class UsuarioAdmin(QueryBudgetAdminMixin, SoftDeleteAdminMixin, BaseUserAdmin):
     """Admin interface for Usuario model."""
     
     list_display = ['email', 'rol', 'status', 'is_staff', 'created_at']
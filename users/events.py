@@ -0,0 +1,142 @@
+"""
+Live dashboard updates as server-sent events.
+
+Counter updates and work queue changes are published on Redis pub/sub
+channels. Each ASGI worker process keeps one subscription and fans the
+messages out to an asyncio queue per open stream, so an idle connection
+costs a queue and a suspended coroutine rather than a thread or a Redis
+connection. Counter bursts are coalesced into one snapshot per process.
+"""
+
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils.functional import SimpleLazyObject
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from core.metrics import COUNTERS_CHANNEL, get_dashboard_metrics
+from procurement.work_queue import WORK_QUEUE_CHANNEL, get_work_queue
+
+logger = logging.getLogger(__name__)
+
+# Comment line sent on idle streams so proxies keep them open
+HEARTBEAT_SECONDS = 15
+
+# Minimum delay between two counter snapshots
+COUNTERS_INTERVAL_SECONDS = 1
+
+RECONNECT_SECONDS = 5
+
+# Events buffered per stream; a client that falls further behind misses
+# intermediate snapshots, not the latest one
+STREAM_QUEUE_SIZE = 20
+
+
+def format_event(event, data):
+    """Encode one server-sent event; multi-line data gets one field per line."""
+    if not isinstance(data, str):
+        data = json.dumps(data)
+    lines = ''.join(f'data: {line}\n' for line in data.splitlines() or [''])
+    return f'event: {event}\n{lines}\n'
+
+
+def render_work_queue(user):
+    """Render the work queue card body of the dashboard."""
+    return render_to_string('dashboard_work_queue.html', {
+        'user': user,
+        'work_queue': SimpleLazyObject(lambda: get_work_queue(user)),
+        'work_queue_ttl': settings.DASHBOARD_WORK_QUEUE_TTL,
+    })
+
+
+class DashboardHub:
+    """One Redis subscription per process, fanned out to the open streams."""
+
+    def __init__(self):
+        self.streams = {}
+        self.tasks = []
+        self.counters_changed = None
+
+    def open(self, user_pk):
+        """Register a stream for ``user_pk`` and return its queue."""
+        if not self.tasks or any(task.done() for task in self.tasks):
+            self.start()
+        queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        self.streams[queue] = str(user_pk)
+        return queue
+
+    def close(self, queue):
+        self.streams.pop(queue, None)
+
+    def start(self):
+        for task in self.tasks:
+            task.cancel()
+        self.counters_changed = asyncio.Event()
+        self.tasks = [
+            asyncio.create_task(self.listen()),
+            asyncio.create_task(self.send_counters()),
+        ]
+
+    def broadcast(self, event, data, user_pk=None):
+        for queue, owner in list(self.streams.items()):
+            if user_pk is not None and owner != user_pk:
+                continue
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait((event, data))
+
+    async def listen(self):
+        """Relay the Redis channels, reconnecting after failures."""
+        while True:
+            try:
+                client = Redis.from_url(settings.CACHES['default']['LOCATION'])
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(COUNTERS_CHANNEL, WORK_QUEUE_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message['type'] != 'message':
+                            continue
+                        if message['channel'] == COUNTERS_CHANNEL.encode():
+                            self.counters_changed.set()
+                        else:
+                            self.broadcast('trabajo', None, user_pk=message['data'].decode())
+            except (RedisError, OSError):
+                logger.warning('Dashboard event subscription lost; reconnecting', exc_info=True)
+                await asyncio.sleep(RECONNECT_SECONDS)
+
+    async def send_counters(self):
+        """Send one counter snapshot per burst of changes."""
+        while True:
+            await self.counters_changed.wait()
+            self.counters_changed.clear()
+            if self.streams:
+                try:
+                    self.broadcast('contadores', await sync_to_async(get_dashboard_metrics)())
+                except Exception:
+                    logger.exception('Could not read the dashboard counters')
+            await asyncio.sleep(COUNTERS_INTERVAL_SECONDS)
+
+
+hub = DashboardHub()
+
+
+async def stream_dashboard_events(user):
+    """Yield the events of one dashboard until the client disconnects."""
+    queue = hub.open(user.pk)
+    try:
+        yield f'retry: {RECONNECT_SECONDS * 1000}\n\n'
+        while True:
+            try:
+                event, data = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            if event == 'trabajo':
+                data = await sync_to_async(render_work_queue)(user)
+            yield format_event(event, data)
+    finally:
+        hub.close(queue)
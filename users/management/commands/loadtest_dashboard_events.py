@@ -0,0 +1,124 @@
+"""
+Load test for the live dashboard event stream.
+
+Opens many idle server-sent event connections against a running ASGI
+server, keeps them open, then publishes one counter notification and
+measures how long it takes to reach every connection.
+"""
+
+import asyncio
+import resource
+import statistics
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django_redis import get_redis_connection
+
+from core.metrics import COUNTERS_CHANNEL
+
+
+class Command(BaseCommand):
+    help = 'Abre muchas conexiones al stream del dashboard y mide la difusión de un evento.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000/dashboard/events/')
+        parser.add_argument('--email', help='Usuario de las conexiones; por defecto el primer superusuario')
+        parser.add_argument('--connections', type=int, default=1000)
+        parser.add_argument('--ramp', type=int, default=100, help='Conexiones abriéndose a la vez')
+        parser.add_argument('--hold', type=float, default=30, help='Segundos con las conexiones inactivas')
+        parser.add_argument('--timeout', type=float, default=30, help='Espera máxima del evento')
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.order_by('created_at')
+        if options['email']:
+            user = users.filter(email=options['email']).first()
+        else:
+            user = users.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError('No se encontró el usuario.')
+        client = Client()
+        client.force_login(user)
+        cookie = client.cookies[settings.SESSION_COOKIE_NAME].value
+
+        # Every connection is a file descriptor on this side too
+        _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        if options['connections'] + 100 > hard:
+            self.stderr.write(f'Límite de archivos abiertos: {hard}; se abrirán menos conexiones.')
+
+        asyncio.run(self.run(cookie, options))
+
+    async def run(self, cookie, options):
+        url = urlsplit(options['url'])
+        request = (
+            f'GET {url.path} HTTP/1.1\r\n'
+            f'Host: {url.netloc}\r\n'
+            f'Accept: text/event-stream\r\n'
+            f'Cookie: {settings.SESSION_COOKIE_NAME}={cookie}\r\n\r\n'
+        ).encode()
+        ramp = asyncio.Semaphore(options['ramp'])
+        published = asyncio.Event()
+        published_at = []
+
+        async def connect():
+            async with ramp:
+                reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+                writer.write(request)
+                await writer.drain()
+                status = await reader.readline()
+                if b' 200 ' not in status:
+                    writer.close()
+                    raise ConnectionError(status.decode().strip() or 'sin respuesta')
+                while await reader.readline() not in (b'\r\n', b''):
+                    pass
+            return reader, writer
+
+        async def watch(reader):
+            """Drain the stream; return the delay of the first snapshot after publishing."""
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return None
+                if published.is_set() and line.startswith(b'event: contadores'):
+                    return time.perf_counter() - published_at[0]
+
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(connect() for _ in range(options['connections'])), return_exceptions=True,
+        )
+        streams = [result for result in results if not isinstance(result, BaseException)]
+        errors = Counter(type(result).__name__ for result in results if isinstance(result, BaseException))
+        self.stdout.write(
+            f'{len(streams)} conexiones abiertas en {time.perf_counter() - started:.1f}s, '
+            f'{sum(errors.values())} fallidas {dict(errors)}'
+        )
+        if not streams:
+            return
+
+        watchers = [asyncio.create_task(watch(reader)) for reader, _ in streams]
+        await asyncio.sleep(options['hold'])
+        closed = sum(watcher.done() for watcher in watchers)
+        self.stdout.write(f'{len(streams) - closed} conexiones siguen abiertas tras {options["hold"]:.0f}s')
+
+        published_at.append(time.perf_counter())
+        published.set()
+        get_redis_connection('default').publish(COUNTERS_CHANNEL, '')
+        done, pending = await asyncio.wait(watchers, timeout=options['timeout'])
+        for watcher in pending:
+            watcher.cancel()
+        delays = sorted(watcher.result() for watcher in done if watcher.result() is not None)
+        for _, writer in streams:
+            writer.close()
+
+        self.stdout.write(f'{len(delays)} de {len(streams)} conexiones recibieron el evento')
+        if len(delays) >= 2:
+            percentiles = statistics.quantiles(delays, n=100)
+            self.stdout.write(
+                f'Latencia p50 {percentiles[49] * 1000:.0f} ms, '
+                f'p99 {percentiles[98] * 1000:.0f} ms, máx {delays[-1] * 1000:.0f} ms'
+            )
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.5 on 2026-10-19 11:24
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking writes on large tables
+    atomic = False
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        RemoveIndexConcurrently(
+            model_name="usuario",
+            name="idx_usuarios_email",
+        ),
+        RemoveIndexConcurrently(
+            model_name="usuario",
+            name="idx_usuarios_rol",
+        ),
+        AddIndexConcurrently(
+            model_name="usuario",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["email"],
+                name="idx_usuarios_email",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="usuario",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["rol"],
+                name="idx_usuarios_rol",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="usuario",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["status", "-created_at"],
+                name="idx_usuarios_status_created",
+            ),
+        ),
+    ]
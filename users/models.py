@@ -6,8 +6,14 @@ import uuid
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.db import models
 from django.utils import timezone
+from safedelete.managers import SafeDeleteAllManager, SafeDeleteDeletedManager, SafeDeleteManager
 from safedelete.models import SafeDeleteModel
 from safedelete.models import SOFT_DELETE_CASCADE
+from core.cascade import CascadeQuerySet, CascadeSoftDeleteMixin
+
+
+# Index condition matching the deleted_at IS NULL filter added by safedelete
+NOT_DELETED = models.Q(deleted_at__isnull=True)
 
 
 class RolUsuario(models.TextChoices):
@@ -18,8 +24,10 @@ class RolUsuario(models.TextChoices):
     SUPERVISOR = 'SUPERVISOR', 'Supervisor'
 
 
-class UsuarioManager(BaseUserManager):
-    """Custom manager for Usuario model."""
+class UsuarioManager(SafeDeleteManager, BaseUserManager):
+    """Custom manager for Usuario model that hides soft-deleted users."""
+    
+    _queryset_class = CascadeQuerySet
     
     def create_user(self, email, password=None, **extra_fields):
         """Create and save a regular user."""
@@ -47,7 +55,7 @@ class UsuarioManager(BaseUserManager):
         return self.create_user(email, password, **extra_fields)
 
 
-class Usuario(AbstractBaseUser, PermissionsMixin, SafeDeleteModel):
+class Usuario(AbstractBaseUser, PermissionsMixin, CascadeSoftDeleteMixin, SafeDeleteModel):
     """
     Custom user model using email as the unique identifier.
     """
@@ -96,6 +104,8 @@ class Usuario(AbstractBaseUser, PermissionsMixin, SafeDeleteModel):
     )
     
     objects = UsuarioManager()
+    all_objects = SafeDeleteAllManager(CascadeQuerySet)
+    deleted_objects = SafeDeleteDeletedManager(CascadeQuerySet)
     
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
@@ -105,8 +115,9 @@ class Usuario(AbstractBaseUser, PermissionsMixin, SafeDeleteModel):
         verbose_name_plural = 'Usuarios'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['email'], name='idx_usuarios_email'),
-            models.Index(fields=['rol'], name='idx_usuarios_rol'),
+            models.Index(fields=['email'], name='idx_usuarios_email', condition=NOT_DELETED),
+            models.Index(fields=['rol'], name='idx_usuarios_rol', condition=NOT_DELETED),
+            models.Index(fields=['status', '-created_at'], name='idx_usuarios_status_created', condition=NOT_DELETED),
         ]
     
     def __str__(self):
@@ -1,3 +1,55 @@
+"""
+Tests for the dashboard views.
+"""
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+
+from core.metrics import get_dashboard_metrics
+
+from .events import RECONNECT_SECONDS, format_event, hub
+
+
+class DashboardMetricsViewTests(TestCase):
+    """The async metrics endpoint answers through the handler like the dashboard cards."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser('compras@example.com', 'password')
+
+    async def test_metrics(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('users:dashboard_metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), await sync_to_async(get_dashboard_metrics)())
+
+    async def test_requires_login(self):
+        response = await self.async_client.get(reverse('users:dashboard_metrics'))
+        self.assertEqual(response.status_code, 302)
+
+
+class DashboardEventsViewTests(TestCase):
+    """The event stream opens through the handler and relays hub broadcasts."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser('compras@example.com', 'password')
 
-# Create your tests here.
+    async def test_stream_relays_counters(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('users:dashboard_events'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = response.streaming_content
+        try:
+            self.assertEqual(await anext(content), f'retry: {RECONNECT_SECONDS * 1000}\n\n'.encode())
+            hub.broadcast('contadores', {'proveedores_pendientes': 3})
+            self.assertEqual(
+                await anext(content),
+                format_event('contadores', {'proveedores_pendientes': 3}).encode(),
+            )
+        finally:
+            await content.aclose()
+            hub.streams.clear()
+            for task in hub.tasks:
+                task.cancel()
@@ -10,6 +10,8 @@ app_name = 'users'
 urlpatterns = [
     # Dashboard (main user view after login)
     path('dashboard/', views.dashboard_view, name='dashboard'),
+    path('dashboard/events/', views.dashboard_events_view, name='dashboard_events'),
+    path('dashboard/metricas/', views.adashboard_metrics_view, name='dashboard_metrics'),
     
     # Note: Login/logout now handled by allauth at /accounts/login/ and /accounts/logout/
 ]
@@ -3,8 +3,17 @@ Views for user dashboard and management.
 Note: Login/logout is now handled by django-allauth
 """
 
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.utils.functional import SimpleLazyObject
+
+from core.metrics import aget_dashboard_metrics, get_dashboard_metrics
+from procurement.work_queue import get_work_queue
+
+from .events import stream_dashboard_events
 
 
 @login_required
@@ -12,5 +21,39 @@ def dashboard_view(request):
     """Main dashboard view."""
     context = {
         'user': request.user,
+        'metrics': get_dashboard_metrics(),
+        # Only built when the cached fragment has expired
+        'work_queue': SimpleLazyObject(lambda: get_work_queue(request.user)),
+        'work_queue_ttl': settings.DASHBOARD_WORK_QUEUE_TTL,
     }
     return render(request, 'dashboard.html', context)
+
+
+@login_required
+def dashboard_metrics_view(request):
+    """Dashboard card figures as JSON; the baseline of ``adashboard_metrics_view``."""
+    return JsonResponse(get_dashboard_metrics())
+
+
+@login_required
+@transaction.non_atomic_requests
+async def adashboard_metrics_view(request):
+    """Dashboard card figures as JSON, read with the asyncio Redis client."""
+    return JsonResponse(await aget_dashboard_metrics())
+
+
+@login_required
+@transaction.non_atomic_requests
+async def dashboard_events_view(request):
+    """
+    Server-sent events updating the dashboard; needs an ASGI server.
+
+    Outside ATOMIC_REQUESTS, which Django refuses for async views and
+    which would hold a transaction open for the life of the stream.
+    """
+    user = await request.auser()
+    return StreamingHttpResponse(
+        stream_dashboard_events(user),
+        content_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )